@@ -0,0 +1,163 @@
+"""
+Sentence / paragraph aware chunker.
+
+Replaces the old fixed 800-character slicer, which cut words and sentences
+in half. Chunks are built from whole sentences up to a token budget, snap to
+paragraph breaks when one is close to the budget, and overlap by whole
+sentences only.
+
+iter_chunks() consumes any iterable of text pieces (a whole document, or
+pages / slides as an extractor yields them) and yields chunks lazily, so a
+large document never has to be held in memory as one string.
+"""
+import os
+import re
+from dataclasses import dataclass
+from typing import Iterable, Iterator, List
+
+from app.core.tokenizer import count_tokens
+
+
+CHUNK_MAX_TOKENS = int(os.getenv("CHUNK_MAX_TOKENS", "200"))
+CHUNK_OVERLAP_TOKENS = int(os.getenv("CHUNK_OVERLAP_TOKENS", "30"))
+
+_PARAGRAPH_BREAK_RE = re.compile(r"\n\s*\n")
+_SENTENCE_SPLIT_RE = re.compile(r"(?<=[.!?])\s+(?=\S)")
+_TERMINATORS = (".", "!", "?", ":", ";")
+_MID_SENTENCE_TAIL_RE = re.compile(r"(?:^|\n)([^\n]*[a-z,])[ \t]*$")
+
+
+@dataclass
+class _Unit:
+    text: str
+    tokens: int
+    sep: str        # separator placed before this unit: "\n\n", "\n" or " "
+
+
+def _paragraph_lines(paragraph: str) -> List[str]:
+    """
+    Re-join lines that PDF extraction wrapped mid-sentence; keep real line
+    breaks (bullets, headings) as separate lines.
+    """
+    lines: List[str] = []
+    for raw in paragraph.split("\n"):
+        line = raw.strip()
+        if not line:
+            continue
+        if lines and not lines[-1].endswith(_TERMINATORS) and line[0].islower():
+            lines[-1] = f"{lines[-1]} {line}"
+        else:
+            lines.append(line)
+    return lines
+
+
+def _split_oversized(text: str, max_tokens: int) -> List[str]:
+    """Last resort for a 'sentence' longer than the budget: split on words."""
+    parts, current, current_tokens = [], [], 0
+    for word in text.split():
+        t = count_tokens(word)
+        if current and current_tokens + t > max_tokens:
+            parts.append(" ".join(current))
+            current, current_tokens = [], 0
+        current.append(word)
+        current_tokens += t
+    if current:
+        parts.append(" ".join(current))
+    return parts
+
+
+def _iter_units(pieces: Iterable[str], max_tokens: int) -> Iterator[_Unit]:
+    carry = ""
+    for piece in pieces:
+        if carry:
+            head = piece.lstrip()
+            if head[:1].islower():
+                # sentence continues across the page break
+                piece = f"{carry} {head}"
+            else:
+                yield from _paragraph_units(carry, max_tokens)
+            carry = ""
+
+        # hold back a trailing line that stops mid-sentence (only one line,
+        # so slides without punctuation never pile up)
+        m = _MID_SENTENCE_TAIL_RE.search(piece)
+        if m:
+            carry = m.group(1).strip()
+            piece = piece[:m.start(1)]
+
+        for paragraph in _PARAGRAPH_BREAK_RE.split(piece):
+            if paragraph.strip():
+                yield from _paragraph_units(paragraph, max_tokens)
+
+    if carry:
+        yield from _paragraph_units(carry, max_tokens)
+
+
+def _paragraph_units(paragraph: str, max_tokens: int) -> Iterator[_Unit]:
+    sep = "\n\n"
+    for line in _paragraph_lines(paragraph):
+        for sentence in _SENTENCE_SPLIT_RE.split(line):
+            tokens = count_tokens(sentence)
+            if tokens <= max_tokens:
+                yield _Unit(sentence, tokens, sep)
+            else:
+                for part in _split_oversized(sentence, max_tokens):
+                    yield _Unit(part, count_tokens(part), sep)
+                    sep = " "
+            sep = " "
+        sep = "\n"
+
+
+def _join(units: List[_Unit]) -> str:
+    out = [units[0].text]
+    for u in units[1:]:
+        out.append(u.sep)
+        out.append(u.text)
+    return "".join(out)
+
+
+def iter_chunks(
+    pieces: Iterable[str],
+    max_tokens: int = CHUNK_MAX_TOKENS,
+    overlap_tokens: int = CHUNK_OVERLAP_TOKENS,
+) -> Iterator[str]:
+    """Yield chunks of at most ~max_tokens built from whole sentences."""
+    if isinstance(pieces, str):
+        pieces = [pieces]
+
+    buf: List[_Unit] = []
+    buf_tokens = 0
+
+    for unit in _iter_units(pieces, max_tokens):
+        while buf and buf_tokens + unit.tokens > max_tokens:
+            # snap to the last paragraph break if it keeps the chunk at least
+            # half full; otherwise cut at the sentence boundary
+            cut, running = len(buf), 0
+            for i, u in enumerate(buf):
+                if i and u.sep == "\n\n" and running >= max_tokens // 2:
+                    cut = i
+                running += u.tokens
+
+            yield _join(buf[:cut])
+
+            rest = buf[cut:]
+            overlap: List[_Unit] = []
+            if not rest and unit.sep != "\n\n":
+                # mid-paragraph cut: repeat trailing sentences for context
+                overlap_total = 0
+                for u in reversed(buf):
+                    if overlap_total + u.tokens > overlap_tokens:
+                        break
+                    overlap.insert(0, u)
+                    overlap_total += u.tokens
+                if overlap_total + unit.tokens > max_tokens:
+                    overlap = []
+
+            buf = overlap or rest
+            buf_tokens = sum(u.tokens for u in buf)
+
+        buf.append(unit)
+        buf_tokens += unit.tokens
+
+    if buf:
+        yield _join(buf)
@@ -0,0 +1,137 @@
+"""
+Token-budgeted context assembly.
+
+Retrieval returns, per document, candidate chunks in relevance order. The
+assembler fills a token budget from them round-robin (best chunk of every
+document, then the second best, ...), so a long lecture cannot crowd out a
+short one and the prompt never grows past the budget. Tokens are counted
+with the local tokenizer (app.core.tokenizer).
+"""
+import math
+import os
+import random
+import threading
+from collections import deque
+from typing import Dict, List
+
+from app.core.chunker import CHUNK_MAX_TOKENS
+from app.core.tokenizer import count_tokens, tokenizer_name
+
+
+CONTEXT_TOKEN_BUDGET = int(os.getenv("CONTEXT_TOKEN_BUDGET", "2400"))
+# model context window; the budget is lowered when the rest of the prompt
+# plus the reserved output would not fit
+LLM_CONTEXT_WINDOW = int(os.getenv("LLM_CONTEXT_WINDOW", "131072"))
+
+_DOC_SEPARATOR = "\n\n"
+_CHUNK_SEPARATOR = "\n\n"
+
+
+def document_header(doc_id) -> str:
+    return f"===== DOCUMENT {doc_id} ====="
+
+
+def candidates_per_document(budget: int, docs_count: int) -> int:
+    """How many chunks to retrieve per document so the budget can be filled."""
+    fair_share = math.ceil(budget / max(1, docs_count) / max(1, CHUNK_MAX_TOKENS))
+    # a couple of spares for chunks that are skipped because they don't fit
+    return max(1, fair_share + 2)
+
+
+def effective_budget(budget: int, prompt_overhead_tokens: int, max_output_tokens: int) -> int:
+    room = LLM_CONTEXT_WINDOW - max_output_tokens - prompt_overhead_tokens
+    return max(0, min(budget, room))
+
+
+def assemble_context(ranked: Dict[int, List[str]], budget: int) -> tuple[str, dict]:
+    """
+    ranked: {doc_id: [chunk, ...]} best first.
+    Returns (context, stats). Context keeps the "===== DOCUMENT n =====" layout,
+    documents in doc_id order, chunks in relevance order.
+    """
+    queues = {doc_id: deque(chunks) for doc_id, chunks in ranked.items() if chunks}
+    picked: Dict[int, List[str]] = {doc_id: [] for doc_id in queues}
+    used = 0
+
+    while queues:
+        for doc_id in list(queues):
+            queue = queues[doc_id]
+            chunk = queue.popleft()
+
+            cost = count_tokens(chunk) + count_tokens(_CHUNK_SEPARATOR)
+            if not picked[doc_id]:
+                # first chunk of a document also pays for its header
+                cost += count_tokens(document_header(doc_id) + "\n") + count_tokens(_DOC_SEPARATOR)
+
+            if used + cost <= budget:
+                picked[doc_id].append(chunk)
+                used += cost
+            # a chunk that does not fit is skipped; a smaller one may still fit
+            if not queue:
+                del queues[doc_id]
+
+    parts = []
+    for doc_id in sorted(picked):
+        if picked[doc_id]:
+            parts.append(f"{document_header(doc_id)}\n{_CHUNK_SEPARATOR.join(picked[doc_id])}")
+    context = _DOC_SEPARATOR.join(parts)
+
+    stats = {
+        "budget_tokens": budget,
+        "tokenizer": tokenizer_name(),
+        "context_tokens": count_tokens(context),
+        "chunks_used": sum(len(c) for c in picked.values()),
+        "chunks_available": sum(len(c) for c in ranked.values()),
+        "chunks_per_document": {doc_id: len(c) for doc_id, c in sorted(picked.items())},
+    }
+    return context, stats
+
+
+def sample_ranked(ranked: Dict[int, List[str]], seed: int) -> Dict[int, List[str]]:
+    """
+    Re-order each document's candidates for exam variant `seed`.
+    Seed 0 keeps the relevance order; other seeds draw a weighted random
+    order (weight 1/rank, Efraimidis-Spirakis keys), so better matches are
+    still likely to come first but every variant sees a different mix.
+    """
+    if seed == 0:
+        return ranked
+    rng = random.Random(seed)
+    sampled = {}
+    for doc_id, chunks in ranked.items():
+        keys = [rng.random() ** (rank + 1) for rank in range(len(chunks))]
+        order = sorted(range(len(chunks)), key=lambda i: keys[i], reverse=True)
+        sampled[doc_id] = [chunks[i] for i in order]
+    return sampled
+
+
+class PromptTokenStats:
+    """Running totals of prompt sizes for /api/metrics."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.requests = 0
+        self.total_prompt_tokens = 0
+        self.total_context_tokens = 0
+        self.max_prompt_tokens = 0
+        self.last: dict = {}
+
+    def record(self, prompt_tokens: int, context: dict):
+        with self._lock:
+            self.requests += 1
+            self.total_prompt_tokens += prompt_tokens
+            self.total_context_tokens += context.get("context_tokens", 0)
+            self.max_prompt_tokens = max(self.max_prompt_tokens, prompt_tokens)
+            self.last = {"prompt_tokens": prompt_tokens, **context}
+
+    def stats(self) -> dict:
+        with self._lock:
+            n = self.requests
+            return {
+                "requests": n,
+                "avg_prompt_tokens": round(self.total_prompt_tokens / n, 1) if n else None,
+                "avg_context_tokens": round(self.total_context_tokens / n, 1) if n else None,
+                "max_prompt_tokens": self.max_prompt_tokens,
+                "context_budget_tokens": CONTEXT_TOKEN_BUDGET,
+                "last": self.last,
+            }
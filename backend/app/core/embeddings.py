@@ -0,0 +1,273 @@
+"""
+Pluggable embedding backends for the RAG engine.
+
+EMBEDDING_BACKEND:
+  - "chroma-default":        Chroma's ONNX all-MiniLM-L6-v2 (downloads the model on first use)
+  - "sentence-transformers": any sentence-transformers model from a LOCAL path
+                             (EMBEDDING_MODEL_PATH), CPU only, never hits the network
+  - "hashing":               dependency-free feature hashing, fully offline, no model files
+
+Every backend is wrapped in an Embedder that batches requests, keeps a
+persistent text-hash -> vector cache and tracks throughput (chunks/s).
+"""
+import hashlib
+import math
+import os
+import re
+import sqlite3
+import threading
+import time
+from array import array
+from functools import cached_property
+from typing import List, Optional
+
+
+EMBEDDING_BACKEND = os.getenv("EMBEDDING_BACKEND", "chroma-default")
+EMBEDDING_MODEL_PATH = os.getenv("EMBEDDING_MODEL_PATH", "")
+EMBEDDING_BATCH_SIZE = int(os.getenv("EMBEDDING_BATCH_SIZE", "64"))
+EMBEDDING_THREADS = int(os.getenv("EMBEDDING_THREADS", str(os.cpu_count() or 1)))
+EMBEDDING_CACHE_PATH = os.getenv("EMBEDDING_CACHE_PATH", "cache/embeddings.sqlite3")
+EMBEDDING_CACHE_MAX_ENTRIES = int(os.getenv("EMBEDDING_CACHE_MAX_ENTRIES", "500000"))
+HASHING_DIMENSIONS = int(os.getenv("HASHING_DIMENSIONS", "384"))
+
+
+# =========================================================
+# BACKENDS
+# =========================================================
+class EmbeddingBackend:
+    """Turns one batch of texts into one vector per text."""
+
+    name = "base"
+
+    def embed(self, texts: List[str]) -> List[List[float]]:
+        raise NotImplementedError
+
+
+class ChromaDefaultBackend(EmbeddingBackend):
+    name = "chroma-default"
+
+    def __init__(self, threads: int = EMBEDDING_THREADS):
+        from chromadb.utils.embedding_functions import ONNXMiniLM_L6_V2
+
+        class ThreadLimitedMiniLM(ONNXMiniLM_L6_V2):
+            # Chroma's session, with the thread count set on the session options
+            # (OMP_NUM_THREADS is ignored once onnxruntime has been imported)
+            @cached_property
+            def model(self):
+                options = self.ort.SessionOptions()
+                options.log_severity_level = 3
+                options.graph_optimization_level = self.ort.GraphOptimizationLevel.ORT_ENABLE_ALL
+                options.intra_op_num_threads = threads
+                options.inter_op_num_threads = 1
+                return self.ort.InferenceSession(
+                    os.path.join(self.DOWNLOAD_PATH, self.EXTRACTED_FOLDER_NAME, "model.onnx"),
+                    providers=["CPUExecutionProvider"],
+                    sess_options=options,
+                )
+
+        self._fn = ThreadLimitedMiniLM(preferred_providers=["CPUExecutionProvider"])
+
+    def embed(self, texts: List[str]) -> List[List[float]]:
+        return [list(map(float, v)) for v in self._fn(texts)]
+
+
+class SentenceTransformerBackend(EmbeddingBackend):
+    def __init__(self, model_path: str = EMBEDDING_MODEL_PATH, threads: int = EMBEDDING_THREADS):
+        if not model_path:
+            raise ValueError("EMBEDDING_MODEL_PATH must point to a local sentence-transformers model")
+        import torch
+        from sentence_transformers import SentenceTransformer
+
+        torch.set_num_threads(threads)
+        self._model = SentenceTransformer(model_path, device="cpu", local_files_only=True)
+        self.name = f"st-{os.path.basename(os.path.normpath(model_path))}"
+
+    def embed(self, texts: List[str]) -> List[List[float]]:
+        vectors = self._model.encode(
+            texts,
+            batch_size=len(texts),
+            normalize_embeddings=True,
+            show_progress_bar=False,
+        )
+        return vectors.tolist()
+
+
+class HashingBackend(EmbeddingBackend):
+    """
+    Signed feature hashing of word unigrams + bigrams, L2-normalised.
+    Lexical rather than semantic, but needs no model and no network.
+    """
+
+    _WORD_RE = re.compile(r"\w+")
+
+    def __init__(self, dimensions: int = HASHING_DIMENSIONS):
+        self.dimensions = dimensions
+        self.name = f"hashing-{dimensions}"
+
+    def _vector(self, text: str) -> List[float]:
+        vec = [0.0] * self.dimensions
+        words = self._WORD_RE.findall(text.lower())
+        features = words + [f"{a} {b}" for a, b in zip(words, words[1:])]
+        for feature in features:
+            digest = hashlib.blake2b(feature.encode("utf-8"), digest_size=8).digest()
+            bucket = int.from_bytes(digest[:4], "little") % self.dimensions
+            vec[bucket] += 1.0 if digest[4] & 1 else -1.0
+        norm = math.sqrt(sum(v * v for v in vec)) or 1.0
+        return [v / norm for v in vec]
+
+    def embed(self, texts: List[str]) -> List[List[float]]:
+        return [self._vector(t) for t in texts]
+
+
+def create_backend(name: str = EMBEDDING_BACKEND) -> EmbeddingBackend:
+    if name == "chroma-default":
+        return ChromaDefaultBackend()
+    if name == "sentence-transformers":
+        return SentenceTransformerBackend()
+    if name == "hashing":
+        return HashingBackend()
+    raise ValueError(f"Unknown EMBEDDING_BACKEND: {name}")
+
+
+# =========================================================
+# PERSISTENT CACHE
+# =========================================================
+class EmbeddingCache:
+    """SQLite map of sha256(backend name + text) -> float32 vector, LRU-bounded."""
+
+    def __init__(self, path: str = EMBEDDING_CACHE_PATH, max_entries: int = EMBEDDING_CACHE_MAX_ENTRIES):
+        if path != ":memory:":
+            os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        self.max_entries = max_entries
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._lock = threading.Lock()
+        with self._lock:
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS embeddings ("
+                "key TEXT PRIMARY KEY, vector BLOB NOT NULL, last_used REAL NOT NULL)"
+            )
+            self._conn.execute(
+                "CREATE INDEX IF NOT EXISTS embeddings_last_used ON embeddings (last_used)"
+            )
+            self._conn.commit()
+
+    @staticmethod
+    def key(backend_name: str, text: str) -> str:
+        return hashlib.sha256(f"{backend_name}\x00{text}".encode("utf-8")).hexdigest()
+
+    def get_many(self, keys: List[str]) -> dict:
+        found = {}
+        with self._lock:
+            # stay under SQLite's bound-parameter limit
+            for i in range(0, len(keys), 500):
+                batch = keys[i:i + 500]
+                marks = ",".join("?" * len(batch))
+                for key, blob in self._conn.execute(
+                    f"SELECT key, vector FROM embeddings WHERE key IN ({marks})", batch
+                ):
+                    found[key] = array("f", blob).tolist()
+                if found:
+                    self._conn.execute(
+                        f"UPDATE embeddings SET last_used = ? WHERE key IN ({marks})",
+                        [time.time(), *batch]
+                    )
+            self._conn.commit()
+        return found
+
+    def put_many(self, items: dict):
+        now = time.time()
+        with self._lock:
+            self._conn.executemany(
+                "INSERT OR REPLACE INTO embeddings (key, vector, last_used) VALUES (?, ?, ?)",
+                [(k, array("f", v).tobytes(), now) for k, v in items.items()]
+            )
+            overflow = self._conn.execute("SELECT COUNT(*) FROM embeddings").fetchone()[0] - self.max_entries
+            if overflow > 0:
+                self._conn.execute(
+                    "DELETE FROM embeddings WHERE key IN "
+                    "(SELECT key FROM embeddings ORDER BY last_used LIMIT ?)",
+                    (overflow,)
+                )
+            self._conn.commit()
+
+
+# =========================================================
+# EMBEDDER (batching + cache + throughput)
+# =========================================================
+class Embedder:
+    def __init__(
+        self,
+        backend: EmbeddingBackend,
+        batch_size: int = EMBEDDING_BATCH_SIZE,
+        cache: Optional[EmbeddingCache] = None,
+    ):
+        self.backend = backend
+        self.batch_size = max(1, batch_size)
+        self.cache = cache
+        self._lock = threading.Lock()
+
+        self.texts_embedded = 0
+        self.embed_seconds = 0.0
+        self.cache_hits = 0
+        self.cache_misses = 0
+
+    @property
+    def name(self) -> str:
+        return self.backend.name
+
+    def embed(self, texts: List[str]) -> List[List[float]]:
+        vectors: List[Optional[List[float]]] = [None] * len(texts)
+
+        keys = []
+        if self.cache is not None:
+            keys = [EmbeddingCache.key(self.name, t) for t in texts]
+            cached = self.cache.get_many(list(set(keys)))
+            for i, key in enumerate(keys):
+                vectors[i] = cached.get(key)
+
+        # embed each distinct missing text once
+        missing: dict = {}
+        for i, v in enumerate(vectors):
+            if v is None:
+                missing.setdefault(texts[i], []).append(i)
+        with self._lock:
+            self.cache_hits += len(texts) - sum(len(ix) for ix in missing.values())
+            self.cache_misses += len(missing)
+
+        pending = list(missing)
+        fresh = {}
+        for start in range(0, len(pending), self.batch_size):
+            batch = pending[start:start + self.batch_size]
+            t0 = time.perf_counter()
+            out = self.backend.embed(batch)
+            elapsed = time.perf_counter() - t0
+            with self._lock:
+                self.texts_embedded += len(batch)
+                self.embed_seconds += elapsed
+            for text, vec in zip(batch, out):
+                for i in missing[text]:
+                    vectors[i] = vec
+                if keys:
+                    fresh[keys[missing[text][0]]] = vec
+
+        if fresh:
+            self.cache.put_many(fresh)
+        return vectors
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "backend": self.name,
+                "batch_size": self.batch_size,
+                "texts_embedded": self.texts_embedded,
+                "embed_seconds": round(self.embed_seconds, 3),
+                "chunks_per_second": (
+                    round(self.texts_embedded / self.embed_seconds, 1) if self.embed_seconds else None
+                ),
+                "cache_hits": self.cache_hits,
+                "cache_misses": self.cache_misses,
+            }
+
+
+def create_embedder(name: str = EMBEDDING_BACKEND, cache: bool = True) -> Embedder:
+    return Embedder(create_backend(name), cache=EmbeddingCache() if cache else None)
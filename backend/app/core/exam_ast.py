@@ -0,0 +1,314 @@
+"""
+Structured form of a generated exam.
+
+parse_exam() reads the cleaned LLM text once, line by line, with the
+patterns below and returns an ExamAST:
+
+    ExamAST
+      questions: [Section]            before "=== ANSWER KEY ==="
+      answers:   [Section]            after it (same shape)
+    Section (name None = text outside any "SECTION X" heading)
+      blocks: [Block]                 one per question-type heading
+    Block (qtype: mcqs | shorts | longs | scenarios | tasks | None)
+      items: [Item]
+    Item (kind: question | task)
+      number, marks, text, options, scenario, task
+
+Every node keeps its [start, end) line span in the exam text, so consumers
+(downloads, regeneration, the frontend) can cut or patch the original text
+without parsing it again. The AST is stored as JSON with the exam
+(GeneratedExam.structure); PARSER_VERSION marks stored trees to re-parse
+when this parser changes.
+"""
+import re
+from dataclasses import asdict, dataclass, field
+from typing import Any, Dict, List, Optional
+
+PARSER_VERSION = 1
+
+QUESTION_TYPE_HEADINGS = (
+    ('Multiple Choice', 'mcqs'),
+    ('Short Answer', 'shorts'),
+    ('Long Answer', 'longs'),
+    ('Scenario', 'scenarios'),
+)
+
+ANSWER_KEY_RE = re.compile(r"^\s*={2,}\s*ANSWER KEY\s*={2,}\s*$", re.IGNORECASE)
+SECTION_RE = re.compile(r"^SECTION\s+([A-Za-z0-9]+)\b")
+TASK_HEADER_RE = re.compile(r"\s*(Task\s+(\d+)[^:]*:)")
+NUMBERED_ITEM_RE = re.compile(r"\s*(\d+)\s*[.)]")
+OPTION_RE = re.compile(r"\s*\(?([A-Ha-h])\s*[).]\s+(.*)$")
+# "Scenario: ..." / "Task: ..." lines belong to a question, they are not headings
+ITEM_LABEL_RE = re.compile(r"\s*(Scenario|Task|Question)\s*:\s*(.*)$", re.IGNORECASE)
+MARKS_RE = re.compile(r"(\d+)\s*marks?\b", re.IGNORECASE)
+TOTAL_MARKS_RE = re.compile(r"TOTAL\s+MARKS\s*[:=]\s*(\d+)", re.IGNORECASE)
+
+
+def section_heading(line: str) -> Optional[str]:
+    """'SECTION B: TOTAL MARKS = 20' -> 'SECTION B'; None for other lines."""
+    if line.startswith('SECTION'):
+        return line.split(':')[0].strip()
+    return None
+
+
+def question_type_heading(line: str, in_section: bool = True) -> Optional[str]:
+    """'Short Answer Questions (10 marks)' -> 'shorts'; None for other lines."""
+    if ITEM_LABEL_RE.match(line):
+        return None
+    for marker, qtype in QUESTION_TYPE_HEADINGS:
+        if marker in line:
+            # scenario blocks are only recognised inside a SECTION
+            return qtype if qtype != 'scenarios' or in_section else None
+    return None
+
+
+def _marks(line: str) -> Optional[int]:
+    m = TOTAL_MARKS_RE.search(line) or MARKS_RE.search(line)
+    return int(m.group(1)) if m else None
+
+
+# =========================================================
+# NODES
+# =========================================================
+@dataclass
+class Option:
+    label: str
+    text: str
+
+
+@dataclass
+class Item:
+    kind: str                       # "question" | "task"
+    number: int
+    text: str
+    start: int
+    end: int = 0
+    marks: Optional[int] = None
+    options: List[Option] = field(default_factory=list)
+    scenario: Optional[str] = None
+    task: Optional[str] = None
+
+
+@dataclass
+class Block:
+    qtype: Optional[str]            # mcqs | shorts | longs | scenarios | tasks | None
+    heading: Optional[str]
+    start: int
+    marks: Optional[int] = None
+    items: List[Item] = field(default_factory=list)
+
+
+@dataclass
+class Section:
+    name: Optional[str]             # "A", "B", ... or None outside SECTION headings
+    heading: Optional[str]
+    start: int
+    end: int = 0
+    marks: Optional[int] = None
+    blocks: List[Block] = field(default_factory=list)
+
+    def items(self) -> List[Item]:
+        return [item for block in self.blocks for item in block.items]
+
+
+@dataclass
+class ExamAST:
+    exam_type: str
+    line_count: int
+    total_marks: Optional[int] = None
+    answer_key_line: Optional[int] = None      # line of "=== ANSWER KEY ===", if any
+    preamble: List[str] = field(default_factory=list)
+    questions: List[Section] = field(default_factory=list)
+    answers: List[Section] = field(default_factory=list)
+    version: int = PARSER_VERSION
+
+    def to_dict(self) -> Dict[str, Any]:
+        return asdict(self)
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> "ExamAST":
+        def item(d):
+            return Item(**{**d, "options": [Option(**o) for o in d.get("options", [])]})
+
+        def block(d):
+            return Block(**{**d, "items": [item(i) for i in d.get("items", [])]})
+
+        def section(d):
+            return Section(**{**d, "blocks": [block(b) for b in d.get("blocks", [])]})
+
+        return cls(**{
+            **data,
+            "questions": [section(s) for s in data.get("questions", [])],
+            "answers": [section(s) for s in data.get("answers", [])],
+        })
+
+    def find(
+        self,
+        part: str = "questions",
+        section: Optional[str] = None,
+        qtype: Optional[str] = None,
+        number: Optional[int] = None,
+        kind: str = "question",
+    ) -> List[Any]:
+        """
+        Sections (number None, kind "section") or items matching the locator in
+        the questions or answers part.
+        """
+        sections = self.answers if part == "answers" else self.questions
+        if kind == "section":
+            return [s for s in sections if s.name is not None and (section is None or s.name == section)]
+        found = []
+        for s in sections:
+            if section is not None and s.name != section:
+                continue
+            for b in s.blocks:
+                if qtype is not None and b.qtype != qtype:
+                    continue
+                found += [i for i in b.items if i.kind == kind and (number is None or i.number == number)]
+        return found
+
+
+def load_structure(data: Optional[Dict[str, Any]]) -> Optional[ExamAST]:
+    """Stored JSON -> ExamAST, or None if missing / written by an older parser."""
+    if not data or data.get("version") != PARSER_VERSION:
+        return None
+    return ExamAST.from_dict(data)
+
+
+# =========================================================
+# PARSER
+# =========================================================
+def parse_exam(content: str, exam_type: str = "") -> ExamAST:
+    lines = content.splitlines()
+    ast = ExamAST(exam_type=exam_type, line_count=len(lines))
+    sections = ast.questions
+    section: Optional[Section] = None
+    block: Optional[Block] = None
+    item: Optional[Item] = None
+    label: Optional[str] = None          # "scenario" / "task" while such a label's text continues
+    last_text = -1                       # last non-blank line, for node ends
+
+    def close_item():
+        nonlocal item, label
+        if item is not None:
+            item.end = last_text + 1
+        item, label = None, None
+
+    def close_section():
+        nonlocal section, block
+        close_item()
+        if section is not None:
+            section.end = max(last_text + 1, section.start + 1)
+        section, block = None, None
+
+    def current_block(qtype: Optional[str], start: int) -> Block:
+        nonlocal section, block
+        if section is None:
+            section = Section(name=None, heading=None, start=start)
+            sections.append(section)
+        if block is None:
+            block = Block(qtype=qtype, heading=None, start=start)
+            section.blocks.append(block)
+        return block
+
+    for i, line in enumerate(lines):
+        stripped = line.strip()
+        if not stripped:
+            continue
+
+        if ANSWER_KEY_RE.match(stripped) or '=== ANSWER KEY ===' in stripped:
+            close_section()
+            ast.answer_key_line = i
+            sections = ast.answers
+            last_text = i
+            continue
+
+        heading = section_heading(stripped)
+        task_header = None if heading else TASK_HEADER_RE.match(line)
+        numbered = None if heading or task_header else NUMBERED_ITEM_RE.match(stripped)
+        # numbered lines inside an assignment task are part of its text
+        if numbered and item is not None and item.kind == "task":
+            numbered = None
+        item_label = ITEM_LABEL_RE.match(stripped)
+        qtype = None
+        if not (heading or task_header or numbered):
+            qtype = question_type_heading(stripped, in_section=section is not None and section.name is not None)
+
+        if heading:
+            close_section()
+            name = SECTION_RE.match(heading)
+            section = Section(
+                name=(name.group(1) if name else heading).upper(),
+                heading=stripped,
+                start=i,
+                marks=_marks(stripped),
+            )
+            sections.append(section)
+            # quiz layout: "SECTION A – Multiple Choice Questions (1 mark each)"
+            section_qtype = question_type_heading(stripped)
+            if section_qtype:
+                block = Block(qtype=section_qtype, heading=stripped, start=i, marks=_marks(stripped))
+                section.blocks.append(block)
+
+        elif task_header:
+            close_item()
+            rest = line[task_header.end():].strip()
+            item = Item(
+                kind="task",
+                number=int(task_header.group(2)),
+                text=rest,
+                start=i,
+                marks=_marks(task_header.group(1)),
+            )
+            if block is not None and block.qtype != "tasks":
+                block = None
+            current_block("tasks", i).items.append(item)
+
+        elif numbered:
+            close_item()
+            text = stripped[numbered.end():].strip()
+            item = Item(kind="question", number=int(numbered.group(1)), text=text, start=i)
+            sub = ITEM_LABEL_RE.match(text)
+            if sub:
+                label = sub.group(1).lower()
+                setattr(item, "task" if label in ("task", "question") else "scenario", sub.group(2))
+                item.text = ""
+            current_block(None, i).items.append(item)
+
+        elif qtype:
+            close_item()
+            if section is None:
+                section = Section(name=None, heading=None, start=i)
+                sections.append(section)
+            block = Block(qtype=qtype, heading=stripped, start=i, marks=_marks(stripped))
+            section.blocks.append(block)
+
+        elif item is not None and item_label:
+            name, text = item_label.group(1).lower(), item_label.group(2)
+            label = "task" if name in ("task", "question") else "scenario"
+            setattr(item, label, text)
+
+        elif item is not None and item.kind == "question" and not label and OPTION_RE.match(stripped):
+            option = OPTION_RE.match(stripped)
+            item.options.append(Option(label=option.group(1).upper(), text=option.group(2)))
+
+        elif item is not None:
+            # continuation of the current question / task / label
+            if label:
+                setattr(item, label, f"{getattr(item, label)}\n{stripped}".strip())
+            elif item.options:
+                item.options[-1].text += f"\n{stripped}"
+            else:
+                item.text = f"{item.text}\n{stripped}".strip()
+
+        else:
+            total = TOTAL_MARKS_RE.search(stripped)
+            if total and ast.total_marks is None and sections is ast.questions:
+                ast.total_marks = int(total.group(1))
+            if section is None and sections is ast.questions:
+                ast.preamble.append(stripped)
+
+        last_text = i
+
+    close_section()
+    return ast
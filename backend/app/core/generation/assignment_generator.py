@@ -1,40 +1,12 @@
 # app/core/generation/assignment_generator.py
 
-def build_assignment_prompt(
-    lecture_context: str,
-    ui_prompt: str,
-    teacher_prompt: str,
-    num_documents: int,
-) -> str:
-    """
-    Build the final LLM prompt for ASSIGNMENT generation.
+from .prompt_registry import prompt_registry
 
-    - Uses ui_prompt (built by Angular) for exact counts, marks & Bloom level
-    - Forces real-world scenarios
-    - Forces equal-ish distribution across multiple lecture files
-    """
-
-    multi_doc_block = ""
-    if num_documents > 1:
-        multi_doc_block = f"""
-━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━
-MULTI-DOCUMENT CONTENT USE (MANDATORY)
-━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━
-- You have {num_documents} lecture documents in <LECTURE_CONTEXT>.
-- Distribute tasks across ALL documents, do NOT base everything on just one.
-- Each task's technical content must be traceable to some part of the lectures.
-"""
-
-    teacher_block = ""
-    if teacher_prompt.strip():
-        teacher_block = f"""
-━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━
-TEACHER INSTRUCTIONS (HIGH PRIORITY, BUT CANNOT BREAK COUNTS/MARKS):
-━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━
-{teacher_prompt.strip()}
-"""
 
-    return f"""You are an expert university teacher creating a graded ASSIGNMENT.
+# Static instructions first, request-specific parts last (see prompt_registry).
+ASSIGNMENT_PROMPT = prompt_registry.register(
+    "assignment",
+    prefix="""You are an expert university teacher creating a graded ASSIGNMENT.
 
 Follow ALL configuration rules from the UI EXACTLY:
 - Exact number of TOTAL tasks and SCENARIO tasks
@@ -60,27 +32,6 @@ ASSIGNMENT HEADING & MARKS (STRICT)
 - Each task must show marks in parentheses, e.g. "Task 1 (8 marks): ..."
 - The sum of all individual task marks MUST equal TOTAL MARKS.
 
-LECTURE CONTEXT (ONLY SOURCE OF TECHNICAL CONTENT)
-<LECTURE_CONTEXT>
-{lecture_context}
-</LECTURE_CONTEXT>
-
-{multi_doc_block}
-
-CONFIGURATION FROM UI (OBEY STRICTLY)
-Below is a structured description of:
-- number of tasks,
-- number of scenario tasks,
-- total marks,
-- scenario marks,
-- remaining marks for regular tasks,
-- Bloom level and difficulty,
-and example output structure.
-
-{ui_prompt}
-
-{teacher_block}
-
 OUTPUT FORMAT (STRICT)
 1. First line: ASSIGNMENT
 2. Second line: TOTAL MARKS: <total marks>
@@ -109,4 +60,68 @@ BEFORE YOU OUTPUT, DOUBLE-CHECK:
 - Number of scenario tasks == SCENARIO_TASKS.
 - Sum of all task marks == TOTAL_MARKS.
 - All tasks use the configured GLOBAL_BLOOM_LEVEL.
+""",
+    suffix="""
+{multi_doc_block}
+CONFIGURATION FROM UI (OBEY STRICTLY)
+Below is a structured description of:
+- number of tasks,
+- number of scenario tasks,
+- total marks,
+- scenario marks,
+- remaining marks for regular tasks,
+- Bloom level and difficulty,
+and example output structure.
+
+{ui_prompt}
+
+{teacher_block}
+
+LECTURE CONTEXT (ONLY SOURCE OF TECHNICAL CONTENT)
+<LECTURE_CONTEXT>
+{lecture_context}
+</LECTURE_CONTEXT>
+""",
+)
+
+
+def build_assignment_prompt(
+    lecture_context: str,
+    ui_prompt: str,
+    teacher_prompt: str,
+    num_documents: int,
+) -> str:
+    """
+    Build the final LLM prompt for ASSIGNMENT generation.
+
+    - Uses ui_prompt (built by Angular) for exact counts, marks & Bloom level
+    - Forces real-world scenarios
+    - Forces equal-ish distribution across multiple lecture files
+    """
+
+    multi_doc_block = ""
+    if num_documents > 1:
+        multi_doc_block = f"""
+━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━
+MULTI-DOCUMENT CONTENT USE (MANDATORY)
+━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━
+- You have {num_documents} lecture documents in <LECTURE_CONTEXT>.
+- Distribute tasks across ALL documents, do NOT base everything on just one.
+- Each task's technical content must be traceable to some part of the lectures.
 """
+
+    teacher_block = ""
+    if teacher_prompt.strip():
+        teacher_block = f"""
+━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━
+TEACHER INSTRUCTIONS (HIGH PRIORITY, BUT CANNOT BREAK COUNTS/MARKS):
+━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━
+{teacher_prompt.strip()}
+"""
+
+    return ASSIGNMENT_PROMPT.render(
+        multi_doc_block=multi_doc_block,
+        ui_prompt=ui_prompt,
+        teacher_block=teacher_block,
+        lecture_context=lecture_context,
+    )
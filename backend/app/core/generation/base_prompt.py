@@ -1,7 +1,5 @@
 # app/core/generation/base_prompt.py
 
-from typing import Optional
-
 
 def build_base_prompt(
     *,
@@ -1,26 +1,12 @@
 # app/core/generation/midfinal_generator.py
 
-def build_midfinal_prompt(
-    ui_prompt: str,
-    lecture_context: str,
-    teacher_prompt: str = ""
-) -> str:
-    """
-    Build the FINAL LLM prompt for MID / FINAL exams.
+from .prompt_registry import prompt_registry
 
-    - Uses SECTION A / B / C...
-    - Inside each section:
-        Multiple Choice Questions (<total MCQ marks> marks)
-        Short Answer Questions (<total short marks> marks)
-        Long Answer Questions (<total long marks> marks)
-        Scenarios (<total scenario marks> marks)
-      (skip the block completely if that type has 0 questions)
 
-    - NO marks after individual questions, only in the headings.
-    """
-
-    prompt = f"""
-You are a precise university MID/FINAL exam generator. Follow EVERY rule exactly.
+# Static instructions first, request-specific parts last (see prompt_registry).
+MIDFINAL_PROMPT = prompt_registry.register(
+    "midfinal",
+    prefix="""You are a precise university MID/FINAL exam generator. Follow EVERY rule exactly.
 
 ──────────────── GLOBAL RULES ────────────────
 1. Use ONLY the lecture content given in <LECTURE_CONTEXT> for concepts, formulas and facts.
@@ -66,30 +52,6 @@ For each SECTION:
     3.
     ...
 
-──────────────── LECTURE CONTEXT (ONLY SOURCE OF CONTENT) ────────────────
-{lecture_context}
-──────────────── END CONTEXT ─────────────────────────────────────────────
-
-──────────────── UI CONFIG FROM TEACHER ────────────────
-The following text is the raw configuration sent from the frontend
-(counts, blooms, marks per question, and section info).
-Use it EXACTLY as specification of how many questions to generate
-and what marks/Bloom level each type has:
-
-{ui_prompt}
-──────────────── END CONFIG ────────────────────────────
-"""
-
-    if teacher_prompt.strip():
-        prompt += f"""
-
-ADDITIONAL TEACHER INSTRUCTIONS
-(Apply these as long as they do NOT break the rules above):
-{teacher_prompt}
-"""
-
-    prompt += """
-
 Before you output, mentally verify FOR EACH SECTION:
 - MCQ count exactly matches config.
 - Short, Long, Scenario counts exactly match config.
@@ -135,7 +97,54 @@ Short Answer Questions
 
 [Continue for all sections and types in correct order]
 
+""",
+    suffix="""──────────────── UI CONFIG FROM TEACHER ────────────────
+The following text is the raw configuration sent from the frontend
+(counts, blooms, marks per question, and section info).
+Use it EXACTLY as specification of how many questions to generate
+and what marks/Bloom level each type has:
+
+{ui_prompt}
+──────────────── END CONFIG ────────────────────────────
+{teacher_block}
+──────────────── LECTURE CONTEXT (ONLY SOURCE OF CONTENT) ────────────────
+{lecture_context}
+──────────────── END CONTEXT ─────────────────────────────────────────────
+
 Now generate the complete mid/final exam.
-""".lstrip()
+""",
+)
+
+
+def build_midfinal_prompt(
+    ui_prompt: str,
+    lecture_context: str,
+    teacher_prompt: str = ""
+) -> str:
+    """
+    Build the FINAL LLM prompt for MID / FINAL exams.
+
+    - Uses SECTION A / B / C...
+    - Inside each section:
+        Multiple Choice Questions (<total MCQ marks> marks)
+        Short Answer Questions (<total short marks> marks)
+        Long Answer Questions (<total long marks> marks)
+        Scenarios (<total scenario marks> marks)
+      (skip the block completely if that type has 0 questions)
+
+    - NO marks after individual questions, only in the headings.
+    """
+
+    teacher_block = ""
+    if teacher_prompt.strip():
+        teacher_block = f"""
+ADDITIONAL TEACHER INSTRUCTIONS
+(Apply these as long as they do NOT break the rules above):
+{teacher_prompt}
+"""
 
-    return prompt
+    return MIDFINAL_PROMPT.render(
+        ui_prompt=ui_prompt,
+        teacher_block=teacher_block,
+        lecture_context=lecture_context,
+    )
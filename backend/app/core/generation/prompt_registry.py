@@ -0,0 +1,92 @@
+"""
+Versioned prompt templates.
+
+Every generation prompt is a PromptTemplate: a static prefix (role, rules,
+output format) followed by a dynamic suffix with {placeholders} for the
+lecture context, the UI configuration and teacher notes. Keeping everything
+that changes per request AFTER the fixed instructions means consecutive
+calls share a long identical prefix, which the provider's prompt cache can
+reuse (and which is only tokenized once here, at compile time).
+
+Each template's version is a short hash of its text, so a stored exam can
+say exactly which prompt produced it ("exam@3f9c2a1b7d04").
+
+    QUIZ_PROMPT = prompt_registry.register("quiz", prefix=..., suffix="...{lecture_context}")
+    text = QUIZ_PROMPT.render(lecture_context=context, ...)
+"""
+import hashlib
+import logging
+import threading
+from string import Formatter
+from typing import Dict, Optional
+
+from app.core.tokenizer import count_tokens
+
+logger = logging.getLogger(__name__)
+
+
+class PromptTemplate:
+    def __init__(self, name: str, prefix: str, suffix: str, system: str = ""):
+        self.name = name
+        self.system = system          # system message sent with the prompt, if any
+        self.prefix = prefix
+        self.suffix = suffix
+        self.fields = tuple(sorted({f for _, f, _, _ in Formatter().parse(suffix) if f}))
+        digest = hashlib.sha256(f"{name}\0{system}\0{prefix}\0{suffix}".encode("utf-8")).hexdigest()
+        self.version = f"{name}@{digest[:12]}"
+        self.prefix_tokens: Optional[int] = None
+        self.renders = 0
+        self._lock = threading.Lock()
+
+    def compile(self):
+        """Tokenize the static part (system message + prefix) once."""
+        if self.prefix_tokens is None:
+            self.prefix_tokens = count_tokens(self.system) + count_tokens(self.prefix)
+
+    def render(self, **values) -> str:
+        with self._lock:
+            self.renders += 1
+        return self.prefix + self.suffix.format(**values)
+
+    def count_tokens(self, **values) -> int:
+        """Tokens sent for render(**values), system message included; only the suffix is tokenized."""
+        self.compile()
+        return self.prefix_tokens + count_tokens(self.suffix.format(**values))
+
+
+class PromptRegistry:
+    def __init__(self):
+        self._templates: Dict[str, PromptTemplate] = {}
+
+    def register(self, name: str, prefix: str, suffix: str, system: str = "") -> PromptTemplate:
+        template = PromptTemplate(name, prefix, suffix, system)
+        existing = self._templates.get(name)
+        if existing is not None and existing.version != template.version:
+            raise ValueError(f"Prompt template '{name}' is already registered with different text")
+        self._templates[name] = template
+        return template
+
+    def get(self, name: str) -> PromptTemplate:
+        return self._templates[name]
+
+    def compile(self):
+        """Tokenize all static prefixes (run once at startup)."""
+        for template in self._templates.values():
+            template.compile()
+        logger.info("Prompts: %s", ", ".join(
+            f"{t.version} ({t.prefix_tokens} prefix tokens)" for t in self._templates.values()
+        ))
+
+    def stats(self) -> dict:
+        return {
+            name: {
+                "version": t.version,
+                "prefix_tokens": t.prefix_tokens,
+                "fields": list(t.fields),
+                "renders": t.renders,
+            }
+            for name, t in self._templates.items()
+        }
+
+
+prompt_registry = PromptRegistry()
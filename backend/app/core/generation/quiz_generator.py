@@ -1,42 +1,13 @@
 # backend/app/core/generation/quiz_generator.py
 from textwrap import dedent
 
+from .prompt_registry import prompt_registry
 
-def build_quiz_prompt(
-    lecture_context: str,
-    ui_prompt: str,
-    teacher_prompt: str,
-    num_documents: int,
-) -> str:
-    """
-    Build a QUIZ-only prompt.
-
-    - Uses the UI configuration string (ui_prompt)
-    - Uses all lecture documents fairly
-    - Forces clear sections + TOTAL MARKS line
-    - **STRICT**: never generate question types that are not in ui_prompt
-    """
-
-    teacher_block = ""
-    if teacher_prompt.strip():
-        teacher_block = f"""
-━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━
-TEACHER INSTRUCTIONS (FOLLOW BUT DO NOT VIOLATE COUNTS / BLOOM):
-━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━
-{teacher_prompt.strip()}
-"""
-
-    # NOTE:
-    # - ui_prompt already contains lines like:
-    #   MCQs: EXACTLY N questions (Count: N)
-    #   Short Questions: EXACTLY M questions (Count: M)
-    #   ...
-    #   and it only includes a block if N/M/... > 0
-    #
-    # We force the model to treat "Count: X" as the ONLY truth, and
-    # to treat MISSING blocks as "0 → do not generate that type".
 
-    return dedent(f"""
+# Static instructions first, request-specific parts last (see prompt_registry).
+QUIZ_PROMPT = prompt_registry.register(
+    "quiz",
+    prefix=dedent("""
     You are a university-level QUIZ generator.
 
     ROLE:
@@ -44,22 +15,8 @@ TEACHER INSTRUCTIONS (FOLLOW BUT DO NOT VIOLATE COUNTS / BLOOM):
     - You are NOT generating an assignment, midterm, or final.
     - You MUST follow the UI configuration EXACTLY.
 
-    ━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━
-    LECTURE CONTENT (ONLY SOURCE OF FACTS)
-    ━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━
-    {lecture_context}
-    ━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━
-    END OF LECTURE CONTENT
-    ━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━
-
-    ━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━
-    QUIZ CONFIGURATION FROM UI (OBEY EXACTLY)
-    ━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━
-    {ui_prompt}
-    {teacher_block}
-
     STRICT INTERPRETATION OF CONFIG:
-    - From the configuration text above, read the lines that start with:
+    - From the QUIZ CONFIGURATION below, read the lines that start with:
         "MCQs:", "Short Questions:", "Long Questions:", "Scenario Questions:".
     - For EACH type:
         • If such a line exists, read "Count: X" and set that type's COUNT = X.
@@ -156,4 +113,60 @@ TEACHER INSTRUCTIONS (FOLLOW BUT DO NOT VIOLATE COUNTS / BLOOM):
       required exam sections and the answer key.
     - Use only the lecture content as the factual basis.
     - Use the Bloom levels and difficulty exactly as described in the configuration.
-    """).strip()
+    """).lstrip(),
+    suffix=dedent("""
+    ━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━
+    QUIZ CONFIGURATION FROM UI (OBEY EXACTLY)
+    ━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━
+    {ui_prompt}
+    {teacher_block}
+    ━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━
+    LECTURE CONTENT (ONLY SOURCE OF FACTS)
+    ━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━
+    {lecture_context}
+    ━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━
+    END OF LECTURE CONTENT
+    ━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━
+    """),
+)
+
+
+def build_quiz_prompt(
+    lecture_context: str,
+    ui_prompt: str,
+    teacher_prompt: str,
+    num_documents: int,
+) -> str:
+    """
+    Build a QUIZ-only prompt.
+
+    - Uses the UI configuration string (ui_prompt)
+    - Uses all lecture documents fairly
+    - Forces clear sections + TOTAL MARKS line
+    - **STRICT**: never generate question types that are not in ui_prompt
+    """
+
+    teacher_block = ""
+    if teacher_prompt.strip():
+        teacher_block = f"""
+━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━
+TEACHER INSTRUCTIONS (FOLLOW BUT DO NOT VIOLATE COUNTS / BLOOM):
+━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━
+{teacher_prompt.strip()}
+"""
+
+    # NOTE:
+    # - ui_prompt already contains lines like:
+    #   MCQs: EXACTLY N questions (Count: N)
+    #   Short Questions: EXACTLY M questions (Count: M)
+    #   ...
+    #   and it only includes a block if N/M/... > 0
+    #
+    # We force the model to treat "Count: X" as the ONLY truth, and
+    # to treat MISSING blocks as "0 → do not generate that type".
+
+    return QUIZ_PROMPT.render(
+        ui_prompt=ui_prompt,
+        teacher_block=teacher_block,
+        lecture_context=lecture_context,
+    ).strip()
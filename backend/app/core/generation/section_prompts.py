@@ -0,0 +1,131 @@
+# app/core/generation/section_prompts.py
+"""
+Split a MID/FINAL UI prompt into one prompt per SECTION, and merge the
+per-section outputs back into one exam.
+
+The frontend builds the mid/final prompt as:
+  header / rules
+  SECTION A: TOTAL MARKS = n      <- config block per section
+  OUTPUT FORMAT ...
+  SECTION A: TOTAL MARKS: n       <- format block per section
+  === ANSWER KEY ===
+  SECTION A                       <- answer-key block per section
+  VERIFICATION CHECKLIST
+  - Section A: ...                <- checklist lines per section
+  multi-document / teacher notes
+
+A section prompt keeps every global line plus only that section's blocks.
+"""
+import re
+from typing import List, Tuple
+
+ANSWER_KEY_MARKER = "=== ANSWER KEY ==="
+
+_SECTION_LINE_RE = re.compile(r"^SECTION\s+([A-Za-z0-9]+)\b(.*)$")
+# a SECTION heading in model output, possibly wrapped in markdown
+_OUTPUT_SECTION_RE = re.compile(r"^[#*\s]*SECTION\s+[A-Za-z0-9]+", re.MULTILINE)
+_SECTION_CONFIG_RE = re.compile(r"^SECTION\s+([A-Za-z0-9]+)\s*:\s*TOTAL MARKS\s*=", re.MULTILINE)
+_CHECKLIST_LINE_RE = re.compile(r"^-\s*Section\s+([A-Za-z0-9]+)\s*:")
+# upper-case headings that end the current section block
+_GLOBAL_HEADING_RE = re.compile(r"^(===.*===|[A-Z][A-Z0-9 /&()\-]{3,}:?)$")
+_RULE_RE = re.compile(r"^[━─=\-]{10,}$")
+_SECTION_COUNT_RE = re.compile(r"NUMBER_OF_SECTIONS:\s*\d+")
+
+
+def section_names(ui_prompt: str) -> List[str]:
+    """Section names in the order the config lists them (empty if not sectioned)."""
+    names = []
+    for name in _SECTION_CONFIG_RE.findall(ui_prompt):
+        if name not in names:
+            names.append(name)
+    return names
+
+
+def _line_owners(lines: List[str]) -> List[str | None]:
+    """Section that owns each line, or None for lines shared by all sections."""
+    owners: List[str | None] = []
+    owner = None
+    for i, line in enumerate(lines):
+        stripped = line.strip()
+
+        section = _SECTION_LINE_RE.match(stripped)
+        checklist = _CHECKLIST_LINE_RE.match(stripped)
+        if section:
+            owner = section.group(1)
+            owners.append(owner)
+        elif checklist:
+            owners.append(checklist.group(1))
+        elif _RULE_RE.match(stripped):
+            # a rule line belongs to the heading it closes, else to the one it opens
+            if i and _GLOBAL_HEADING_RE.match(lines[i - 1].strip()):
+                owners.append(None)
+                continue
+            nxt = next((l.strip() for l in lines[i + 1:] if l.strip() and not _RULE_RE.match(l.strip())), "")
+            nxt_section = _SECTION_LINE_RE.match(nxt)
+            if nxt_section:
+                owners.append(nxt_section.group(1))
+            elif _GLOBAL_HEADING_RE.match(nxt):
+                owners.append(None)
+            else:
+                owners.append(owner)
+        elif _GLOBAL_HEADING_RE.match(stripped):
+            owner = None
+            owners.append(None)
+        else:
+            owners.append(owner)
+    return owners
+
+
+def split_section_prompts(ui_prompt: str) -> List[Tuple[str, str]]:
+    """
+    [(section name, prompt for that section only), ...] in exam order.
+    Returns [] when the prompt has fewer than two sections.
+    """
+    names = section_names(ui_prompt)
+    if len(names) < 2:
+        return []
+
+    lines = ui_prompt.split("\n")
+    owners = _line_owners(lines)
+
+    prompts = []
+    for index, name in enumerate(names, start=1):
+        kept = [line for line, owner in zip(lines, owners) if owner is None or owner == name]
+        body = _SECTION_COUNT_RE.sub("NUMBER_OF_SECTIONS: 1", "\n".join(kept))
+        body = re.sub(r"\n{3,}", "\n\n", body)
+        prompts.append((name, f"""{body}
+
+PART {index} OF {len(names)}:
+- Generate ONLY SECTION {name}. The other sections are generated separately.
+- Output SECTION {name} questions, then "{ANSWER_KEY_MARKER}", then SECTION {name} answers.
+- To avoid repeating other sections, draw mainly on part {index} of {len(names)} of the lecture context (in order), using the rest only if needed."""))
+    return prompts
+
+
+def _from_section_heading(part: str, name: str) -> str:
+    """Drop any chatter before the first SECTION heading; add one if missing."""
+    m = _OUTPUT_SECTION_RE.search(part)
+    if m:
+        return part[m.start():].strip()
+    return f"SECTION {name}\n\n{part}"
+
+
+def merge_section_outputs(outputs: List[Tuple[str, str]]) -> str:
+    """
+    Merge [(section name, model output), ...] into one exam:
+    every section's questions, then one answer key with every section's
+    answers, in the layout app.core.exam_ast.parse_exam reads.
+    """
+    questions, answers = [], []
+    for name, text in outputs:
+        q_part, _, a_part = text.partition(ANSWER_KEY_MARKER)
+        q_part, a_part = q_part.strip(), a_part.strip()
+
+        questions.append(_from_section_heading(q_part, name))
+        if a_part:
+            answers.append(_from_section_heading(a_part, name))
+
+    merged = "\n\n".join(questions)
+    if answers:
+        merged += f"\n\n{ANSWER_KEY_MARKER}\n\n" + "\n\n".join(answers)
+    return merged
@@ -0,0 +1,295 @@
+"""
+Shared LLM client (Groq chat completions).
+
+Every generation call in the app goes through one LLMClient:
+
+- one pooled, keep-alive HTTP connection pool (httpx) for all calls
+- token buckets for requests/minute and tokens/minute, so bursts queue up
+  locally instead of coming back as 429s
+- jittered exponential backoff on 429 / 5xx / timeouts / connection errors,
+  honouring the provider's retry-after header
+- a timeout on every call
+- latency, retry and error counters for /api/metrics
+
+GROQ_BASE_URL (read by the Groq SDK) points the client at another
+OpenAI/Groq-compatible server, e.g. the local stub in benchmarks/tools.
+"""
+import asyncio
+import os
+import random
+import threading
+import time
+from collections import Counter, deque
+from typing import AsyncIterator, Optional
+
+import httpx
+from groq import (
+    APIConnectionError,
+    APIStatusError,
+    APITimeoutError,
+    AsyncGroq,
+    RateLimitError,
+)
+
+from app.core.tokenizer import count_tokens
+
+
+LLM_TIMEOUT_SECONDS = float(os.getenv("LLM_TIMEOUT_SECONDS", "120"))
+LLM_MAX_RETRIES = int(os.getenv("LLM_MAX_RETRIES", "4"))
+LLM_BACKOFF_BASE_SECONDS = float(os.getenv("LLM_BACKOFF_BASE_SECONDS", "1"))
+LLM_BACKOFF_MAX_SECONDS = float(os.getenv("LLM_BACKOFF_MAX_SECONDS", "30"))
+LLM_REQUESTS_PER_MINUTE = float(os.getenv("LLM_REQUESTS_PER_MINUTE", "30"))
+LLM_TOKENS_PER_MINUTE = float(os.getenv("LLM_TOKENS_PER_MINUTE", "0"))      # 0 = no token limit
+LLM_MAX_CONNECTIONS = int(os.getenv("LLM_MAX_CONNECTIONS", "20"))
+
+
+class TokenBucket:
+    """
+    Async token bucket: `rate_per_minute` units refill continuously up to
+    `rate_per_minute` capacity (one minute of burst). rate <= 0 disables it.
+    Callers are served in arrival order.
+    """
+
+    def __init__(self, rate_per_minute: float):
+        self.rate = rate_per_minute / 60.0
+        self.capacity = rate_per_minute
+        self._level = rate_per_minute
+        self._updated = time.monotonic()
+        self._lock = asyncio.Lock()
+
+    @property
+    def enabled(self) -> bool:
+        return self.rate > 0
+
+    def _refill(self):
+        now = time.monotonic()
+        self._level = min(self.capacity, self._level + (now - self._updated) * self.rate)
+        self._updated = now
+
+    async def acquire(self, amount: float = 1.0) -> float:
+        """Wait until `amount` units are available; returns seconds waited."""
+        if not self.enabled:
+            return 0.0
+        # a single call larger than the whole bucket would wait forever
+        amount = min(amount, self.capacity)
+        async with self._lock:
+            # reserve now (the level may go negative) and sleep off the debt
+            # outside the lock, so later callers queue behind us without blocking
+            self._refill()
+            self._level -= amount
+            delay = max(0.0, -self._level / self.rate)
+        if delay:
+            await asyncio.sleep(delay)
+        return delay
+
+    def rebind(self):
+        """Fresh lock for a new event loop (an asyncio.Lock belongs to one loop)."""
+        self._lock = asyncio.Lock()
+
+    def refund(self, amount: float):
+        if self.enabled and amount > 0:
+            self._refill()
+            self._level = min(self.capacity, self._level + amount)
+
+
+class LLMClient:
+    def __init__(
+        self,
+        api_key: Optional[str] = None,
+        timeout: float = LLM_TIMEOUT_SECONDS,
+        max_retries: int = LLM_MAX_RETRIES,
+        requests_per_minute: float = LLM_REQUESTS_PER_MINUTE,
+        tokens_per_minute: float = LLM_TOKENS_PER_MINUTE,
+        max_connections: int = LLM_MAX_CONNECTIONS,
+    ):
+        self.api_key = api_key or os.getenv("GROQ_API_KEY")
+        self.timeout = timeout
+        self.max_retries = max_retries
+        self.max_connections = max_connections
+        self.request_bucket = TokenBucket(requests_per_minute)
+        self.token_bucket = TokenBucket(tokens_per_minute)
+
+        self._client: Optional[AsyncGroq] = None
+        self._client_loop = None
+        self._client_owner: Optional[asyncio.Task] = None
+
+        self._lock = threading.Lock()
+        self._latencies = deque(maxlen=500)
+        self.calls = 0
+        self.retries = 0
+        self.errors: Counter = Counter()
+        self.throttled_seconds = 0.0
+        self.tokens_used = 0
+
+    # ------------------ CONNECTION POOL ------------------
+    @property
+    def client(self) -> AsyncGroq:
+        """
+        The client for the running event loop. httpx connections and asyncio
+        locks belong to one loop, so a new loop gets a new client and new
+        bucket locks; the previous client is closed on its own loop.
+        """
+        loop = asyncio.get_running_loop()
+        if self._client is None or self._client_loop is not loop:
+            self._release_client()
+            http_client = httpx.AsyncClient(
+                limits=httpx.Limits(
+                    max_connections=self.max_connections,
+                    max_keepalive_connections=self.max_connections,
+                ),
+                timeout=self.timeout,
+            )
+            self._client = AsyncGroq(
+                api_key=self.api_key,
+                http_client=http_client,
+                max_retries=0,          # retries are done here, with rate-limit awareness
+                timeout=self.timeout,
+            )
+            self._client_loop = loop
+            self._client_owner = loop.create_task(self._close_with_loop(self._client))
+            self.request_bucket.rebind()
+            self.token_bucket.rebind()
+        return self._client
+
+    @staticmethod
+    async def _close_with_loop(client: AsyncGroq):
+        """Waits until cancelled (aclose(), or asyncio.run() ending its loop), then closes client."""
+        try:
+            await asyncio.get_running_loop().create_future()
+        finally:
+            await client.close()
+
+    def _release_client(self):
+        owner, loop = self._client_owner, self._client_loop
+        self._client = self._client_loop = self._client_owner = None
+        if owner is None or owner.done() or loop.is_closed():
+            return
+        if loop is asyncio.get_running_loop():
+            owner.cancel()
+        else:
+            loop.call_soon_threadsafe(owner.cancel)
+
+    async def aclose(self):
+        owner = self._client_owner
+        if owner is not None and self._client_loop is asyncio.get_running_loop():
+            self._client = self._client_loop = self._client_owner = None
+            owner.cancel()
+            await asyncio.gather(owner, return_exceptions=True)
+        else:
+            self._release_client()
+
+    # ------------------ RATE LIMITS + RETRIES ------------------
+    @staticmethod
+    def _estimate_tokens(request: dict) -> int:
+        prompt = sum(count_tokens(m.get("content") or "") for m in request.get("messages", []))
+        return prompt + int(request.get("max_tokens") or 0)
+
+    async def _throttle(self, estimated_tokens: int):
+        waited = await self.request_bucket.acquire(1)
+        waited += await self.token_bucket.acquire(estimated_tokens)
+        if waited:
+            with self._lock:
+                self.throttled_seconds += waited
+
+    @staticmethod
+    def _retryable(e: Exception) -> bool:
+        if isinstance(e, (RateLimitError, APITimeoutError, APIConnectionError)):
+            return True
+        return isinstance(e, APIStatusError) and e.status_code >= 500
+
+    def _backoff(self, attempt: int, e: Exception) -> float:
+        # full jitter: uniform(0, base * 2^attempt), capped
+        delay = random.uniform(0, min(LLM_BACKOFF_MAX_SECONDS, LLM_BACKOFF_BASE_SECONDS * 2 ** attempt))
+        response = getattr(e, "response", None)
+        if response is not None:
+            try:
+                delay = max(delay, float(response.headers.get("retry-after", 0)))
+            except ValueError:
+                pass
+        return delay
+
+    async def _before_retry(self, attempt: int, e: Exception):
+        with self._lock:
+            self.retries += 1
+        await asyncio.sleep(self._backoff(attempt, e))
+
+    def _record(self, started: float, error: Optional[Exception] = None, tokens: int = 0):
+        with self._lock:
+            self.calls += 1
+            self._latencies.append(time.perf_counter() - started)
+            self.tokens_used += tokens
+            if error is not None:
+                self.errors[type(error).__name__] += 1
+
+    # ------------------ PUBLIC API ------------------
+    async def complete(self, timeout: Optional[float] = None, **request) -> str:
+        """chat.completions.create(**request) -> message text, with limits and retries."""
+        estimated = self._estimate_tokens(request)
+        for attempt in range(self.max_retries + 1):
+            client = self.client            # (re)binds the buckets to this loop before they are used
+            await self._throttle(estimated)
+            started = time.perf_counter()
+            try:
+                response = await client.chat.completions.create(
+                    **request, timeout=timeout or self.timeout
+                )
+            except Exception as e:
+                self._record(started, error=e)
+                if attempt < self.max_retries and self._retryable(e):
+                    await self._before_retry(attempt, e)
+                    continue
+                raise
+
+            usage = getattr(response, "usage", None)
+            used = getattr(usage, "total_tokens", 0) or 0
+            self.token_bucket.refund(estimated - used if used else 0)
+            self._record(started, tokens=used)
+            return response.choices[0].message.content
+
+    async def stream(self, timeout: Optional[float] = None, **request) -> AsyncIterator[str]:
+        """Yield text deltas. Retries only until the first delta has been sent."""
+        estimated = self._estimate_tokens(request)
+        for attempt in range(self.max_retries + 1):
+            client = self.client
+            await self._throttle(estimated)
+            started = time.perf_counter()
+            sent_any = False
+            try:
+                stream = await client.chat.completions.create(
+                    **request, stream=True, timeout=timeout or self.timeout
+                )
+                async for chunk in stream:
+                    delta = chunk.choices[0].delta.content if chunk.choices else None
+                    if delta:
+                        sent_any = True
+                        yield delta
+            except Exception as e:
+                self._record(started, error=e)
+                if not sent_any and attempt < self.max_retries and self._retryable(e):
+                    await self._before_retry(attempt, e)
+                    continue
+                raise
+            self._record(started)
+            return
+
+    def stats(self) -> dict:
+        with self._lock:
+            latencies = sorted(self._latencies)
+
+            def pct(p: float):
+                return round(latencies[int(p * (len(latencies) - 1))], 3) if latencies else None
+
+            return {
+                "calls": self.calls,
+                "retries": self.retries,
+                "errors": dict(self.errors),
+                "latency_p50_seconds": pct(0.50),
+                "latency_p95_seconds": pct(0.95),
+                "throttled_seconds": round(self.throttled_seconds, 2),
+                "tokens_used": self.tokens_used,
+                "requests_per_minute": self.request_bucket.capacity,
+                "tokens_per_minute": self.token_bucket.capacity or None,
+            }
+
+
+llm_client = LLMClient()
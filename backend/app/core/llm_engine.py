@@ -1,32 +0,0 @@
-import os
-from groq import Groq
-
-class LLMEngine:
-    def __init__(self):
-        self.client = Groq(
-            api_key=os.getenv("GROQ_API_KEY")
-        )
-
-        self.model = "llama-3.1-8b-instant"
-
-    def generate(self, prompt: str) -> str:
-        response = self.client.chat.completions.create(
-            model=self.model,
-            messages=[
-                {
-                    "role": "system",
-                    "content": (
-                        "You are an expert university exam generator. "
-                        "Generate clear, structured academic questions."
-                    )
-                },
-                {
-                    "role": "user",
-                    "content": prompt
-                }
-            ],
-            temperature=0.4,
-            max_tokens=1500
-        )
-
-        return response.choices[0].message.content
@@ -1,30 +1,417 @@
+import hashlib
+import logging
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+
 import chromadb
 from chromadb.config import Settings
 
-class RAGEngine:
-    def __init__(self):
-        self.client = chromadb.Client(
-            Settings(
-                persist_directory="chroma",
-                anonymized_telemetry=False
+from app.core.embeddings import Embedder, create_embedder
+from app.core.vector_index import NumpyVectorIndex
+
+logger = logging.getLogger(__name__)
+
+
+RAG_STORE_MODE = os.getenv("RAG_STORE_MODE", "persistent")   # persistent | ephemeral
+RAG_INDEX_BACKEND = os.getenv("RAG_INDEX_BACKEND", "chroma")  # chroma | numpy
+RAG_PERSIST_DIR = os.getenv("RAG_PERSIST_DIR", "chroma")
+RAG_COLLECTION = os.getenv("RAG_COLLECTION", "teachassist")
+RAG_QUERY_CACHE_SIZE = int(os.getenv("RAG_QUERY_CACHE_SIZE", "256"))
+# batched search asks Chroma for this many times top_k * documents results
+RAG_BATCH_OVERSAMPLE = int(os.getenv("RAG_BATCH_OVERSAMPLE", "3"))
+# namespaces (teacher / upload session) unused for this long are deleted
+RAG_NAMESPACE_TTL_HOURS = float(os.getenv("RAG_NAMESPACE_TTL_HOURS", "72"))
+RAG_EVICTION_INTERVAL_SECONDS = int(os.getenv("RAG_EVICTION_INTERVAL_SECONDS", "600"))
+
+DEFAULT_NAMESPACE = "global"
+
+
+def chunk_id(text: str, source: str = "", namespace: str = "") -> str:
+    """Deterministic chunk ID: same chunk of the same source in the same namespace -> same ID."""
+    h = hashlib.sha256()
+    h.update(namespace.encode("utf-8"))
+    h.update(b"\x00")
+    h.update(source.encode("utf-8"))
+    h.update(b"\x00")
+    h.update(text.encode("utf-8"))
+    return h.hexdigest()
+
+
+class NamespaceRegistry:
+    """
+    Last-used time of every namespace, kept next to the vector store
+    (or in memory for the ephemeral store) so TTL eviction survives restarts.
+    """
+
+    def __init__(self, path: str):
+        if path != ":memory:":
+            os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._lock = threading.Lock()
+        with self._lock:
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS namespaces (name TEXT PRIMARY KEY, last_used REAL NOT NULL)"
             )
-        )
-        self.collection = self.client.get_or_create_collection(
-            name="teachassist"
-        )
+            self._conn.commit()
+
+    def touch(self, namespace: str):
+        with self._lock:
+            self._conn.execute(
+                "INSERT INTO namespaces (name, last_used) VALUES (?, ?) "
+                "ON CONFLICT(name) DO UPDATE SET last_used = excluded.last_used",
+                (namespace, time.time())
+            )
+            self._conn.commit()
+
+    def expired(self, ttl_seconds: float) -> list:
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT name FROM namespaces WHERE last_used < ?",
+                (time.time() - ttl_seconds,)
+            ).fetchall()
+        return [r[0] for r in rows]
+
+    def forget(self, namespace: str):
+        with self._lock:
+            self._conn.execute("DELETE FROM namespaces WHERE name = ?", (namespace,))
+            self._conn.commit()
 
-    def add_documents(self, texts: list, metadatas: list):
-        ids = [f"doc_{i}" for i in range(len(texts))]
-        self.collection.add(
-            documents=texts,
-            metadatas=metadatas,
-            ids=ids
+    def count(self) -> int:
+        with self._lock:
+            return self._conn.execute("SELECT COUNT(*) FROM namespaces").fetchone()[0]
+
+
+class RAGEngine:
+    """
+    Chroma-backed chunk store.
+
+    store_mode:
+      - "persistent": on-disk store under persist_dir, survives restarts
+      - "ephemeral":  in-memory, wiped on every restart (tests / demos)
+    The client is opened lazily on first use, so startup stays fast.
+
+    index_backend:
+      - "chroma": the store described above
+      - "numpy":  in-process exact index (app.core.vector_index), memory only;
+                  fastest for per-request retrieval over freshly uploaded chunks
+
+    Every chunk belongs to a namespace (a teacher or an upload session).
+    Retrieval never leaves the namespace, and namespaces unused for
+    RAG_NAMESPACE_TTL_HOURS are deleted by a background eviction thread.
+    """
+
+    def __init__(
+        self,
+        store_mode: str = RAG_STORE_MODE,
+        persist_dir: str = RAG_PERSIST_DIR,
+        collection_name: str = RAG_COLLECTION,
+        embedder: Embedder | None = None,
+        index_backend: str = RAG_INDEX_BACKEND,
+    ):
+        if store_mode not in ("persistent", "ephemeral"):
+            raise ValueError(f"Unknown RAG store mode: {store_mode}")
+        if index_backend not in ("chroma", "numpy"):
+            raise ValueError(f"Unknown RAG index backend: {index_backend}")
+        if index_backend == "numpy":
+            # nothing survives a restart, so neither should the TTL registry
+            store_mode = "ephemeral"
+
+        self.index_backend = index_backend
+        self.store_mode = store_mode
+        self.persist_dir = persist_dir
+        self.collection_name = collection_name
+        self._client = None
+        self._collection = None
+        self._embedder = embedder
+        self._query_cache: "OrderedDict[str, list]" = OrderedDict()
+        self._lock = threading.Lock()
+
+        self.query_cache_hits = 0
+        self.query_cache_misses = 0
+
+        self.chunks_added = 0
+        self.chunks_reused = 0
+        self.namespaces_evicted = 0
+
+        self.namespace_ttl_seconds = RAG_NAMESPACE_TTL_HOURS * 3600
+        self.namespaces = NamespaceRegistry(
+            os.path.join(persist_dir, "namespaces.sqlite3")
+            if store_mode == "persistent" else ":memory:"
         )
+        self._stop_eviction = threading.Event()
+        self._eviction_thread: threading.Thread | None = None
+
+    # ------------------ LAZY STORE ------------------
+    @property
+    def client(self):
+        if self._client is None:
+            with self._lock:
+                if self._client is None:
+                    settings = Settings(anonymized_telemetry=False)
+                    if self.store_mode == "persistent":
+                        self._client = chromadb.PersistentClient(
+                            path=self.persist_dir, settings=settings
+                        )
+                    else:
+                        self._client = chromadb.EphemeralClient(settings=settings)
+        return self._client
+
+    @property
+    def embedder(self) -> Embedder:
+        # loading a model is slow, so it also waits for first use
+        if self._embedder is None:
+            with self._lock:
+                if self._embedder is None:
+                    self._embedder = create_embedder()
+        return self._embedder
+
+    def _collection_name(self) -> str:
+        # vectors from different backends have different sizes / spaces,
+        # so each non-default backend gets its own collection
+        if self.embedder.name == "chroma-default":
+            return self.collection_name
+        return f"{self.collection_name}__{self.embedder.name}"
+
+    @property
+    def collection(self):
+        if self._collection is None and self.index_backend == "numpy":
+            with self._lock:
+                if self._collection is None:
+                    self._collection = NumpyVectorIndex()
+        if self._collection is None:
+            client = self.client
+            name = self._collection_name()
+            with self._lock:
+                if self._collection is None:
+                    # embeddings are always computed by self.embedder and
+                    # passed explicitly, Chroma never embeds on its own
+                    self._collection = client.get_or_create_collection(name=name)
+        return self._collection
+
+    @staticmethod
+    def _scoped(where: dict | None, namespace: str | None) -> dict | None:
+        if namespace is None:
+            return where
+        if not where:
+            return {"namespace": namespace}
+        return {"$and": [{"namespace": namespace}, where]}
 
-    def search(self, query: str, top_k: int = 5, filter: dict | None = None):
+    def add_documents(self, texts: list, metadatas: list, namespace: str = DEFAULT_NAMESPACE) -> dict:
+        """
+        Store chunks under content-hash IDs inside `namespace`.
+        Chunks already in the namespace are not embedded again.
+        Returns {"added": <newly embedded>, "reused": <already stored>}.
+        """
+        self.namespaces.touch(namespace)
+        metadatas = [{**m, "namespace": namespace} for m in metadatas]
+        ids = [chunk_id(t, str(m.get("source", "")), namespace) for t, m in zip(texts, metadatas)]
+
+        # drop duplicates inside this batch (keep first occurrence)
+        unique = {}
+        for i, cid in enumerate(ids):
+            unique.setdefault(cid, i)
+
+        existing = set()
+        if unique:
+            existing = set(self.collection.get(ids=list(unique), include=[])["ids"])
+
+        new_idx = [i for cid, i in unique.items() if cid not in existing]
+        if new_idx:
+            self.collection.add(
+                embeddings=self.embedder.embed([texts[i] for i in new_idx]),
+                documents=[texts[i] for i in new_idx],
+                metadatas=[metadatas[i] for i in new_idx],
+                ids=[ids[i] for i in new_idx]
+            )
+
+        reused = len(texts) - len(new_idx)
+        self.chunks_added += len(new_idx)
+        self.chunks_reused += reused
+        return {"added": len(new_idx), "reused": reused}
+
+    # ------------------ QUERY EMBEDDINGS ------------------
+    def embed_query(self, query: str) -> list:
+        """Embed a query once; repeated queries come from an in-memory LRU."""
+        with self._lock:
+            cached = self._query_cache.get(query)
+            if cached is not None:
+                self._query_cache.move_to_end(query)
+                self.query_cache_hits += 1
+                return cached
+
+        embedding = self.embedder.embed([query])[0]
+
+        with self._lock:
+            self.query_cache_misses += 1
+            self._query_cache[query] = embedding
+            while len(self._query_cache) > RAG_QUERY_CACHE_SIZE:
+                self._query_cache.popitem(last=False)
+        return embedding
+
+    def search(self, query: str, top_k: int = 5, filter: dict | None = None, namespace: str | None = None):
+        if namespace is not None:
+            self.namespaces.touch(namespace)
         results = self.collection.query(
-            query_texts=[query],
+            query_embeddings=[self.embed_query(query)],
             n_results=top_k,
-            where=filter
+            where=self._scoped(filter, namespace)
         )
         return results["documents"][0]
+
+    def search_many(self, query: str, sources: list, top_k: int = 5, namespace: str | None = None) -> dict:
+        """
+        Balanced top-k for several documents with ONE query embedding and
+        (usually) ONE Chroma query.
+
+        Returns {source: [chunk, ...]} with at most top_k chunks per source,
+        best match first. A source that got crowded out of the shared result
+        is topped up with its own filtered query (still no re-embedding).
+        """
+        if not sources:
+            return {}
+
+        if namespace is not None:
+            self.namespaces.touch(namespace)
+
+        embedding = self.embed_query(query)
+        where = {"source": sources[0]} if len(sources) == 1 else {"source": {"$in": list(sources)}}
+        n_results = top_k * len(sources) * RAG_BATCH_OVERSAMPLE
+
+        results = self.collection.query(
+            query_embeddings=[embedding],
+            n_results=n_results,
+            where=self._scoped(where, namespace),
+            include=["documents", "metadatas"]
+        )
+        documents = results["documents"][0]
+        metadatas = results["metadatas"][0]
+
+        per_source = {src: [] for src in sources}
+        for doc, meta in zip(documents, metadatas):
+            bucket = per_source.get(meta.get("source"))
+            if bucket is not None and len(bucket) < top_k:
+                bucket.append(doc)
+
+        # fewer hits than asked for => every matching chunk was returned,
+        # so a short bucket simply means a short document
+        if len(documents) >= n_results:
+            for src, bucket in per_source.items():
+                if len(bucket) < top_k:
+                    per_source[src] = self.collection.query(
+                        query_embeddings=[embedding],
+                        n_results=top_k,
+                        where=self._scoped({"source": src}, namespace)
+                    )["documents"][0]
+
+        return per_source
+
+    # ------------------ TTL EVICTION ------------------
+    def evict_expired(self) -> dict:
+        """Delete every chunk of namespaces unused for longer than the TTL."""
+        expired = self.namespaces.expired(self.namespace_ttl_seconds)
+        for namespace in expired:
+            self.collection.delete(where={"namespace": namespace})
+            self.namespaces.forget(namespace)
+        self.namespaces_evicted += len(expired)
+        if expired:
+            logger.info("RAG: evicted %d expired namespaces", len(expired))
+        return {"evicted": expired}
+
+    def start_eviction(self, interval_seconds: int = RAG_EVICTION_INTERVAL_SECONDS):
+        if self._eviction_thread is not None:
+            return
+        self._stop_eviction.clear()
+
+        def loop():
+            while not self._stop_eviction.wait(interval_seconds):
+                try:
+                    self.evict_expired()
+                except Exception as e:
+                    logger.warning("RAG eviction failed: %s", e)
+
+        self._eviction_thread = threading.Thread(target=loop, name="rag-eviction", daemon=True)
+        self._eviction_thread.start()
+
+    def stop_eviction(self):
+        self._stop_eviction.set()
+        self._eviction_thread = None
+
+    # ------------------ MAINTENANCE ------------------
+    def compact(self, rebuild: bool = False, batch_size: int = 1000) -> dict:
+        """
+        Reclaim space in the persistent store.
+
+        - rebuild=True copies every record (with its stored embedding, so
+          nothing is re-embedded) into a fresh collection, which drops the
+          HNSW entries Chroma only marks as deleted.
+        - the SQLite file is VACUUMed afterwards.
+        """
+        result = {"records": self.collection.count(), "rebuilt": False}
+        if self.index_backend == "numpy":
+            # deletes already compact the in-memory matrix
+            return result
+
+        if rebuild:
+            name = self._collection_name()
+            tmp_name = f"{name}__compact"
+            try:
+                self.client.delete_collection(tmp_name)
+            except Exception:
+                pass
+            fresh = self.client.create_collection(name=tmp_name)
+
+            offset = 0
+            while True:
+                page = self.collection.get(
+                    limit=batch_size,
+                    offset=offset,
+                    include=["embeddings", "documents", "metadatas"]
+                )
+                if not page["ids"]:
+                    break
+                fresh.add(
+                    ids=page["ids"],
+                    embeddings=page["embeddings"],
+                    documents=page["documents"],
+                    metadatas=page["metadatas"]
+                )
+                offset += len(page["ids"])
+
+            # only swap once the copy is complete
+            self.client.delete_collection(name)
+            fresh.modify(name=name)
+            self._collection = None
+            result["rebuilt"] = True
+
+        sqlite_path = os.path.join(self.persist_dir, "chroma.sqlite3")
+        if self.store_mode == "persistent" and os.path.exists(sqlite_path):
+            before = os.path.getsize(sqlite_path)
+            conn = sqlite3.connect(sqlite_path)
+            try:
+                conn.execute("VACUUM")
+            finally:
+                conn.close()
+            result["sqlite_bytes_before"] = before
+            result["sqlite_bytes_after"] = os.path.getsize(sqlite_path)
+
+        return result
+
+    def stats(self) -> dict:
+        return {
+            "index_backend": self.index_backend,
+            "store_mode": self.store_mode,
+            "loaded": self._collection is not None,
+            # don't open the store just to report on it
+            "chunks_stored": self._collection.count() if self._collection is not None else None,
+            "chunks_added": self.chunks_added,
+            "chunks_reused": self.chunks_reused,
+            "query_cache_hits": self.query_cache_hits,
+            "query_cache_misses": self.query_cache_misses,
+            "namespaces": self.namespaces.count(),
+            "namespaces_evicted": self.namespaces_evicted,
+            "namespace_ttl_hours": self.namespace_ttl_seconds / 3600,
+            "embeddings": self._embedder.stats() if self._embedder is not None else None,
+        }
@@ -0,0 +1,45 @@
+"""
+Maintenance commands for the persistent RAG store.
+
+Usage (from the backend/ folder, with the server stopped):
+
+    python -m app.core.rag_maintenance stats
+    python -m app.core.rag_maintenance evict
+    python -m app.core.rag_maintenance compact [--rebuild]
+"""
+import argparse
+import json
+
+from app.core.rag_engine import RAGEngine, RAG_PERSIST_DIR
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="TeachAssist RAG store maintenance")
+    parser.add_argument("--path", default=RAG_PERSIST_DIR, help="persistent store directory")
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    sub.add_parser("stats", help="show record counts")
+    sub.add_parser("evict", help="delete namespaces unused for longer than RAG_NAMESPACE_TTL_HOURS")
+    compact = sub.add_parser("compact", help="VACUUM the store and optionally rebuild the index")
+    compact.add_argument(
+        "--rebuild",
+        action="store_true",
+        help="copy all records into a fresh collection (drops deleted index entries)"
+    )
+
+    args = parser.parse_args(argv)
+    rag = RAGEngine(store_mode="persistent", persist_dir=args.path)
+
+    if args.command == "stats":
+        rag.collection  # open the store so the count is reported
+        result = rag.stats()
+    elif args.command == "evict":
+        result = rag.evict_expired()
+    else:
+        result = rag.compact(rebuild=args.rebuild)
+
+    print(json.dumps(result, indent=2))
+
+
+if __name__ == "__main__":
+    main()
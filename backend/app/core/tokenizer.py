@@ -0,0 +1,43 @@
+import logging
+import os
+import re
+
+
+logger = logging.getLogger(__name__)
+
+TOKENIZER_ENCODING = os.getenv("TOKENIZER_ENCODING", "cl100k_base")
+
+# Fallback when tiktoken (or its encoding file) is not available:
+# one token per word / punctuation mark, which tracks BPE counts closely
+# enough for budgeting chunks and prompts.
+_APPROX_TOKEN_RE = re.compile(r"\w+|[^\w\s]")
+
+_encoding = None
+_encoding_loaded = False
+
+
+def _get_encoding():
+    global _encoding, _encoding_loaded
+    if not _encoding_loaded:
+        _encoding_loaded = True
+        try:
+            import tiktoken
+            _encoding = tiktoken.get_encoding(TOKENIZER_ENCODING)
+        except Exception as e:
+            # not installed, or offline and the encoding is not cached locally
+            logger.warning("tiktoken unavailable (%s). Using approximate token counts.", e)
+            _encoding = None
+    return _encoding
+
+
+def count_tokens(text: str) -> int:
+    if not text:
+        return 0
+    encoding = _get_encoding()
+    if encoding is not None:
+        return len(encoding.encode(text, disallowed_special=()))
+    return len(_APPROX_TOKEN_RE.findall(text))
+
+
+def tokenizer_name() -> str:
+    return TOKENIZER_ENCODING if _get_encoding() is not None else "approx-regex"
@@ -0,0 +1,201 @@
+"""
+In-process exact vector index (NumPy).
+
+For one exam request we only search the few hundred chunks just uploaded, so
+a contiguous float32 matrix + one matrix-vector product beats a round trip
+through a full Chroma collection. The class mirrors the small part of the
+Chroma collection API that RAGEngine uses (get / add / query / delete / count
+with the same `where` dialect), so RAGEngine can use either one.
+"""
+import threading
+from typing import Any, Dict, List, Optional
+
+import numpy as np
+
+
+class NumpyVectorIndex:
+    """
+    Exact cosine top-k over L2-normalised float32 rows.
+
+    - vectors live in one contiguous (capacity, dim) matrix that doubles
+      when full
+    - metadata is stored column-wise (one object array per key) so filters
+      are evaluated as boolean array masks
+    - top-k uses np.argpartition, then sorts only the k winners
+    """
+
+    def __init__(self, initial_capacity: int = 1024):
+        self._lock = threading.RLock()
+        self._capacity = initial_capacity
+        self._dim: Optional[int] = None
+        self._vectors: Optional[np.ndarray] = None
+        self._size = 0
+
+        self._ids: List[str] = []
+        self._row_of: Dict[str, int] = {}
+        self._documents: List[str] = []
+        self._metadatas: List[dict] = []
+        self._columns: Dict[str, np.ndarray] = {}
+
+    # ------------------ STORAGE ------------------
+    def _ensure_capacity(self, extra: int):
+        needed = self._size + extra
+        if needed <= self._capacity and self._vectors is not None:
+            return
+        while self._capacity < needed:
+            self._capacity *= 2
+
+        vectors = np.zeros((self._capacity, self._dim), dtype=np.float32)
+        if self._vectors is not None:
+            vectors[:self._size] = self._vectors[:self._size]
+        self._vectors = vectors
+
+        for key, col in self._columns.items():
+            grown = np.full(self._capacity, None, dtype=object)
+            grown[:self._size] = col[:self._size]
+            self._columns[key] = grown
+
+    def _column(self, key: str) -> np.ndarray:
+        col = self._columns.get(key)
+        if col is None:
+            col = np.full(self._capacity, None, dtype=object)
+            self._columns[key] = col
+        return col
+
+    # ------------------ FILTERS ------------------
+    def _mask(self, where: Optional[dict]) -> np.ndarray:
+        n = self._size
+        if not where:
+            return np.ones(n, dtype=bool)
+
+        if "$and" in where:
+            mask = np.ones(n, dtype=bool)
+            for clause in where["$and"]:
+                mask &= self._mask(clause)
+            return mask
+        if "$or" in where:
+            mask = np.zeros(n, dtype=bool)
+            for clause in where["$or"]:
+                mask |= self._mask(clause)
+            return mask
+
+        mask = np.ones(n, dtype=bool)
+        for key, cond in where.items():
+            col = self._columns.get(key)
+            if col is None:
+                return np.zeros(n, dtype=bool)
+            values = col[:n]
+            if isinstance(cond, dict) and "$in" in cond:
+                mask &= np.isin(values, list(cond["$in"]))
+            elif isinstance(cond, dict) and "$eq" in cond:
+                mask &= values == cond["$eq"]
+            else:
+                mask &= values == cond
+        return mask
+
+    # ------------------ CHROMA-COMPATIBLE API ------------------
+    def count(self) -> int:
+        return self._size
+
+    def get(self, ids: Optional[List[str]] = None, include: Optional[list] = None, **_) -> dict:
+        with self._lock:
+            if ids is None:
+                return {"ids": list(self._ids)}
+            return {"ids": [i for i in ids if i in self._row_of]}
+
+    def add(
+        self,
+        ids: List[str],
+        embeddings: List[List[float]],
+        documents: List[str],
+        metadatas: List[dict],
+    ):
+        if not ids:
+            return
+        batch = np.asarray(embeddings, dtype=np.float32)
+        norms = np.linalg.norm(batch, axis=1, keepdims=True)
+        batch /= np.where(norms == 0, 1.0, norms)
+
+        with self._lock:
+            if self._dim is None:
+                self._dim = batch.shape[1]
+            elif batch.shape[1] != self._dim:
+                raise ValueError(f"Embedding dimension {batch.shape[1]} != index dimension {self._dim}")
+
+            keep = [i for i, cid in enumerate(ids) if cid not in self._row_of]
+            if not keep:
+                return
+            self._ensure_capacity(len(keep))
+
+            start = self._size
+            self._vectors[start:start + len(keep)] = batch[keep]
+            for offset, i in enumerate(keep):
+                row = start + offset
+                self._ids.append(ids[i])
+                self._row_of[ids[i]] = row
+                self._documents.append(documents[i])
+                self._metadatas.append(metadatas[i])
+                for key, value in metadatas[i].items():
+                    self._column(key)[row] = value
+            self._size += len(keep)
+
+    def query(
+        self,
+        query_embeddings: List[List[float]],
+        n_results: int = 10,
+        where: Optional[dict] = None,
+        include: Optional[list] = None,
+        **_,
+    ) -> Dict[str, Any]:
+        out = {"ids": [], "documents": [], "metadatas": [], "distances": []}
+        with self._lock:
+            mask = self._mask(where)
+            rows = np.flatnonzero(mask)
+            for q in query_embeddings:
+                if rows.size == 0 or n_results <= 0:
+                    for key in out:
+                        out[key].append([])
+                    continue
+
+                qv = np.asarray(q, dtype=np.float32)
+                qv /= (np.linalg.norm(qv) or 1.0)
+                scores = self._vectors[rows] @ qv
+
+                k = min(n_results, rows.size)
+                if k < rows.size:
+                    top = np.argpartition(-scores, k - 1)[:k]
+                else:
+                    top = np.arange(rows.size)
+                top = top[np.argsort(-scores[top])]
+                hit_rows = rows[top]
+
+                out["ids"].append([self._ids[r] for r in hit_rows])
+                out["documents"].append([self._documents[r] for r in hit_rows])
+                out["metadatas"].append([self._metadatas[r] for r in hit_rows])
+                out["distances"].append((1.0 - scores[top]).tolist())
+        return out
+
+    def delete(self, ids: Optional[List[str]] = None, where: Optional[dict] = None):
+        with self._lock:
+            if ids is not None:
+                drop = np.zeros(self._size, dtype=bool)
+                for cid in ids:
+                    row = self._row_of.get(cid)
+                    if row is not None:
+                        drop[row] = True
+            else:
+                drop = self._mask(where)
+            if not drop.any():
+                return
+
+            keep = np.flatnonzero(~drop)
+            n = keep.size
+            self._vectors[:n] = self._vectors[keep]
+            for key, col in self._columns.items():
+                col[:n] = col[keep]
+                col[n:self._size] = None
+            self._ids = [self._ids[r] for r in keep]
+            self._documents = [self._documents[r] for r in keep]
+            self._metadatas = [self._metadatas[r] for r in keep]
+            self._row_of = {cid: row for row, cid in enumerate(self._ids)}
+            self._size = n
@@ -1,33 +1,47 @@
-from fastapi import FastAPI, Depends, HTTPException, UploadFile, File, Form
+from fastapi import FastAPI, Depends, HTTPException, UploadFile, File, Form, Header
+from fastapi.concurrency import run_in_threadpool
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.responses import StreamingResponse
+from fastapi.responses import Response, StreamingResponse
+from sqlalchemy.exc import IntegrityError
 from sqlalchemy.orm import Session
 from dotenv import load_dotenv
-from io import BytesIO
+import logging
 import re
 import os
 import json
-
-from groq import Groq
-from pypdf import PdfReader
-from docx import Document
-from pptx import Presentation
-
-from .database import Base, engine, SessionLocal
+import asyncio
+import hashlib
+import time
+import uuid
+from dataclasses import replace
+from itertools import islice
+
+from .database import Base, engine, SessionLocal, ensure_columns
 from . import models, schemas
 from .auth import hash_password
 from app.core.rag_engine import RAGEngine
-from reportlab.lib.pagesizes import A4
-from reportlab.lib.styles import getSampleStyleSheet
-from reportlab.lib.units import inch
-from typing import List, Dict, Any
-from collections import defaultdict
-from reportlab.platypus import SimpleDocTemplate, Spacer, Preformatted
-
-
-from reportlab.platypus import SimpleDocTemplate, Paragraph
-from reportlab.lib.styles import getSampleStyleSheet, ParagraphStyle
-from reportlab.lib.pagesizes import A4
+from app.core.chunker import iter_chunks
+from app.core.exam_ast import (
+    NUMBERED_ITEM_RE, QUESTION_TYPE_HEADINGS, TASK_HEADER_RE, ExamAST,
+    load_structure, parse_exam,
+)
+from app.core.context_assembler import (
+    CONTEXT_TOKEN_BUDGET, PromptTokenStats, assemble_context,
+    candidates_per_document, effective_budget, sample_ranked,
+)
+from app.core.llm_cache import LLMResponseCache
+from app.core.llm_client import llm_client
+from app.core.generation.section_prompts import split_section_prompts, merge_section_outputs
+from app.core.generation.prompt_registry import prompt_registry
+from app.services.extraction_cache import ExtractionCache
+from app.services.export_cache import ExportCache
+from app.services.exam_docx import load_base_package
+from app.services.export_engine import export_engine, render_document
+from app.services.extraction_engine import extraction_engine, SUPPORTED_EXTENSIONS
+from app.services.job_queue import JobQueue
+from app.utils.stage_timer import StageTimer
+from app.utils.zip_stream import ZipStream
+from typing import List, Dict, Any, AsyncIterator, Awaitable, Callable, Optional, Tuple
 
 from app.routers import gap_analysis
 from app.routers import transformation
@@ -35,14 +49,48 @@ from app.routers import transformation
 
 
 load_dotenv()
+logging.basicConfig(level=os.getenv("LOG_LEVEL", "INFO"), format="%(levelname)s %(name)s: %(message)s")
+# httpx logs every request (each LLM call) at INFO
+logging.getLogger("httpx").setLevel(logging.WARNING)
+logger = logging.getLogger(__name__)
 
 # ------------------ APP & DB ------------------
 Base.metadata.create_all(bind=engine)
+ensure_columns("generated_exams", {
+    "variant_group": "VARCHAR(32)",
+    "variant_label": "VARCHAR(10)",
+    "prompt_version": "VARCHAR(64)",
+    "ui_prompt": "TEXT",
+    "teacher_prompt": "TEXT",
+    "lecture_context": "TEXT",
+    "structure": "JSON",
+})
+ensure_columns("generation_jobs", {
+    "owner": "VARCHAR(64)",
+    "heartbeat_at": "TIMESTAMP WITH TIME ZONE",
+})
 app = FastAPI(title="TeachAssist Backend")
 
 app.include_router(gap_analysis.router)
 app.include_router(transformation.router)
 
+
+@app.on_event("startup")
+async def start_background_workers():
+    prompt_registry.compile()
+    load_base_package()
+    rag.start_eviction()
+    await job_queue.start()
+
+
+@app.on_event("shutdown")
+async def shutdown_workers():
+    await job_queue.stop()
+    extraction_engine.shutdown()
+    export_engine.shutdown()
+    rag.stop_eviction()
+    await llm_client.aclose()
+
 # ------------------ CORS ------------------
 app.add_middleware(
     CORSMiddleware,
@@ -62,309 +110,364 @@ def get_db():
 
 # ------------------ LLM + RAG ------------------
 rag = RAGEngine()
-groq_client = Groq(api_key=os.getenv("GROQ_API_KEY"))
 GROQ_MODEL = "llama-3.1-8b-instant"
 
+# Generations allowed to run at once on this worker; the rest wait their turn
+# without blocking the event loop (downloads, gap analysis keep responding).
+MAX_CONCURRENT_GENERATIONS = int(os.getenv("MAX_CONCURRENT_GENERATIONS", "8"))
+generation_slots = asyncio.Semaphore(MAX_CONCURRENT_GENERATIONS)
+
+# MID/FINAL exams: generate each SECTION in its own LLM call, concurrently
+MIDFINAL_PARALLEL_SECTIONS = os.getenv("MIDFINAL_PARALLEL_SECTIONS", "1") == "1"
+MIDFINAL_SECTION_CONCURRENCY = int(os.getenv("MIDFINAL_SECTION_CONCURRENCY", "4"))
+
+# exam variants (A/B/C) generated from one ingestion
+MAX_EXAM_VARIANTS = int(os.getenv("MAX_EXAM_VARIANTS", "6"))
+VARIANT_CANDIDATE_FACTOR = int(os.getenv("VARIANT_CANDIDATE_FACTOR", "2"))
+
+# chunks embedded and stored per RAG call while a document is indexed
+INDEX_BATCH_CHUNKS = int(os.getenv("INDEX_BATCH_CHUNKS", "256"))
+
 # =========================================================
 # FILE TEXT EXTRACTION
 # =========================================================
-def extract_text_from_file(upload_file: UploadFile) -> str:
-    raw = upload_file.file.read()
-    filename = upload_file.filename.lower()
-
-    if filename.endswith(".pdf"):
-        reader = PdfReader(BytesIO(raw))
-        return "\n".join(page.extract_text() or "" for page in reader.pages)
-
-    if filename.endswith(".pptx"):
-        prs = Presentation(BytesIO(raw))
-        slides_text = []
-        for slide in prs.slides:
-            for shape in slide.shapes:
-                if hasattr(shape, "text") and shape.text.strip():
-                    slides_text.append(shape.text)
-        return "\n".join(slides_text)
-
-    if filename.endswith(".docx"):
-        doc = Document(BytesIO(raw))
-        return "\n".join(p.text for p in doc.paragraphs if p.text.strip())
-
-    if filename.endswith(".txt"):
-        return raw.decode("utf-8", errors="ignore")
-
-    raise HTTPException(
-        status_code=400,
-        detail="Unsupported file format. Upload PDF, PPTX, DOCX, or TXT."
-    )
-
-# ------------------ CLEAN OUTPUT ------------------
-def clean_output(text: str) -> str:
-    text = re.sub(r"\*{1,3}", "", text)
-    text = text.replace("•", "-").replace("###", "")
-    return text.strip()
-
-# ------------------ TEXT CHUNKING ------------------
-def chunk_text(text: str, size=800, overlap=100):
-    chunks, start = [], 0
-    while start < len(text):
-        chunks.append(text[start:start + size])
-        start += size - overlap
-    return chunks
-
-# ------------------ EXTRACT MARKS FROM PROMPT ------------------
-def extract_marks_config(prompt: str) -> Dict[str, int]:
-    """Extract marks configuration from the prompt"""
-    marks = {
-        'mcq': 1,
-        'short': 5,
-        'long': 10,
-        'scenario': 10,
-        'task': 4  # Default for assignment tasks
-    }
-    
-    # Try to extract marks from prompt
-    mcq_match = re.search(r'MCQ.*?(\d+)\s*marks', prompt, re.IGNORECASE)
-    short_match = re.search(r'Short.*?(\d+)\s*marks', prompt, re.IGNORECASE)
-    long_match = re.search(r'Long.*?(\d+)\s*marks', prompt, re.IGNORECASE)
-    scenario_match = re.search(r'Scenario.*?(\d+)\s*marks', prompt, re.IGNORECASE)
-    task_match = re.search(r'MARKS_PER_TASK:\s*(\d+)', prompt, re.IGNORECASE)
-    
-    if mcq_match:
-        marks['mcq'] = int(mcq_match.group(1))
-    if short_match:
-        marks['short'] = int(short_match.group(1))
-    if long_match:
-        marks['long'] = int(long_match.group(1))
-    if scenario_match:
-        marks['scenario'] = int(scenario_match.group(1))
-    if task_match:
-        marks['task'] = int(task_match.group(1))
-    
-    return marks
+# Bump when the extraction engine changes so cached text is re-extracted
+EXTRACTOR_VERSION = "2"
+extraction_cache = ExtractionCache(extractor_version=EXTRACTOR_VERSION)
+
+# prompt / context sizes per generation (tune CONTEXT_TOKEN_BUDGET with these)
+prompt_stats = PromptTokenStats()
+# wall time per pipeline stage (extraction, indexing, retrieval, llm, ...)
+stage_timer = StageTimer()
+
+
+async def read_uploads(upload_files: List[UploadFile]) -> List[tuple[str, bytes]]:
+    """Read every upload once -> [(lowercased filename, raw bytes)]."""
+    uploads = []
+    for upload_file in upload_files:
+        filename = upload_file.filename.lower()
+        if not filename.endswith(SUPPORTED_EXTENSIONS):
+            raise HTTPException(
+                status_code=400,
+                detail="Unsupported file format. Upload PDF, PPTX, DOCX, or TXT."
+            )
+        uploads.append((filename, await upload_file.read()))
+    return uploads
 
-# ------------------ PARSE EXAM STRUCTURE ------------------
-def parse_exam_for_export(content: str, marks_config: Dict[str, int], exam_type: str) -> Dict[str, Any]:
-    """Parse exam content for structured export"""
-    lines = content.split('\n')
-    sections = []
-    current_section = None
-    current_qtype = None
-    answer_key_started = False
-    
-    questions_part = []
-    answers_part = []
-    tasks = []  # For assignments
-    
-    for line in lines:
-        if '=== ANSWER KEY ===' in line:
-            answer_key_started = True
-            continue
-        
-        if answer_key_started:
-            answers_part.append(line)
-        else:
-            questions_part.append(line)
-    
-    # Handle ASSIGNMENT type
-    if exam_type == 'assignment':
-        task_num = 0
-        for line in questions_part:
-            line_stripped = line.strip()
-            if line_stripped.startswith('Task '):
-                task_num += 1
-                tasks.append(line_stripped)
-        
-        return {
-            'type': 'assignment',
-            'tasks': tasks,
-            'answers': '\n'.join(answers_part),
-            'marks_config': marks_config
-        }
-    
-    # Handle QUIZ and MID/FINAL types
-    for line in questions_part:
-        line_stripped = line.strip()
-        
-        if not line_stripped:
-            continue
-        
-        # Detect section headers
-        if line_stripped.startswith('SECTION'):
-            if current_section:
-                sections.append(current_section)
-            
-            section_name = line_stripped.split(':')[0].strip()
-            current_section = {
-                'name': section_name,
-                'mcqs': [],
-                'shorts': [],
-                'longs': [],
-                'scenarios': [],
-                'total_marks': 0
-            }
-            current_qtype = None
-        
-        # Detect question type headers
-        elif 'Multiple Choice' in line_stripped:
-            current_qtype = 'mcqs'
-        elif 'Short Answer' in line_stripped:
-            current_qtype = 'shorts'
-        elif 'Long Answer' in line_stripped:
-            current_qtype = 'longs'
-        elif 'Scenario' in line_stripped and current_section:
-            current_qtype = 'scenarios'
-        elif line_stripped and current_section and current_qtype:
-            # Add question to current type
-            if line_stripped[0].isdigit() or line_stripped.startswith('Task'):
-                current_section[current_qtype].append(line_stripped)
-    
-    if current_section:
-        sections.append(current_section)
-    
-    # Calculate total marks for each section
-    for section in sections:
-        section['total_marks'] = (
-            len(section['mcqs']) * marks_config.get('mcq', 1) +
-            len(section['shorts']) * marks_config.get('short', 5) +
-            len(section['longs']) * marks_config.get('long', 10) +
-            len(section['scenarios']) * marks_config.get('scenario', 10)
-        )
-    
-    return {
-        'type': 'exam',
-        'sections': sections,
-        'answers': '\n'.join(answers_part),
-        'marks_config': marks_config
-    }
 
-# ------------------ FORMATTED DOCX EXPORT ------------------
-# ------------------ FORMATTED DOCX EXPORT ------------------
-def generate_docx(content: str, include_answers: bool, prompt: str = "", exam_type: str = "quiz"):
+async def extract_texts(uploads: List[tuple[str, bytes]]) -> List[List[str]]:
     """
-    VERY SIMPLE EXPORT:
-    - Ignore exam_type / marks / structure
-    - Just write the raw exam.content line by line into a DOCX
-    - This guarantees that NOTHING is dropped
+    Extract every upload, in upload order, as a list of pages / slides.
+    Cached files are served from disk; the rest are parsed in parallel
+    by the extraction process pool (files and PDF page ranges fan out).
     """
-    doc = Document()
-
-    # Optional: simple heading
-    # doc.add_heading('TeachAssist Export', level=1)
-
-    for line in content.splitlines():
-        # Empty line => blank paragraph (keeps spacing)
-        if line.strip() == "":
-            doc.add_paragraph("")
-        else:
-            doc.add_paragraph(line)
+    texts: List[List[str] | None] = await run_in_threadpool(
+        lambda: [extraction_cache.get(raw, name) for name, raw in uploads]
+    )
+    missing = [i for i, pages in enumerate(texts) if pages is None]
 
-    return doc
+    if missing:
+        extracted = await extraction_engine.aextract_many([uploads[i] for i in missing])
+        for i, pages in zip(missing, extracted):
+            name, raw = uploads[i]
+            await run_in_threadpool(extraction_cache.put, raw, name, pages)
+            texts[i] = pages
 
-def generate_pdf(content: str, include_answers: bool, prompt: str = "", exam_type: str = "quiz"):
-    """
-    SUPER SIMPLE PDF EXPORT
+    return texts
 
-    - No parsing / sections
-    - Dumps the ENTIRE `content` string to PDF
-    - Preserves line breaks, wraps long lines to page width
-    """
-    buffer = BytesIO()
+# ------------------ METRICS ------------------
+@app.get("/api/metrics")
+def get_metrics():
+    return {
+        "extraction_cache": extraction_cache.stats(),
+        "export_cache": export_cache.stats(),
+        "rag": rag.stats(),
+        "llm_cache": llm_cache.stats(),
+        "llm": llm_client.stats(),
+        "jobs": job_queue.stats(),
+        "prompts": prompt_stats.stats(),
+        "prompt_templates": prompt_registry.stats(),
+        "stages": stage_timer.stats(),
+    }
 
-    doc = SimpleDocTemplate(
-        buffer,
-        pagesize=A4,
-        leftMargin=36,
-        rightMargin=36,
-        topMargin=36,
-        bottomMargin=36,
-    )
+# ------------------ CLEAN OUTPUT ------------------
+def clean_output(text: str) -> str:
+    text = re.sub(r"\*{1,3}", "", text)
+    text = text.replace("•", "-").replace("###", "")
+    return text.strip()
 
-    styles = getSampleStyleSheet()
-    body_style = ParagraphStyle(
-        "Body",
-        parent=styles["Normal"],
-        fontName="Helvetica",
-        fontSize=10,
-        leading=13,
-        wordWrap="LTR",   # wrap long lines
-    )
+# ------------------ PARSE EXAM STRUCTURE ------------------
+def exam_structure(db: Session, exam: models.GeneratedExam) -> ExamAST:
+    """The exam's stored AST; exams saved before it existed are parsed once and updated."""
+    structure = load_structure(exam.structure)
+    if structure is None:
+        structure = parse_exam(exam.content or "", exam.exam_type or "")
+        exam.structure = structure.to_dict()
+        db.commit()
+    return structure
 
-    # Escape minimal HTML and convert newlines to <br/> for Paragraph
-    safe_text = (
-        content.replace("&", "&amp;")
-               .replace("<", "&lt;")
-               .replace(">", "&gt;")
-    )
-    safe_text = safe_text.replace("\r\n", "\n").replace("\r", "\n")
-    safe_text = safe_text.replace("\n", "<br/>")
 
-    story = [Paragraph(safe_text, body_style)]
-    doc.build(story)
+def without_answer_key(content: str, structure: ExamAST) -> Tuple[str, ExamAST]:
+    """Questions only: everything before the '=== ANSWER KEY ===' line, and its structure."""
+    if structure.answer_key_line is None:
+        return content, structure
+    questions = "\n".join(content.splitlines()[:structure.answer_key_line]).rstrip() + "\n"
+    return questions, replace(structure, answer_key_line=None, answers=[], line_count=len(questions.splitlines()))
 
-    buffer.seek(0)
-    return buffer
+# ------------------ DOWNLOAD (RENDERED EXPORT CACHE) ------------------
+# Bump when render_document() output changes (app.services.exam_docx / exam_pdf)
+# so cached files are re-rendered
+EXPORT_RENDERER_VERSION = "4"
+export_cache = ExportCache(renderer_version=EXPORT_RENDERER_VERSION)
 
+EXPORT_MEDIA_TYPES = {
+    "docx": "application/vnd.openxmlformats-officedocument.wordprocessingml.document",
+    "pdf": "application/pdf",
+}
 
 
-# ------------------ SIMPLE RAW PDF EXPORT ------------------
 @app.get("/api/download/{exam_id}")
 def download_exam(
     exam_id: int,
     format: str,
     include_answers: bool = True,
+    if_none_match: Optional[str] = Header(None),
     db: Session = Depends(get_db)
 ):
+    if format not in EXPORT_MEDIA_TYPES:
+        raise HTTPException(400, "Invalid format")
+
     exam = db.query(models.GeneratedExam).get(exam_id)
     if not exam:
         raise HTTPException(404, "Exam not found")
 
-    exam_type = exam.exam_type if hasattr(exam, "exam_type") else "quiz"
-    prompt = ""
-
-    if format == "docx":
-        doc = generate_docx(exam.content, include_answers, prompt, exam_type)
-        buf = BytesIO()
-        doc.save(buf)
-        buf.seek(0)
-        return StreamingResponse(
-            buf,
-            media_type="application/vnd.openxmlformats-officedocument.wordprocessingml.document",
-            headers={"Content-Disposition": "attachment; filename=exam.docx"}
-        )
+    key = export_cache.key_for(exam.id, exam.content, format, include_answers)
+    headers = {
+        "ETag": export_cache.etag(key),
+        # the URL stays the same when an exam is regenerated, so revalidate every time
+        "Cache-Control": "private, no-cache",
+    }
+    if export_cache.matches(if_none_match, key):
+        return Response(status_code=304, headers=headers)
 
-    if format == "pdf":
-        pdf = generate_pdf(exam.content, include_answers, prompt, exam_type)
-        return StreamingResponse(
-            pdf,
-            media_type="application/pdf",
-            headers={"Content-Disposition": "attachment; filename=exam.pdf"}
-        )
+    headers["Content-Disposition"] = f"attachment; filename=exam.{format}"
+    data = export_cache.get(key)
+    if data is not None:
+        return Response(data, media_type=EXPORT_MEDIA_TYPES[format], headers=headers)
 
-    raise HTTPException(400, "Invalid format")
+    content, structure = exam.content, exam_structure(db, exam)
+    if not include_answers:
+        content, structure = without_answer_key(content, structure)
+
+    with stage_timer.time("export"):
+        data = render_document(content, format, structure)
+    export_cache.put(key, data)
+    return Response(data, media_type=EXPORT_MEDIA_TYPES[format], headers=headers)
+
+
+# =========================================================
+# BULK EXPORT (ZIP OF MANY EXAMS, RENDERED IN A PROCESS POOL)
+# =========================================================
+def select_export_exams(request: schemas.BulkExportRequest) -> List[int]:
+    """Ids of the exams to export, oldest first (no content loaded)."""
+    db = SessionLocal()
+    try:
+        query = db.query(models.GeneratedExam.id)
+        if request.exam_ids:
+            query = query.filter(models.GeneratedExam.id.in_(request.exam_ids))
+        if request.teacher_id is not None:
+            query = query.filter(models.GeneratedExam.teacher_id == request.teacher_id)
+        if request.exam_types:
+            query = query.filter(models.GeneratedExam.exam_type.in_(request.exam_types))
+        if request.created_from is not None:
+            query = query.filter(models.GeneratedExam.created_at >= request.created_from)
+        if request.created_to is not None:
+            query = query.filter(models.GeneratedExam.created_at <= request.created_to)
+        return [exam_id for (exam_id,) in query.order_by(models.GeneratedExam.id)]
+    finally:
+        db.close()
+
+
+def load_export_files(exam_id: int, formats: List[str], include_answers: bool) -> List[Dict[str, Any]]:
+    """One entry per format: archive name, cache key, text to render and cached bytes (if any)."""
+    db = SessionLocal()
+    try:
+        exam = db.query(models.GeneratedExam).get(exam_id)
+        if not exam:
+            return []
+        content, structure = exam.content, exam_structure(db, exam)
+        if not include_answers:
+            content, structure = without_answer_key(content, structure)
+        label = f"_{exam.variant_label}" if exam.variant_label else ""
+        folder = exam.exam_type or "quiz"     # older rows have no exam_type
+        files = []
+        for format in formats:
+            key = export_cache.key_for(exam.id, exam.content, format, include_answers)
+            files.append({
+                "name": f"{folder}/exam_{exam.id}{label}.{format}",
+                "key": key,
+                "format": format,
+                "content": content,
+                "structure": structure,
+                "data": export_cache.get(key),
+            })
+        return files
+    finally:
+        db.close()
+
+
+async def iter_export_zip(exam_ids: List[int], formats: List[str], include_answers: bool) -> AsyncIterator[bytes]:
+    """
+    The ZIP archive, chunk by chunk. Documents not in the export cache are
+    rendered by export_engine with at most export_engine.concurrency in
+    flight, and each one is added to the archive as soon as it is done.
+    """
+    archive = ZipStream()
+    pending: Dict[asyncio.Future, Dict[str, Any]] = {}
+
+    async def finished(return_when) -> List[bytes]:
+        done, _ = await asyncio.wait(pending, return_when=return_when)
+        chunks = []
+        for future in done:
+            file = pending.pop(future)
+            try:
+                data = future.result()
+            except Exception as e:
+                chunks.append(archive.add(f"{file['name']}.error.txt", f"Export failed: {e}\n".encode("utf-8")))
+                continue
+            await run_in_threadpool(export_cache.put, file["key"], data)
+            chunks.append(archive.add(file["name"], data))
+        return chunks
+
+    started = time.perf_counter()
+    try:
+        for exam_id in exam_ids:
+            for file in await run_in_threadpool(load_export_files, exam_id, formats, include_answers):
+                if file["data"] is not None:
+                    yield archive.add(file["name"], file["data"])
+                    continue
+                future = asyncio.ensure_future(export_engine.arender(file["content"], file["format"], file["structure"]))
+                pending[future] = {"name": file["name"], "key": file["key"]}
+                while len(pending) >= export_engine.concurrency:
+                    for chunk in await finished(asyncio.FIRST_COMPLETED):
+                        yield chunk
+        while pending:
+            for chunk in await finished(asyncio.FIRST_COMPLETED):
+                yield chunk
+        yield archive.close()
+        stage_timer.record("bulk_export", time.perf_counter() - started)
+    finally:
+        # client went away: don't keep rendering for nobody
+        for future in pending:
+            future.cancel()
+
+
+@app.post("/api/exports/zip")
+async def bulk_export(request: schemas.BulkExportRequest):
+    formats = list(dict.fromkeys(request.formats))
+    if not formats or any(f not in EXPORT_MEDIA_TYPES for f in formats):
+        raise HTTPException(400, f"formats must be among: {', '.join(EXPORT_MEDIA_TYPES)}")
+    if not (request.exam_ids or request.teacher_id is not None or request.created_from or request.created_to):
+        raise HTTPException(400, "Give exam_ids, or a teacher_id / created_from / created_to filter")
+
+    exam_ids = await run_in_threadpool(select_export_exams, request)
+    if not exam_ids:
+        raise HTTPException(404, "No exams match the request")
+
+    return StreamingResponse(
+        iter_export_zip(exam_ids, formats, request.include_answers),
+        media_type="application/zip",
+        headers={
+            "Content-Disposition": "attachment; filename=exams.zip",
+            "X-Exam-Count": str(len(exam_ids)),
+        },
+    )
 
 
 # ------------------ LLaMA GENERATION ------------------
-def generate_with_llama(prompt: str) -> str:
-    """Generate with focused system prompt"""
-    response = groq_client.chat.completions.create(
+GENERATION_SYSTEM_PROMPT = "You are a precise university exam generator. Follow instructions exactly. Generate questions ONLY from provided context. Create realistic workplace scenarios when requested. Count questions carefully before outputting."
+GENERATION_TEMPERATURE = 0.2
+GENERATION_MAX_TOKENS = 8196
+
+llm_cache = LLMResponseCache()
+
+
+def _llm_request(prompt: str, max_tokens: int = GENERATION_MAX_TOKENS) -> tuple[str, Dict[str, Any]]:
+    """(cache fingerprint, chat.completions.create kwargs) for one generation."""
+    cache_key = LLMResponseCache.fingerprint(
+        model=GROQ_MODEL,
+        system=GENERATION_SYSTEM_PROMPT,
+        user=prompt,
+        temperature=GENERATION_TEMPERATURE,
+        max_tokens=max_tokens,
+    )
+    request = dict(
         model=GROQ_MODEL,
         messages=[
             {
                 "role": "system",
-                "content": "You are a precise university exam generator. Follow instructions exactly. Generate questions ONLY from provided context. Create realistic workplace scenarios when requested. Count questions carefully before outputting."
+                "content": GENERATION_SYSTEM_PROMPT
             },
             {
                 "role": "user",
                 "content": prompt
             }
         ],
-        temperature=0.2,
-        max_tokens=8196
+        temperature=GENERATION_TEMPERATURE,
+        max_tokens=max_tokens
     )
-    return response.choices[0].message.content
+    return cache_key, request
+
+
+async def generate_with_llama(
+    prompt: str,
+    bypass_cache: bool = False,
+    max_tokens: int = GENERATION_MAX_TOKENS,
+) -> str:
+    """
+    Generate with focused system prompt.
+    Identical requests (same model, prompts and sampling settings) are served
+    from the response cache unless bypass_cache is set.
+    """
+    cache_key, request = _llm_request(prompt, max_tokens)
+    if bypass_cache:
+        llm_cache.record_bypass()
+    else:
+        cached = await run_in_threadpool(llm_cache.get, cache_key)
+        if cached is not None:
+            return cached
+
+    text = await llm_client.complete(**request)
+
+    # a fresh answer always refreshes the cache, even when it was bypassed
+    await run_in_threadpool(llm_cache.put, cache_key, text)
+    return text
+
+
+async def stream_with_llama(prompt: str, bypass_cache: bool = False) -> AsyncIterator[str]:
+    """Same as generate_with_llama, but yields text deltas as Groq produces them."""
+    cache_key, request = _llm_request(prompt)
+    if bypass_cache:
+        llm_cache.record_bypass()
+    else:
+        cached = await run_in_threadpool(llm_cache.get, cache_key)
+        if cached is not None:
+            yield cached
+            return
+
+    parts = []
+    async for delta in llm_client.stream(**request):
+        parts.append(delta)
+        yield delta
+
+    await run_in_threadpool(llm_cache.put, cache_key, "".join(parts))
+
 # ===================== ASSIGNMENT HELPERS (add above the endpoint) =====================
 ASSIGN_TOTAL_RE = re.compile(r"TOTAL_TASKS:\s*(\d+)", re.IGNORECASE)
 ASSIGN_SCEN_RE  = re.compile(r"SCENARIO_TASKS:\s*(\d+)", re.IGNORECASE)
+ANSWER_TASK_RE  = re.compile(r"\s*Task\s+(\d+)\b")
+SCENARIO_LINE_RE = re.compile(r"(?im)^\s*Scenario\s*:")
+TASK_LINE_RE     = re.compile(r"(?im)^\s*Task\s*:")
 
 def extract_assignment_requirements(prompt: str) -> tuple[int, int]:
     t = ASSIGN_TOTAL_RE.search(prompt)
@@ -390,7 +493,7 @@ def _parse_assignment_tasks(questions: str):
     current_body_lines: list[str] = []
 
     for line in lines:
-        m = re.match(r"\s*(Task\s+(\d+)[^:]*:)", line)
+        m = TASK_HEADER_RE.match(line)
         if m:
             # starting a new Task block
             if current_header is None:
@@ -434,8 +537,8 @@ def _normalize_to_scenario(body: str) -> str:
         Task: ...
     If it's already in proper Scenario+Task format, keep as is.
     """
-    has_scenario = re.search(r"(?im)^\s*Scenario\s*:", body) is not None
-    has_task     = re.search(r"(?im)^\s*Task\s*:", body)     is not None
+    has_scenario = SCENARIO_LINE_RE.search(body) is not None
+    has_task     = TASK_LINE_RE.search(body)     is not None
 
     # already proper scenario → just tidy
     if has_scenario and has_task:
@@ -547,7 +650,7 @@ def trim_assignment_tasks(text: str, total_tasks: int) -> str:
 
     filtered_answer_lines: list[str] = []
     for line in answers.splitlines():
-        m = re.match(r"\s*Task\s+(\d+)\b", line)
+        m = ANSWER_TASK_RE.match(line)
         if m:
             idx = int(m.group(1))
             if idx > total_tasks:
@@ -559,6 +662,352 @@ def trim_assignment_tasks(text: str, total_tasks: int) -> str:
 
     return f"{normalized_questions}\n\n=== ANSWER KEY ===\n{normalized_answers}\n"
 
+# =========================================================
+# GENERATION PIPELINE
+# =========================================================
+# Every blocking stage (DB, chunking + embedding, Chroma queries) runs in the
+# threadpool, extraction runs in the process pool and the LLM call is async,
+# so a long generation never stalls the event loop.
+
+def get_or_create_teacher(db: Session) -> models.Teacher:
+    teacher = db.query(models.Teacher).first()
+    if not teacher:
+        teacher = models.Teacher(
+            username="default_teacher",
+            password_hash=hash_password("1234")
+        )
+        db.add(teacher)
+        try:
+            db.commit()
+        except IntegrityError:
+            # a concurrent first request created it
+            db.rollback()
+            return db.query(models.Teacher).filter(models.Teacher.username == "default_teacher").one()
+        db.refresh(teacher)
+    return teacher
+
+
+def index_documents(all_documents: List[Dict[str, Any]], teacher_id: int, namespace: str) -> Dict[str, int]:
+    """
+    Chunk every document page by page and store the chunks in the RAG
+    namespace, INDEX_BATCH_CHUNKS at a time.
+    Chunk IDs are content hashes, so re-uploaded lectures are not re-embedded.
+    """
+    stats = {"added": 0, "reused": 0}
+    for doc in all_documents:
+        metadata = {"teacher_id": teacher_id, "doc_id": doc["doc_id"], "source": doc["source"]}
+        chunks = iter_chunks(doc["pages"])
+        while batch := list(islice(chunks, INDEX_BATCH_CHUNKS)):
+            added = rag.add_documents(texts=batch, metadatas=[metadata] * len(batch), namespace=namespace)
+            stats["added"] += added["added"]
+            stats["reused"] += added["reused"]
+
+    logger.info("RAG: %d chunks embedded, %d reused", stats["added"], stats["reused"])
+    return stats
+
+
+RETRIEVAL_QUERY = "Generate exam questions strictly from this document"
+
+
+def retrieve_candidates(all_documents: List[Dict[str, Any]], namespace: str, k_per_doc: int) -> Dict[int, List[str]]:
+    """{doc_id: [chunk, ...]} best match first, at most k_per_doc per document."""
+    # one query embedding + one Chroma query for all documents; filter on the
+    # content source because reused chunks keep the doc_id of the request
+    # that first stored them
+    by_source = rag.search_many(
+        query=RETRIEVAL_QUERY,
+        sources=[doc["source"] for doc in all_documents],
+        top_k=k_per_doc,
+        namespace=namespace
+    )
+    doc_chunks_map = {
+        doc["doc_id"]: by_source[doc["source"]]
+        for doc in all_documents
+        if by_source.get(doc["source"])
+    }
+
+    if not doc_chunks_map:
+        raise HTTPException(400, "No relevant content retrieved from RAG")
+    return doc_chunks_map
+
+
+def assemble_or_fail(doc_chunks_map: Dict[int, List[str]], budget: int) -> tuple[str, dict]:
+    context, stats = assemble_context(doc_chunks_map, budget)
+    if not context:
+        raise HTTPException(400, "Prompt leaves no room for lecture context")
+    return context, stats
+
+
+def retrieve_context(all_documents: List[Dict[str, Any]], namespace: str, budget: int) -> tuple[str, dict]:
+    """
+    Retrieve context from RAG, separated per document, filling at most
+    `budget` tokens (fair round-robin across documents, best chunks first).
+    """
+    k_per_doc = candidates_per_document(budget, len(all_documents))
+    return assemble_or_fail(retrieve_candidates(all_documents, namespace, k_per_doc), budget)
+
+
+# Fixed instructions first and the lecture context last, so every call
+# starts with the same tokens (provider prompt caching) and the context
+# never splits the static text. The version is stored on each exam.
+EXAM_PROMPT = prompt_registry.register(
+    "exam",
+    system=GENERATION_SYSTEM_PROMPT,
+    prefix="""
+You are an AI exam generator for teachers.
+
+You MUST strictly follow the instructions provided in the UI PROMPT.
+You MUST generate questions ONLY from the LECTURE CONTEXT at the end.
+""",
+    suffix="""
+================ UI PROMPT (STRICT RULES) =================
+{prompt}
+
+================ TEACHER NOTES =================
+{teacher_prompt}
+
+================ LECTURE CONTEXT =================
+{context}
+""",
+)
+
+
+def build_final_prompt(context: str, prompt: str, teacher_prompt: str) -> str:
+    """Frontend-driven prompt: the UI PROMPT carries all counts / marks / Bloom rules."""
+    return EXAM_PROMPT.render(context=context, prompt=prompt, teacher_prompt=teacher_prompt)
+
+
+def postprocess_exam(raw_exam_text: str, exam_type: str, prompt: str) -> str:
+    exam_text = clean_output(raw_exam_text)
+
+    # Extra post-processing ONLY for assignments
+    if exam_type.lower() == "assignment":
+        total_tasks, scenario_tasks = extract_assignment_requirements(prompt)
+
+        # 1) Enforce the number of tasks (drop Task 6,7,8,9, …)
+        if total_tasks > 0:
+            exam_text = trim_assignment_tasks(exam_text, total_tasks)
+
+        # 2) Force the last N tasks to be scenarios (if any)
+        if scenario_tasks > 0:
+            exam_text = force_assignment_scenarios(
+                exam_text,
+                total_tasks,
+                scenario_tasks
+            )
+
+    return exam_text
+
+
+def save_exam(db: Session, teacher_id: int, exam_type: str, content: str, **extra) -> models.GeneratedExam:
+    exam = models.GeneratedExam(
+        teacher_id=teacher_id,
+        exam_type=exam_type,   # original string ('quiz', 'assignment', 'midterm')
+        content=content,
+        structure=parse_exam(content, exam_type).to_dict(),
+        **{"prompt_version": EXAM_PROMPT.version, **extra}
+    )
+    db.add(exam)
+    db.commit()
+    db.refresh(exam)
+    return exam
+
+
+def rag_namespace(teacher_id: int, session_id: str = "") -> str:
+    """Retrieval scope: one upload session if the client sends one, else the teacher."""
+    if session_id:
+        return f"session:{session_id}"
+    return f"teacher:{teacher_id}"
+
+
+def document_source(pages: List[str]) -> str:
+    """SHA-256 of the document text (pages joined by newlines), without joining it."""
+    h = hashlib.sha256()
+    for i, page in enumerate(pages):
+        if i:
+            h.update(b"\n")
+        h.update(page.encode("utf-8"))
+    return h.hexdigest()
+
+
+async def ingest_uploads(
+    uploads: List[tuple[str, bytes]],
+    teacher_id: int,
+    namespace: str,
+    report_stage: Optional[Callable[[str], Awaitable[None]]] = None,
+) -> List[Dict[str, Any]]:
+    """extraction -> chunk + store in RAG; returns the non-empty documents"""
+    if report_stage is not None:
+        await report_stage("extracting")
+    with stage_timer.time("extraction"):
+        texts = await extract_texts(uploads)
+
+    all_documents = []
+    for idx, pages in enumerate(texts):
+        if any(page.strip() for page in pages):
+            all_documents.append({
+                "doc_id": idx + 1,
+                "source": document_source(pages),
+                "pages": pages
+            })
+
+    if not all_documents:
+        raise HTTPException(400, "Empty lecture content")
+
+    if report_stage is not None:
+        await report_stage("indexing")
+    with stage_timer.time("indexing"):
+        await run_in_threadpool(index_documents, all_documents, teacher_id, namespace)
+    return all_documents
+
+
+def context_budget(prompts: List[str], teacher_prompt: str) -> int:
+    """Context tokens that fit next to the largest of `prompts`."""
+    overhead = max(
+        EXAM_PROMPT.count_tokens(context="", prompt=prompt, teacher_prompt=teacher_prompt)
+        for prompt in prompts
+    )
+    return effective_budget(CONTEXT_TOKEN_BUDGET, overhead, GENERATION_MAX_TOKENS)
+
+
+def compose_prompts(context: str, context_stats: dict, prompts: List[str], teacher_prompt: str) -> List[str]:
+    final_prompts = [build_final_prompt(context, prompt, teacher_prompt) for prompt in prompts]
+    prompt_tokens = sum(
+        EXAM_PROMPT.count_tokens(context=context, prompt=prompt, teacher_prompt=teacher_prompt)
+        for prompt in prompts
+    )
+    prompt_stats.record(prompt_tokens, context_stats)
+    logger.info(
+        "Prompt: %d tokens in %d call(s) (context %d/%d, %d/%d chunks)",
+        prompt_tokens, len(final_prompts),
+        context_stats["context_tokens"], context_stats["budget_tokens"],
+        context_stats["chunks_used"], context_stats["chunks_available"],
+    )
+    return final_prompts
+
+
+async def prepare_generation(
+    uploads: List[tuple[str, bytes]],
+    teacher_id: int,
+    prompts: List[str],
+    teacher_prompt: str,
+    namespace: str,
+    report_stage: Optional[Callable[[str], Awaitable[None]]] = None,
+) -> tuple[List[str], str]:
+    """
+    extraction -> chunk + store in RAG -> retrieval -> (final prompts, context)
+    (one prompt per UI prompt, all sharing the same retrieved context)
+    """
+    all_documents = await ingest_uploads(uploads, teacher_id, namespace, report_stage)
+
+    if report_stage is not None:
+        await report_stage("retrieving")
+    budget = context_budget(prompts, teacher_prompt)
+    with stage_timer.time("retrieval"):
+        context, context_stats = await run_in_threadpool(retrieve_context, all_documents, namespace, budget)
+
+    return compose_prompts(context, context_stats, prompts, teacher_prompt), context
+
+
+async def prepare_variants(
+    uploads: List[tuple[str, bytes]],
+    teacher_id: int,
+    variant_prompts: List[List[str]],
+    teacher_prompt: str,
+    namespace: str,
+) -> List[tuple[List[str], str]]:
+    """
+    Like prepare_generation, for several variants of one exam: files are
+    extracted, embedded and searched ONCE; each variant then builds its
+    context from a different seeded sample of the shared candidate pool
+    (variant 0 = the plain best-first ranking).
+    """
+    all_documents = await ingest_uploads(uploads, teacher_id, namespace)
+
+    budget = context_budget([p for prompts in variant_prompts for p in prompts], teacher_prompt)
+    k_per_doc = candidates_per_document(budget, len(all_documents)) * VARIANT_CANDIDATE_FACTOR
+    with stage_timer.time("retrieval"):
+        candidates = await run_in_threadpool(retrieve_candidates, all_documents, namespace, k_per_doc)
+
+    final = []
+    for seed, prompts in enumerate(variant_prompts):
+        context, context_stats = assemble_or_fail(sample_ranked(candidates, seed), budget)
+        final.append((compose_prompts(context, context_stats, prompts, teacher_prompt), context))
+    return final
+
+
+async def generate_sections(
+    section_prompts: List[tuple[str, str]],
+    bypass_cache: bool = False,
+) -> str:
+    """
+    MID/FINAL: one LLM call per SECTION, at most MIDFINAL_SECTION_CONCURRENCY
+    at a time, merged into one exam with a single answer key.
+    """
+    slots = asyncio.Semaphore(MIDFINAL_SECTION_CONCURRENCY)
+
+    async def one(prompt: str) -> str:
+        async with slots:
+            return await generate_with_llama(prompt, bypass_cache=bypass_cache)
+
+    outputs = await asyncio.gather(*(one(prompt) for _, prompt in section_prompts))
+    return merge_section_outputs([(name, out) for (name, _), out in zip(section_prompts, outputs)])
+
+
+def exam_sections(exam_type: str, prompt: str) -> List[tuple[str, str]]:
+    """Per-SECTION UI prompts when a mid/final is generated section by section, else []."""
+    if MIDFINAL_PARALLEL_SECTIONS and exam_type.lower() in ("midterm", "final"):
+        return split_section_prompts(prompt)
+    return []
+
+
+async def generate_raw(final_prompts: List[str], sections: List[tuple[str, str]], bypass_cache: bool = False) -> str:
+    """final_prompts is one prompt per section when sections is set, else [prompt]."""
+    if sections:
+        return await generate_sections(
+            [(name, p) for (name, _), p in zip(sections, final_prompts)],
+            bypass_cache=bypass_cache
+        )
+    # Single LLaMA call for quiz / assignment (and unsectioned mid/final)
+    return await generate_with_llama(final_prompts[0], bypass_cache=bypass_cache)
+
+
+async def run_generation_pipeline(
+    uploads: List[tuple[str, bytes]],
+    teacher_id: int,
+    exam_type: str,
+    prompt: str,
+    teacher_prompt: str,
+    namespace: str,
+    bypass_cache: bool = False,
+    report_stage: Optional[Callable[[str], Awaitable[None]]] = None,
+) -> tuple[str, str]:
+    """
+    Full pipeline, limited to MAX_CONCURRENT_GENERATIONS at a time.
+    Returns (exam text, lecture context it was generated from).
+    """
+    sections = exam_sections(exam_type, prompt)
+
+    waiting = time.perf_counter()
+    async with generation_slots:
+        stage_timer.record("queue_wait", time.perf_counter() - waiting)
+
+        final_prompts, context = await prepare_generation(
+            uploads, teacher_id, [p for _, p in sections] or [prompt],
+            teacher_prompt, namespace, report_stage
+        )
+
+        if report_stage is not None:
+            await report_stage("generating")
+        with stage_timer.time("llm"):
+            raw_exam_text = await generate_raw(final_prompts, sections, bypass_cache)
+
+        if report_stage is not None:
+            await report_stage("post_processing")
+        with stage_timer.time("post_processing"):
+            return postprocess_exam(raw_exam_text, exam_type, prompt), context
+
+
 # =========================================================
 # GENERATE EXAM (MAIN ENDPOINT)
 # =========================================================
@@ -567,164 +1016,545 @@ async def generate_exam(
     exam_type: str = Form(...),
     prompt: str = Form(...),
     teacher_prompt: str = Form(""),
+    session_id: str = Form(""),
+    bypass_cache: bool = Form(False),
     files: List[UploadFile] = File(...),
     db: Session = Depends(get_db)
 ):
     try:
-        # normalize exam type once
-        exam_type_lower = exam_type.lower()
-
-        # ------------------ Ensure teacher ------------------
-        teacher = db.query(models.Teacher).first()
-        if not teacher:
-            teacher = models.Teacher(
-                username="default_teacher",
-                password_hash=hash_password("1234")
+        teacher = await run_in_threadpool(get_or_create_teacher, db)
+        uploads = await read_uploads(files)
+
+        exam_text, context = await run_generation_pipeline(
+            uploads, teacher.id, exam_type, prompt, teacher_prompt,
+            rag_namespace(teacher.id, session_id),
+            bypass_cache=bypass_cache
+        )
+
+        # ------------------ Save to database ------------------
+        with stage_timer.time("save"):
+            return await run_in_threadpool(
+                save_exam, db, teacher.id, exam_type, exam_text,
+                ui_prompt=prompt, teacher_prompt=teacher_prompt, lecture_context=context
             )
-            db.add(teacher)
-            db.commit()
-            db.refresh(teacher)
-
-        # ------------------ Extract text from files ------------------
-        all_documents = []
-        for idx, file in enumerate(files):
-            text = extract_text_from_file(file)
-            if text.strip():
-                all_documents.append({
-                    "doc_id": idx + 1,
-                    "content": text
-                })
 
-        if not all_documents:
-            raise HTTPException(400, "Empty lecture content")
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
 
-        # ------------------ Chunk + Store in RAG ------------------
-        all_chunks = []
-        all_metadata = []
+# =========================================================
+# GENERATE EXAM VARIANTS (A/B/C FROM ONE INGESTION)
+# =========================================================
+def variant_label(index: int) -> str:
+    return chr(ord("A") + index)
 
-        for doc in all_documents:
-            chunks = chunk_text(doc["content"])
-            all_chunks.extend(chunks)
-            all_metadata.extend(
-                [{"teacher_id": teacher.id, "doc_id": doc["doc_id"]}] * len(chunks)
-            )
 
-        rag.add_documents(texts=all_chunks, metadatas=all_metadata)
+def variant_prompt(prompt: str, index: int, count: int) -> str:
+    return f"""{prompt}
 
-        # ------------------ Retrieve balanced context from RAG ------------------
-        doc_chunks_map = defaultdict(list)
-        docs_count = len(all_documents)
-        TOTAL_K = 12
-        k_per_doc = max(1, TOTAL_K // docs_count)
+VARIANT {variant_label(index)} OF {count}:
+- This is one of {count} parallel versions of the same exam for different class sections.
+- Keep the exact structure, counts and marks, but write DIFFERENT questions than the other versions would."""
 
-        for doc in all_documents:
-            chunks = rag.search(
-                query="Generate exam questions strictly from this document",
-                top_k=k_per_doc,
-                filter={"doc_id": doc["doc_id"]}
+
+@app.post("/api/generate-exam/variants")
+async def generate_exam_variants(
+    exam_type: str = Form(...),
+    prompt: str = Form(...),
+    teacher_prompt: str = Form(""),
+    session_id: str = Form(""),
+    variants: int = Form(3),
+    bypass_cache: bool = Form(False),
+    files: List[UploadFile] = File(...),
+    db: Session = Depends(get_db)
+):
+    """
+    Generate `variants` versions (A, B, C, ...) of one exam. Files are
+    extracted, embedded and retrieved once; only the LLM calls are repeated.
+    The exams are saved with a shared variant_group.
+    """
+    if not 1 <= variants <= MAX_EXAM_VARIANTS:
+        raise HTTPException(400, f"variants must be between 1 and {MAX_EXAM_VARIANTS}")
+
+    try:
+        teacher = await run_in_threadpool(get_or_create_teacher, db)
+        uploads = await read_uploads(files)
+        namespace = rag_namespace(teacher.id, session_id)
+
+        sections = exam_sections(exam_type, prompt)
+        base_prompts = [p for _, p in sections] or [prompt]
+        variant_prompts = [
+            [variant_prompt(p, i, variants) for p in base_prompts]
+            for i in range(variants)
+        ]
+
+        async with generation_slots:
+            final = await prepare_variants(
+                uploads, teacher.id, variant_prompts, teacher_prompt, namespace
             )
-            doc_chunks_map[doc["doc_id"]].extend(chunks)
-
-        if not doc_chunks_map:
-            raise HTTPException(400, "No relevant content retrieved from RAG")
-
-        # Build context with document separation
-        context_parts = []
-        for doc_id in sorted(doc_chunks_map.keys()):
-            chunks = doc_chunks_map[doc_id]
-            joined_chunks = "\n\n".join(chunks)
-            context_parts.append(
-                f"""===== DOCUMENT {doc_id} =====
-{joined_chunks}"""
+            with stage_timer.time("llm"):
+                raw_texts = await asyncio.gather(*(
+                    generate_raw(prompts, sections, bypass_cache) for prompts, _ in final
+                ))
+
+        group = uuid.uuid4().hex
+        exams = []
+        for i, raw in enumerate(raw_texts):
+            exam = await run_in_threadpool(
+                save_exam, db, teacher.id, exam_type, postprocess_exam(raw, exam_type, prompt),
+                variant_group=group, variant_label=variant_label(i),
+                ui_prompt=prompt,
+                teacher_prompt=teacher_prompt, lecture_context=final[i][1]
             )
+            exams.append({
+                "id": exam.id,
+                "exam_type": exam.exam_type,
+                "content": exam.content,
+                "variant_label": exam.variant_label,
+                "prompt_version": exam.prompt_version,
+            })
+
+        return {"variant_group": group, "exams": exams}
+
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
 
-        context = "\n\n".join(context_parts)
 
-   # ------------------ Build final prompt (FRONTEND DRIVEN) ------------------
+@app.get("/api/variants/{variant_group}")
+def get_exam_variants(variant_group: str, db: Session = Depends(get_db)):
+    exams = (
+        db.query(models.GeneratedExam)
+        .filter(models.GeneratedExam.variant_group == variant_group)
+        .order_by(models.GeneratedExam.variant_label)
+        .all()
+    )
+    if not exams:
+        raise HTTPException(404, "Variant group not found")
+    return {
+        "variant_group": variant_group,
+        "exams": [
+            {
+                "id": e.id,
+                "exam_type": e.exam_type,
+                "content": e.content,
+                "variant_label": e.variant_label,
+                "prompt_version": e.prompt_version,
+            }
+            for e in exams
+        ],
+    }
 
-        final_prompt = f"""
-You are an AI exam generator for teachers.
 
-You MUST strictly follow the instructions provided in the UI PROMPT.
-You MUST generate questions ONLY from the lecture context below.
+# =========================================================
+# EXAM STRUCTURE (PARSED ONCE, STORED WITH THE EXAM)
+# =========================================================
+@app.get("/api/exams/{exam_id}/structure")
+def get_exam_structure(exam_id: int, db: Session = Depends(get_db)):
+    """Sections, question blocks, questions / tasks and answer key of an exam, with line spans."""
+    exam = db.query(models.GeneratedExam).get(exam_id)
+    if not exam:
+        raise HTTPException(404, "Exam not found")
+    return exam_structure(db, exam).to_dict()
 
-================ LECTURE CONTEXT =================
-{context}
 
-================ UI PROMPT (STRICT RULES) =================
-{prompt}
+# =========================================================
+# REGENERATE ONE TASK / QUESTION / SECTION OF AN EXAM
+# =========================================================
+REGENERATION_MAX_TOKENS = int(os.getenv("REGENERATION_MAX_TOKENS", "2048"))
+
+REGENERATE_PROMPT = prompt_registry.register(
+    "regenerate",
+    system=GENERATION_SYSTEM_PROMPT,
+    prefix="""
+You are replacing ONE part of an existing exam for a teacher.
+
+Write a NEW version of the CURRENT PART below:
+- Same kind of item, same numbering, same marks and the same number of questions.
+- Follow the EXAM CONFIGURATION (question types, Bloom level, difficulty).
+- Ask about different lecture content than the current version; do not just reword it.
+- Apply the REQUESTED CHANGE if there is one.
+- Use ONLY the LECTURE CONTEXT at the end for facts.
+
+OUTPUT (NOTHING ELSE):
+1. The new part, in exactly the format of the CURRENT PART.
+2. A line: === ANSWER KEY ===
+3. The answer for the new part, in exactly the format of the CURRENT ANSWER.
+""",
+    suffix="""
+================ EXAM TYPE =================
+{exam_type}
+
+================ EXAM CONFIGURATION =================
+{ui_prompt}
 
 ================ TEACHER NOTES =================
 {teacher_prompt}
-"""
-
-        # Single LLaMA call for ALL exam types
-        raw_exam_text = generate_with_llama(final_prompt)
-        exam_text = clean_output(raw_exam_text)
-
-                # Extra post-processing ONLY for assignments
-        if exam_type_lower == "assignment":
-            total_tasks, scenario_tasks = extract_assignment_requirements(prompt)
-
-            # 1) Enforce the number of tasks (drop Task 6,7,8,9, …)
-            if total_tasks > 0:
-                exam_text = trim_assignment_tasks(exam_text, total_tasks)
-
-            # 2) Force the last N tasks to be scenarios (if any)
-            if scenario_tasks > 0:
-                exam_text = force_assignment_scenarios(
-                    exam_text,
-                    total_tasks,
-                    scenario_tasks
-                )
 
-        # ------------------ Save to database ------------------
-        exam = models.GeneratedExam(
-            teacher_id=teacher.id,
-            exam_type=exam_type,   # original string ('quiz', 'assignment', 'midterm')
-            content=exam_text
+================ REQUESTED CHANGE =================
+{instructions}
+
+================ CURRENT PART ({target}) =================
+{current_part}
+
+================ CURRENT ANSWER =================
+{current_answer}
+
+================ LECTURE CONTEXT =================
+{context}
+""",
+)
+
+SECTION_KEY_RE = re.compile(r"SECTION\s+([A-Za-z0-9]+)", re.IGNORECASE)
+
+
+def section_key(name: str) -> str:
+    """'SECTION B' / 'b' -> 'B'"""
+    m = SECTION_KEY_RE.match(name.strip())
+    return (m.group(1) if m else name.strip()).upper()
+
+
+def locate(structure: ExamAST, part: str, kind: str, section: Optional[str], qtype: Optional[str], number: Optional[int]):
+    where = "answer key" if part == "answers" else "questions"
+    found = structure.find(part, section, qtype, number, kind)
+    if not found:
+        raise HTTPException(404, f"Could not find the requested part in the {where}")
+    if len(found) > 1:
+        raise HTTPException(400, f"The locator matches {len(found)} parts in the {where}; add section / question_type")
+    return found[0]
+
+
+def generated_lines(text: str, part: str, kind: str, name: Any) -> List[str]:
+    """Lines of the regenerated task / question / section in model output (its first match, else all of it)."""
+    lines = text.splitlines()
+    structure = parse_exam(text)
+    nodes = structure.find(part, kind=kind)
+    if part == "answers" and structure.answer_key_line is None:
+        return []
+    node = next((n for n in nodes if getattr(n, "number", getattr(n, "name", None)) == name), nodes[0] if nodes else None)
+    if node is None:
+        start = structure.answer_key_line + 1 if part == "answers" else 0
+        end = structure.answer_key_line if part == "questions" and structure.answer_key_line is not None else len(lines)
+        # blank lines inside the part are kept; only the edges are trimmed
+        filled = [i for i in range(start, end) if lines[i].strip()]
+        return lines[filled[0]:filled[-1] + 1] if filled else []
+    if kind == "section":
+        return lines[node.start + 1:node.end]
+    return lines[node.start:node.end]
+
+
+def patch_lines(lines: List[str], node: Any, kind: str, new_lines: List[str], own_line: bool = False) -> List[str]:
+    """
+    Put new_lines in place of `node`, keeping its SECTION heading, task header
+    (with marks) or question number.
+    """
+    if kind == "section":
+        return lines[:node.start + 1] + new_lines + lines[node.end:]
+    pattern = TASK_HEADER_RE if kind == "task" else NUMBERED_ITEM_RE
+    first = lines[node.start]
+    keep = pattern.match(first)
+    head = pattern.match(new_lines[0]) if new_lines else None
+    body = [new_lines[0][head.end():].strip() if head else new_lines[0].strip()] + new_lines[1:] if new_lines else []
+    if kind == "task" and (own_line or not first[keep.end():].strip()):
+        patched = [first[:keep.end()]] + [l for l in body[:1] if l] + body[1:]
+    else:
+        patched = [f"{first[:keep.end()]} {body[0] if body else ''}".rstrip()] + body[1:]
+    return lines[:node.start] + patched + lines[node.end:]
+
+
+@app.post("/api/exams/{exam_id}/regenerate", response_model=schemas.ExamOut)
+async def regenerate_exam_part(
+    exam_id: int,
+    task: Optional[int] = Form(None),
+    section: str = Form(""),
+    question: Optional[int] = Form(None),
+    question_type: str = Form(""),
+    instructions: str = Form(""),
+    db: Session = Depends(get_db)
+):
+    """
+    Regenerate one part of a saved exam and patch it (and its answer key) in place:
+    - assignment: task=3
+    - mid/final:  section=B              (the whole section)
+    - any exam:   question=2 [section=B] [question_type=mcq|short|long|scenario]
+    Only that part is sent to the LLM, with the exam's stored lecture context.
+    """
+    exam = await run_in_threadpool(db.get, models.GeneratedExam, exam_id)
+    if not exam:
+        raise HTTPException(404, "Exam not found")
+    if not exam.lecture_context:
+        raise HTTPException(409, "This exam has no stored lecture context; generate it again instead")
+
+    qtype = None
+    if question_type:
+        qtype = question_type.strip().lower().rstrip("s") + "s"
+        if qtype not in dict(QUESTION_TYPE_HEADINGS).values():
+            raise HTTPException(400, "question_type must be mcq, short, long or scenario")
+    section_name = section_key(section) if section.strip() else None
+
+    if task is not None:
+        kind, number, target = "task", task, f"Task {task}"
+    elif question is not None:
+        kind, number = "question", question
+        target = (f"SECTION {section_name} " if section_name else "") + f"question {question}"
+    elif section_name:
+        kind, number, target = "section", None, f"SECTION {section_name}"
+    else:
+        raise HTTPException(400, "Give task, section or question to regenerate")
+
+    # ------------------ locate the part ------------------
+    original = exam.content
+    lines = original.splitlines()
+    structure = await run_in_threadpool(exam_structure, db, exam)
+    q_node = locate(structure, "questions", kind, section_name, qtype, number)
+    a_node = None
+    if structure.answers:
+        # answer keys do not always repeat the question-type headings
+        typed_key = any(b.qtype for s in structure.answers for b in s.blocks)
+        a_node = locate(structure, "answers", kind, section_name, qtype if typed_key else None, number)
+
+    ui_prompt = exam.ui_prompt or ""
+    if kind == "section":
+        # a section only needs its own slice of a sectioned config
+        ui_prompt = dict(split_section_prompts(ui_prompt)).get(section_name, ui_prompt)
+
+    # ------------------ regenerate it ------------------
+    prompt = REGENERATE_PROMPT.render(
+        exam_type=exam.exam_type,
+        ui_prompt=ui_prompt,
+        teacher_prompt=exam.teacher_prompt or "",
+        instructions=instructions,
+        target=target,
+        current_part="\n".join(lines[q_node.start:q_node.end]),
+        current_answer="\n".join(lines[a_node.start:a_node.end]) if a_node else "",
+        context=exam.lecture_context,
+    )
+    async with generation_slots:
+        with stage_timer.time("regeneration"):
+            raw = await generate_with_llama(prompt, bypass_cache=True, max_tokens=REGENERATION_MAX_TOKENS)
+    text = clean_output(raw)
+    if not text:
+        # nothing to patch in; the stored exam is left unchanged
+        raise HTTPException(502, "The model returned an empty answer; try again")
+    name = section_name if kind == "section" else number
+
+    # ------------------ patch the content ------------------
+    # answer key first: it comes after the questions, so their line numbers stay valid
+    if a_node is not None:
+        new_answer = generated_lines(text, "answers", kind, name)
+        if any(l.strip() for l in new_answer):
+            lines = patch_lines(lines, a_node, kind, new_answer)
+
+    new_part = generated_lines(text, "questions", kind, name)
+    if not any(l.strip() for l in new_part):
+        raise HTTPException(422, f"The model output has no {target}; try again")
+    own_line = False
+    if kind == "task":
+        total_tasks, scenario_tasks = extract_assignment_requirements(exam.ui_prompt or "")
+        if scenario_tasks and task > total_tasks - scenario_tasks:
+            head = TASK_HEADER_RE.match(new_part[0]) if new_part else None
+            body = "\n".join([new_part[0][head.end():] if head else new_part[0]] + new_part[1:]) if new_part else ""
+            new_part, own_line = _normalize_to_scenario(body).rstrip().splitlines(), True
+    lines = patch_lines(lines, q_node, kind, new_part, own_line=own_line)
+
+    content = "\n".join(lines).strip() + "\n"
+
+    prompt_version = exam.prompt_version
+    if REGENERATE_PROMPT.version not in (prompt_version or ""):
+        prompt_version = "+".join(filter(None, [prompt_version, REGENERATE_PROMPT.version]))
+
+    def save():
+        # compare-and-set: only replace the content this regeneration started from
+        updated = (
+            db.query(models.GeneratedExam)
+            .filter(models.GeneratedExam.id == exam_id, models.GeneratedExam.content == original)
+            .update({
+                "content": content,
+                "structure": parse_exam(content, exam.exam_type).to_dict(),
+                "prompt_version": prompt_version,
+            }, synchronize_session=False)
         )
-        db.add(exam)
+        if not updated:
+            db.rollback()
+            raise HTTPException(409, "The exam changed while this part was regenerated; try again")
         db.commit()
         db.refresh(exam)
-
         return exam
 
-    except Exception as e:
-        raise HTTPException(status_code=500, detail=str(e))
+    return await run_in_threadpool(save)
 
-# ------------------ DOWNLOAD ENDPOINT ------------------
-@app.get("/api/download/{exam_id}")
-def download_exam(
-    exam_id: int,
-    format: str,
-    include_answers: bool = True,
+
+# =========================================================
+# GENERATE EXAM (BACKGROUND JOBS)
+# =========================================================
+async def run_generation_job(job: models.GenerationJob, uploads, report_stage) -> int:
+    exam_text, context = await run_generation_pipeline(
+        uploads, job.teacher_id, job.exam_type, job.prompt, job.teacher_prompt or "",
+        job.namespace, bypass_cache=bool(job.bypass_cache), report_stage=report_stage
+    )
+    db = SessionLocal()
+    try:
+        exam = await run_in_threadpool(
+            save_exam, db, job.teacher_id, job.exam_type, exam_text,
+            ui_prompt=job.prompt, teacher_prompt=job.teacher_prompt or "", lecture_context=context
+        )
+        return exam.id
+    finally:
+        db.close()
+
+
+job_queue = JobQueue(runner=run_generation_job)
+
+
+def job_status(job: models.GenerationJob) -> Dict[str, Any]:
+    return {
+        "job_id": job.id,
+        "status": job.status,
+        "stage": job.stage,
+        "progress": job.progress,
+        "queue_position": job_queue.queue_position(job.id) if job.status == "queued" else None,
+        "exam_id": job.exam_id,
+        "error": job.error,
+        "created_at": job.created_at,
+        "started_at": job.started_at,
+        "finished_at": job.finished_at,
+    }
+
+
+@app.post("/api/jobs/generate-exam", status_code=202)
+async def submit_generation_job(
+    exam_type: str = Form(...),
+    prompt: str = Form(...),
+    teacher_prompt: str = Form(""),
+    session_id: str = Form(""),
+    bypass_cache: bool = Form(False),
+    files: List[UploadFile] = File(...),
     db: Session = Depends(get_db)
 ):
-    exam = db.query(models.GeneratedExam).get(exam_id)
+    """Same form as /api/generate-exam, but returns a job id immediately."""
+    teacher = await run_in_threadpool(get_or_create_teacher, db)
+    uploads = await read_uploads(files)
+
+    job_id = await job_queue.submit(
+        teacher.id, uploads,
+        exam_type=exam_type,
+        prompt=prompt,
+        teacher_prompt=teacher_prompt,
+        namespace=rag_namespace(teacher.id, session_id),
+        bypass_cache=bypass_cache,
+    )
+    return {
+        "job_id": job_id,
+        "status": "queued",
+        "status_url": f"/api/jobs/{job_id}",
+        "result_url": f"/api/jobs/{job_id}/result",
+    }
+
+
+@app.get("/api/jobs/{job_id}")
+async def get_generation_job(job_id: str):
+    job = await run_in_threadpool(job_queue.get, job_id)
+    if not job:
+        raise HTTPException(404, "Job not found")
+    return job_status(job)
+
+
+@app.get("/api/jobs/{job_id}/result", response_model=schemas.ExamOut)
+async def get_generation_job_result(job_id: str, db: Session = Depends(get_db)):
+    job = await run_in_threadpool(job_queue.get, job_id)
+    if not job:
+        raise HTTPException(404, "Job not found")
+    if job.status == "failed":
+        raise HTTPException(500, job.error or "Job failed")
+    if job.status != "succeeded":
+        raise HTTPException(409, f"Job is {job.status} ({job.stage}, {job.progress}%)")
+
+    exam = db.get(models.GeneratedExam, job.exam_id)
     if not exam:
         raise HTTPException(404, "Exam not found")
+    return exam
 
-    exam_type = exam.exam_type if hasattr(exam, "exam_type") else "quiz"
-    prompt = ""
-
-    if format == "docx":
-        doc = generate_docx(exam.content, include_answers, prompt, exam_type)
-        buf = BytesIO()
-        doc.save(buf)
-        buf.seek(0)
-        return StreamingResponse(
-            buf,
-            media_type="application/vnd.openxmlformats-officedocument.wordprocessingml.document",
-            headers={"Content-Disposition": "attachment; filename=exam.docx"}
-        )
+# =========================================================
+# GENERATE EXAM (SERVER-SENT EVENTS)
+# =========================================================
+def sse_event(event: str, data: Dict[str, Any]) -> str:
+    # JSON keeps newlines inside the text from breaking the SSE framing
+    return f"event: {event}\ndata: {json.dumps(data, ensure_ascii=False)}\n\n"
 
-    if format == "pdf":
-        pdf = generate_pdf(exam.content, include_answers, prompt, exam_type)
-        return StreamingResponse(
-            pdf,
-            media_type="application/pdf",
-            headers={"Content-Disposition": "attachment; filename=exam.pdf"}
-        )
 
-    raise HTTPException(400, "Invalid format")
+@app.post("/api/generate-exam/stream")
+async def generate_exam_stream(
+    exam_type: str = Form(...),
+    prompt: str = Form(...),
+    teacher_prompt: str = Form(""),
+    session_id: str = Form(""),
+    bypass_cache: bool = Form(False),
+    files: List[UploadFile] = File(...),
+    db: Session = Depends(get_db)
+):
+    """
+    Streaming variant of /api/generate-exam.
+
+    Events:
+      status  {"stage": "..."}                    pipeline progress
+      token   {"text": "..."}                     raw model output as it arrives
+      done    {"id", "exam_type", "content"}      final post-processed + saved exam
+      error   {"detail": "..."}
+    """
+    # read everything from the request before the response starts
+    teacher = await run_in_threadpool(get_or_create_teacher, db)
+    teacher_id = teacher.id
+    uploads = await read_uploads(files)
+    namespace = rag_namespace(teacher_id, session_id)
+
+    async def events():
+        yield ": connected\n\n"
+        try:
+            async with generation_slots:
+                yield sse_event("status", {"stage": "retrieving_context"})
+                (final_prompt,), context = await prepare_generation(
+                    uploads, teacher_id, [prompt], teacher_prompt, namespace
+                )
+
+                yield sse_event("status", {"stage": "generating"})
+                parts = []
+                async for delta in stream_with_llama(final_prompt, bypass_cache=bypass_cache):
+                    parts.append(delta)
+                    yield sse_event("token", {"text": delta})
+
+            yield sse_event("status", {"stage": "post_processing"})
+            exam_text = postprocess_exam("".join(parts), exam_type, prompt)
+
+            # the request-scoped session may already be closed while streaming
+            stream_db = SessionLocal()
+            try:
+                exam = await run_in_threadpool(
+                    save_exam, stream_db, teacher_id, exam_type, exam_text,
+                    ui_prompt=prompt, teacher_prompt=teacher_prompt, lecture_context=context
+                )
+                payload = {
+                    "id": exam.id,
+                    "exam_type": exam.exam_type,
+                    "content": exam.content,
+                    "prompt_version": exam.prompt_version,
+                }
+            finally:
+                stream_db.close()
+
+            yield sse_event("done", payload)
+
+        except HTTPException as e:
+            yield sse_event("error", {"detail": e.detail})
+        except Exception as e:
+            yield sse_event("error", {"detail": str(e)})
+
+    return StreamingResponse(
+        events(),
+        media_type="text/event-stream",
+        headers={
+            "Cache-Control": "no-cache",
+            "X-Accel-Buffering": "no",   # don't let nginx buffer the stream
+        }
+    )
@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, String, Text, DateTime, ForeignKey
+from sqlalchemy import Column, Integer, String, Text, DateTime, Boolean, ForeignKey, JSON
 from sqlalchemy.sql import func
 from .database import Base
 
@@ -19,3 +19,47 @@ class GeneratedExam(Base):
     exam_type = Column(String(50))
     content = Column(Text)
     created_at = Column(DateTime(timezone=True), server_default=func.now())
+
+    # exams generated together as variants A/B/C share a variant_group
+    variant_group = Column(String(32), index=True)
+    variant_label = Column(String(10))
+
+    # prompt template that produced the exam, e.g. "exam@3f9c2a1b7d04"
+    prompt_version = Column(String(64))
+
+    # what the exam was generated from, so parts of it can be regenerated later
+    ui_prompt = Column(Text)
+    lecture_context = Column(Text)
+    teacher_prompt = Column(Text)
+
+    # parsed structure of `content` (app.core.exam_ast), kept in sync with it
+    structure = Column(JSON)
+
+
+class GenerationJob(Base):
+    """One queued /api/jobs/generate-exam request and its progress."""
+    __tablename__ = "generation_jobs"
+
+    id = Column(String(32), primary_key=True)          # uuid4 hex
+    teacher_id = Column(Integer, ForeignKey("teachers.id"))
+    status = Column(String(20), nullable=False, default="queued", index=True)   # queued | running | succeeded | failed
+    stage = Column(String(50), default="queued")
+    progress = Column(Integer, default=0)               # 0-100
+
+    exam_type = Column(String(50))
+    prompt = Column(Text)
+    teacher_prompt = Column(Text)
+    namespace = Column(String(255))
+    bypass_cache = Column(Boolean, default=False)
+    upload_dir = Column(String(500))                    # uploads persisted here until the job ends
+
+    attempts = Column(Integer, default=0)
+    error = Column(Text)
+    exam_id = Column(Integer, ForeignKey("generated_exams.id"))
+
+    owner = Column(String(64))                          # process holding the lease while running
+    heartbeat_at = Column(DateTime(timezone=True))      # lease renewed by the owner while running
+
+    created_at = Column(DateTime(timezone=True), server_default=func.now())
+    started_at = Column(DateTime(timezone=True))
+    finished_at = Column(DateTime(timezone=True))
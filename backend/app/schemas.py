@@ -19,14 +19,28 @@ class TeacherOut(BaseModel):
 
 
 # -------- EXAM --------
-from pydantic import BaseModel
-from datetime import datetime
+from typing import Optional
 
 class ExamOut(BaseModel):
     id: int
     exam_type: str
     content: str     # ✅ MUST MATCH DB MODEL
+    prompt_version: Optional[str] = None
 
     class Config:
         orm_mode = True
 
+
+# -------- BULK EXPORT --------
+from typing import List
+
+class BulkExportRequest(BaseModel):
+    # either explicit ids, or filters (combined with AND)
+    exam_ids: Optional[List[int]] = None
+    teacher_id: Optional[int] = None
+    exam_types: Optional[List[str]] = None
+    created_from: Optional[datetime] = None
+    created_to: Optional[datetime] = None
+
+    formats: List[str] = ["docx", "pdf"]
+    include_answers: bool = True
@@ -0,0 +1,145 @@
+"""
+Fast DOCX export of an exam.
+
+python-docx's Document() opens and parses the default template package
+(including a ~430 KB styles.xml) on every call, and add_paragraph() builds
+each line through its object model. Here the template is read once into a
+BasePackage: every part except word/document.xml is already compressed
+into a small ZIP, and the document XML is kept as the text before and
+after the body. A render only builds the body XML for all lines in one
+pass, appends word/document.xml to a copy of the base ZIP and returns the
+bytes:
+
+    data = render_exam_docx(exam.content)
+
+Paragraph styles come from the exam structure (app.core.exam_ast), see
+DOCX_STYLES. The text of every line is written unchanged, and blank lines
+stay empty paragraphs, as in the python-docx export.
+"""
+import re
+import threading
+import zipfile
+from io import BytesIO
+from typing import Dict, Optional, Tuple
+from xml.sax.saxutils import escape
+
+from app.core.exam_ast import OPTION_RE, ExamAST, parse_exam
+
+DOCUMENT_PART = "word/document.xml"
+
+# line role -> (paragraph style id, character style id); None = document default
+DOCX_STYLES: Dict[str, Tuple[Optional[str], Optional[str]]] = {
+    "section": ("Heading1", None),          # SECTION A: TOTAL MARKS = 20
+    "answer_key": ("Heading1", None),       # === ANSWER KEY ===
+    "block": ("Heading2", None),            # Multiple Choice Questions (1 mark each)
+    "question": (None, "Strong"),           # 1) Which statement ...
+    "option": ("ListParagraph", None),      #    A) ...
+}
+
+# characters XML 1.0 does not allow (python-docx refuses them outright)
+_INVALID_XML_RE = re.compile(r"[\x00-\x08\x0b\x0c\x0e-\x1f\ufffe\uffff]")
+_BODY_RE = re.compile(r"(<w:body>)(.*?)(<w:sectPr\b.*</w:body>.*)$", re.DOTALL)
+_STYLE_ID_RE = re.compile(r'w:styleId="([^"]+)"')
+
+
+# =========================================================
+# BASE PACKAGE (loaded once per process)
+# =========================================================
+class BasePackage:
+    def __init__(self, template_path: str):
+        with zipfile.ZipFile(template_path) as template:
+            parts = [(info.filename, template.read(info.filename)) for info in template.infolist()]
+
+        buffer = BytesIO()
+        with zipfile.ZipFile(buffer, "w", zipfile.ZIP_DEFLATED) as archive:
+            for name, data in parts:
+                if name != DOCUMENT_PART:
+                    archive.writestr(name, data)
+        self.archive = buffer.getvalue()
+
+        document = dict(parts)[DOCUMENT_PART].decode("utf-8")
+        head, _, tail = _BODY_RE.search(document).groups()
+        self.head = document[:document.index(head)] + head
+        self.tail = tail               # <w:sectPr> ... </w:body></w:document>
+
+        style_ids = set(_STYLE_ID_RE.findall(dict(parts).get("word/styles.xml", b"").decode("utf-8")))
+        self.paragraph_open = {
+            role: self._open_tags(pstyle if pstyle in style_ids else None, rstyle if rstyle in style_ids else None)
+            for role, (pstyle, rstyle) in DOCX_STYLES.items()
+        }
+        self.paragraph_open[None] = self._open_tags(None, None)
+
+    @staticmethod
+    def _open_tags(pstyle: Optional[str], rstyle: Optional[str]) -> str:
+        ppr = f'<w:pPr><w:pStyle w:val="{pstyle}"/></w:pPr>' if pstyle else ""
+        rpr = f'<w:rPr><w:rStyle w:val="{rstyle}"/></w:rPr>' if rstyle else ""
+        return f'<w:p>{ppr}<w:r>{rpr}<w:t xml:space="preserve">'
+
+
+_base: Optional[BasePackage] = None
+_base_lock = threading.Lock()
+
+
+def load_base_package() -> BasePackage:
+    """The default python-docx template, read and compressed once."""
+    global _base
+    if _base is None:
+        with _base_lock:
+            if _base is None:
+                from docx.api import _default_docx_path
+                _base = BasePackage(_default_docx_path())
+    return _base
+
+
+# =========================================================
+# BODY
+# =========================================================
+def line_roles(lines, structure: ExamAST) -> Dict[int, str]:
+    """Line index -> DOCX_STYLES role, from the parsed exam."""
+    roles: Dict[int, str] = {}
+    for part in (structure.questions, structure.answers):
+        for section in part:
+            for block in section.blocks:
+                if block.heading is not None:
+                    roles[block.start] = "block"
+                if part is structure.answers:
+                    continue
+                for item in block.items:
+                    if item.kind != "question":
+                        continue
+                    roles[item.start] = "question"
+                    if item.options:
+                        for i in range(item.start + 1, min(item.end, len(lines))):
+                            if OPTION_RE.match(lines[i]):
+                                roles[i] = "option"
+            if section.heading is not None:
+                roles[section.start] = "section"
+    if structure.answer_key_line is not None:
+        roles[structure.answer_key_line] = "answer_key"
+    return roles
+
+
+def _text_xml(line: str) -> str:
+    text = escape(_INVALID_XML_RE.sub("", line))
+    # tabs are their own run element in WordprocessingML (as python-docx writes them)
+    return text.replace("\t", '</w:t><w:tab/><w:t xml:space="preserve">')
+
+
+def document_xml(content: str, base: BasePackage, structure: Optional[ExamAST] = None) -> str:
+    lines = content.splitlines()
+    roles = line_roles(lines, structure or parse_exam(content))
+    opened = base.paragraph_open
+    body = [
+        "<w:p/>" if not line.strip() else f"{opened[roles.get(i)]}{_text_xml(line)}</w:t></w:r></w:p>"
+        for i, line in enumerate(lines)
+    ]
+    return base.head + "".join(body) + base.tail
+
+
+def render_exam_docx(content: str, structure: Optional[ExamAST] = None) -> bytes:
+    base = load_base_package()
+    xml = document_xml(content, base, structure)
+    buffer = BytesIO(base.archive)
+    with zipfile.ZipFile(buffer, "a", zipfile.ZIP_DEFLATED) as archive:
+        archive.writestr(DOCUMENT_PART, xml)
+    return buffer.getvalue()
@@ -0,0 +1,64 @@
+import hashlib
+import os
+from typing import Optional
+
+from app.utils.disk_cache import DiskLRUCache
+
+
+EXPORT_CACHE_DIR = os.getenv("EXPORT_CACHE_DIR", "cache/exports")
+EXPORT_CACHE_MAX_MB = int(os.getenv("EXPORT_CACHE_MAX_MB", "256"))
+
+
+class ExportCache:
+    """
+    Persistent cache of rendered downloads (DOCX / PDF bytes).
+
+    Key = SHA-256(renderer version, exam id, content hash, format,
+    include_answers). The key doubles as the download's strong ETag, so a
+    repeat download can be answered with 304 before anything is read or
+    rendered. Editing an exam (regeneration) changes its content hash and
+    bumping the renderer version invalidates every old entry.
+    """
+
+    def __init__(
+        self,
+        renderer_version: str,
+        directory: str = EXPORT_CACHE_DIR,
+        max_mb: int = EXPORT_CACHE_MAX_MB,
+    ):
+        self.renderer_version = renderer_version
+        self.store = DiskLRUCache(directory, max_bytes=max_mb * 1024 * 1024)
+        self.not_modified = 0
+
+    def key_for(self, exam_id: int, content: str, format: str, include_answers: bool) -> str:
+        content_hash = hashlib.sha256(content.encode("utf-8")).hexdigest()
+        return hashlib.sha256(
+            f"{self.renderer_version}:{exam_id}:{content_hash}:{format}:{int(include_answers)}".encode("utf-8")
+        ).hexdigest()
+
+    @staticmethod
+    def etag(key: str) -> str:
+        return f'"{key}"'
+
+    def matches(self, if_none_match: Optional[str], key: str) -> bool:
+        """True if the client's If-None-Match already names this rendering."""
+        if not if_none_match:
+            return False
+        tags = [tag.strip() for tag in if_none_match.split(",")]
+        if "*" in tags or self.etag(key) in tags:
+            self.not_modified += 1
+            return True
+        return False
+
+    def get(self, key: str) -> Optional[bytes]:
+        return self.store.get(key)
+
+    def put(self, key: str, data: bytes):
+        self.store.put(key, data)
+
+    def stats(self) -> dict:
+        return {
+            "renderer_version": self.renderer_version,
+            "not_modified": self.not_modified,
+            **self.store.stats(),
+        }
@@ -0,0 +1,68 @@
+import asyncio
+import multiprocessing
+import os
+from concurrent.futures import ProcessPoolExecutor
+from typing import Optional
+
+from app.core.exam_ast import ExamAST
+from app.services.exam_docx import render_exam_docx
+from app.services.exam_pdf import render_exam_pdf
+
+
+EXPORT_WORKERS = int(os.getenv("EXPORT_WORKERS", str(min(4, os.cpu_count() or 1))))
+
+
+# =========================================================
+# RENDERER (module level so the process pool can pickle it)
+# =========================================================
+def render_document(content: str, format: str, structure: Optional[ExamAST] = None) -> bytes:
+    """structure: the exam's stored AST (parsed from content when not given)."""
+    if format == "docx":
+        return render_exam_docx(content, structure)
+    if format == "pdf":
+        return render_exam_pdf(content, structure)
+    raise ValueError(f"Unsupported export format: {format}")
+
+
+# =========================================================
+# ENGINE
+# =========================================================
+class ExportEngine:
+    """
+    Process-pool rendering of exam documents (bulk export).
+
+    - Each DOCX / PDF is rendered in its own task, so many exams use every core
+    - max_workers <= 1 renders in a thread instead (no pool)
+    """
+
+    def __init__(self, max_workers: int = EXPORT_WORKERS):
+        self.max_workers = max_workers
+        self._executor: Optional[ProcessPoolExecutor] = None
+
+    @property
+    def executor(self) -> ProcessPoolExecutor:
+        # created on first use so importing the app does not spawn processes
+        if self._executor is None:
+            self._executor = ProcessPoolExecutor(
+                max_workers=self.max_workers,
+                mp_context=multiprocessing.get_context("spawn"),
+            )
+        return self._executor
+
+    @property
+    def concurrency(self) -> int:
+        """Renders worth keeping in flight: enough to keep every worker busy."""
+        return max(1, self.max_workers) * 2
+
+    async def arender(self, content: str, format: str, structure: Optional[ExamAST] = None) -> bytes:
+        loop = asyncio.get_running_loop()
+        executor = self.executor if self.max_workers > 1 else None
+        return await loop.run_in_executor(executor, render_document, content, format, structure)
+
+    def shutdown(self):
+        if self._executor is not None:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+            self._executor = None
+
+
+export_engine = ExportEngine()
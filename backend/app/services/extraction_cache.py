@@ -0,0 +1,53 @@
+import hashlib
+import os
+from typing import List, Optional
+
+from app.utils.disk_cache import DiskLRUCache
+
+
+EXTRACTION_CACHE_DIR = os.getenv("EXTRACTION_CACHE_DIR", "cache/extraction")
+EXTRACTION_CACHE_MAX_MB = int(os.getenv("EXTRACTION_CACHE_MAX_MB", "512"))
+
+# separates the stored pages / slides of one upload
+PAGE_BREAK = "\f"
+
+
+class ExtractionCache:
+    """
+    Persistent cache of extracted lecture text.
+
+    Key = SHA-256(extractor version + upload bytes), so the same file uploaded
+    again (any filename, any teacher) skips PDF/PPTX/DOCX parsing entirely.
+    Bumping the extractor version invalidates every old entry.
+    """
+
+    def __init__(
+        self,
+        extractor_version: str,
+        directory: str = EXTRACTION_CACHE_DIR,
+        max_mb: int = EXTRACTION_CACHE_MAX_MB,
+    ):
+        self.extractor_version = extractor_version
+        self.store = DiskLRUCache(directory, max_bytes=max_mb * 1024 * 1024)
+
+    def key_for(self, raw: bytes, filename: str) -> str:
+        # the extension decides which parser runs, so it is part of the key
+        ext = os.path.splitext(filename.lower())[1]
+        h = hashlib.sha256()
+        h.update(f"{self.extractor_version}:{ext}:".encode("utf-8"))
+        h.update(raw)
+        return h.hexdigest()
+
+    def get(self, raw: bytes, filename: str) -> Optional[List[str]]:
+        """Cached pages / slides of the upload, or None."""
+        data = self.store.get(self.key_for(raw, filename))
+        if data is None:
+            return None
+        return data.decode("utf-8").split(PAGE_BREAK)
+
+    def put(self, raw: bytes, filename: str, pages: List[str]):
+        text = PAGE_BREAK.join(page.replace(PAGE_BREAK, "\n") for page in pages)
+        self.store.put(self.key_for(raw, filename), text.encode("utf-8"))
+
+    def stats(self) -> dict:
+        return {"extractor_version": self.extractor_version, **self.store.stats()}
@@ -0,0 +1,145 @@
+import asyncio
+import multiprocessing
+import os
+from concurrent.futures import ProcessPoolExecutor
+from io import BytesIO
+from typing import List, Optional, Tuple
+
+
+EXTRACTION_WORKERS = int(os.getenv("EXTRACTION_WORKERS", str(min(4, os.cpu_count() or 1))))
+EXTRACTION_PAGES_PER_TASK = int(os.getenv("EXTRACTION_PAGES_PER_TASK", "16"))
+
+SUPPORTED_EXTENSIONS = (".pdf", ".pptx", ".docx", ".txt")
+
+
+# =========================================================
+# WORKER FUNCTIONS (run inside the process pool)
+# =========================================================
+def _pdf_page_count(raw: bytes, pdf_reader: str) -> int:
+    if pdf_reader == "pdfplumber":
+        import pdfplumber
+        with pdfplumber.open(BytesIO(raw)) as pdf:
+            return len(pdf.pages)
+
+    from pypdf import PdfReader
+    return len(PdfReader(BytesIO(raw)).pages)
+
+
+def _extract_pdf_pages(raw: bytes, start: int, end: int, pdf_reader: str) -> List[str]:
+    """Text of pages [start, end) — one string per page."""
+    if pdf_reader == "pdfplumber":
+        import pdfplumber
+        with pdfplumber.open(BytesIO(raw)) as pdf:
+            return [pdf.pages[i].extract_text() or "" for i in range(start, end)]
+
+    from pypdf import PdfReader
+    reader = PdfReader(BytesIO(raw))
+    return [reader.pages[i].extract_text() or "" for i in range(start, end)]
+
+
+def _extract_whole_file(raw: bytes, filename: str) -> List[str]:
+    """Text pieces of a non-PDF upload: one per PPTX slide, else the whole text."""
+    if filename.endswith(".pptx"):
+        from pptx import Presentation
+        prs = Presentation(BytesIO(raw))
+        slides = []
+        for slide in prs.slides:
+            texts = [shape.text for shape in slide.shapes if hasattr(shape, "text") and shape.text.strip()]
+            if texts:
+                slides.append("\n".join(texts))
+        return slides
+
+    if filename.endswith(".docx"):
+        from docx import Document
+        doc = Document(BytesIO(raw))
+        return ["\n".join(p.text for p in doc.paragraphs if p.text.strip())]
+
+    if filename.endswith(".txt"):
+        return [raw.decode("utf-8", errors="ignore")]
+
+    raise ValueError(f"Unsupported file format: {filename}")
+
+
+# =========================================================
+# ENGINE
+# =========================================================
+class ExtractionEngine:
+    """
+    Process-pool text extraction.
+
+    - Several uploads are extracted at the same time
+    - Large PDFs are split into page ranges that run on different workers;
+      a PDF is never cut into more ranges than there are workers, because
+      every range task receives and opens the whole file
+    - Page counting runs in the pool too, not in the caller
+    - Results are always reassembled in upload / page order
+    - max_workers <= 1 runs everything in a thread (no pool)
+    """
+
+    def __init__(
+        self,
+        max_workers: int = EXTRACTION_WORKERS,
+        pages_per_task: int = EXTRACTION_PAGES_PER_TASK,
+    ):
+        self.max_workers = max_workers
+        self.pages_per_task = max(1, pages_per_task)
+        self._executor: Optional[ProcessPoolExecutor] = None
+
+    @property
+    def executor(self) -> ProcessPoolExecutor:
+        # created on first use so importing the app does not spawn processes
+        if self._executor is None:
+            self._executor = ProcessPoolExecutor(
+                max_workers=self.max_workers,
+                mp_context=multiprocessing.get_context("spawn"),
+            )
+        return self._executor
+
+    async def _arun(self, fn, *args):
+        """Run fn off the event loop: in the pool, or in a thread when there is no pool."""
+        if self.max_workers <= 1:
+            return await asyncio.get_running_loop().run_in_executor(None, fn, *args)
+        return await asyncio.wrap_future(self.executor.submit(fn, *args))
+
+    # ------------------ SCHEDULING ------------------
+    def _page_ranges(self, page_count: int) -> List[Tuple[int, int]]:
+        # one contiguous range per worker (each task re-opens the PDF),
+        # but never split below pages_per_task pages
+        step = max(self.pages_per_task, -(-page_count // max(1, self.max_workers)))
+        return [(s, min(s + step, page_count)) for s in range(0, page_count, step)]
+
+    async def _aextract_pdf(self, raw: bytes, pdf_reader: str) -> List[str]:
+        page_count = await self._arun(_pdf_page_count, raw, pdf_reader)
+        parts = await asyncio.gather(*(
+            self._arun(_extract_pdf_pages, raw, start, end, pdf_reader)
+            for start, end in self._page_ranges(page_count)
+        ))
+        return [page for pages in parts for page in pages]
+
+    async def _aextract_file(self, filename: str, raw: bytes, pdf_reader: str) -> List[str]:
+        filename = filename.lower()
+        if filename.endswith(".pdf"):
+            return await self._aextract_pdf(raw, pdf_reader)
+        return await self._arun(_extract_whole_file, raw, filename)
+
+    # ------------------ PUBLIC API ------------------
+    async def aextract_many(self, files: List[Tuple[str, bytes]], pdf_reader: str = "pypdf") -> List[List[str]]:
+        """
+        Extract (filename, raw_bytes) pairs off the event loop, in the same order.
+        Each file is a list of text pieces: PDF pages, PPTX slides, or the whole text.
+        """
+        return list(await asyncio.gather(*(
+            self._aextract_file(name, raw, pdf_reader) for name, raw in files
+        )))
+
+    async def aextract_pdf_pages(self, raw: bytes, pdf_reader: str = "pypdf") -> List[str]:
+        """One string per page, in page order."""
+        return await self._aextract_pdf(raw, pdf_reader)
+
+    def shutdown(self):
+        if self._executor is not None:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+            self._executor = None
+
+
+extraction_engine = ExtractionEngine()
@@ -0,0 +1,386 @@
+"""
+Background exam-generation jobs.
+
+POST returns a job id at once; a small pool of asyncio workers runs the
+pipeline and records status / stage / progress in the generation_jobs table.
+
+- uploads are written to JOB_UPLOAD_DIR/<job id>/ so a job can be re-run
+  after a restart; the directory is removed when the job finishes
+- a job is claimed with a conditional UPDATE (queued -> running) that also
+  records the claiming process as its owner; while it runs, the owner renews
+  heartbeat_at every JOB_LEASE_SECONDS / 3
+- on startup, and every JOB_LEASE_SECONDS afterwards, 'running' jobs whose
+  lease expired (owner crashed or was killed) are put back to 'queued'; jobs
+  still heartbeating in a sibling uvicorn worker are left alone
+- on a clean shutdown a process hands its running jobs back to the queue
+- the DB row is the source of truth, the asyncio queue only wakes the workers
+"""
+import asyncio
+import logging
+import os
+import shutil
+import socket
+import time
+import uuid
+from collections import deque
+from datetime import datetime, timedelta, timezone
+from typing import Awaitable, Callable, List, Optional, Tuple
+
+from fastapi.concurrency import run_in_threadpool
+from sqlalchemy import or_
+
+from app import models
+from app.database import SessionLocal
+
+logger = logging.getLogger(__name__)
+
+
+JOB_WORKERS = int(os.getenv("JOB_WORKERS", "2"))
+JOB_UPLOAD_DIR = os.getenv("JOB_UPLOAD_DIR", "cache/jobs")
+JOB_MAX_ATTEMPTS = int(os.getenv("JOB_MAX_ATTEMPTS", "3"))
+JOB_LEASE_SECONDS = float(os.getenv("JOB_LEASE_SECONDS", "60"))
+
+# stage name -> progress % reported when the stage starts
+JOB_STAGES = {
+    "queued": 0,
+    "extracting": 10,
+    "indexing": 30,
+    "retrieving": 45,
+    "generating": 55,
+    "post_processing": 90,
+    "done": 100,
+}
+
+Upload = Tuple[str, bytes]
+ReportStage = Callable[[str], Awaitable[None]]
+# (job row, uploads, report_stage) -> saved exam id
+JobRunner = Callable[[models.GenerationJob, List[Upload], ReportStage], Awaitable[int]]
+
+
+def _now() -> datetime:
+    return datetime.now(timezone.utc)
+
+
+def _timestamp(value: Optional[datetime]) -> Optional[float]:
+    if value is None:
+        return None
+    if value.tzinfo is None:
+        # SQLite drops the timezone; we always store UTC
+        value = value.replace(tzinfo=timezone.utc)
+    return value.timestamp()
+
+
+class JobQueue:
+    def __init__(
+        self,
+        runner: JobRunner,
+        workers: int = JOB_WORKERS,
+        upload_dir: str = JOB_UPLOAD_DIR,
+        max_attempts: int = JOB_MAX_ATTEMPTS,
+        lease_seconds: float = JOB_LEASE_SECONDS,
+    ):
+        self.runner = runner
+        self.workers = max(1, workers)
+        self.upload_dir = upload_dir
+        self.max_attempts = max_attempts
+        self.lease_seconds = lease_seconds
+        # unique per process, so sibling uvicorn workers never share a lease
+        self.owner = f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:8]}"[-64:]
+
+        self._queue: Optional[asyncio.Queue] = None
+        self._tasks: List[asyncio.Task] = []
+        self._enqueued_at: dict = {}        # job id -> enqueue time, in queue order (waiting jobs only)
+        self._running = 0
+        self._waits = deque(maxlen=200)     # recent queue wait times (seconds)
+
+        self.submitted = 0
+        self.succeeded = 0
+        self.failed = 0
+        self.recovered = 0
+
+    # ------------------ PERSISTENCE ------------------
+    def _write_uploads(self, job_id: str, uploads: List[Upload]) -> str:
+        job_dir = os.path.join(self.upload_dir, job_id)
+        os.makedirs(job_dir, exist_ok=True)
+        for idx, (filename, raw) in enumerate(uploads):
+            # index prefix keeps upload order and makes duplicate names safe
+            path = os.path.join(job_dir, f"{idx:04d}_{os.path.basename(filename)}")
+            with open(path, "wb") as f:
+                f.write(raw)
+        return job_dir
+
+    @staticmethod
+    def _read_uploads(job_dir: str) -> List[Upload]:
+        uploads = []
+        for name in sorted(os.listdir(job_dir)):
+            with open(os.path.join(job_dir, name), "rb") as f:
+                uploads.append((name.split("_", 1)[1], f.read()))
+        return uploads
+
+    def _create(self, teacher_id: int, uploads: List[Upload], **fields) -> str:
+        job_id = uuid.uuid4().hex
+        upload_dir = self._write_uploads(job_id, uploads)
+        db = SessionLocal()
+        try:
+            db.add(models.GenerationJob(
+                id=job_id,
+                teacher_id=teacher_id,
+                status="queued",
+                stage="queued",
+                progress=0,
+                upload_dir=upload_dir,
+                attempts=0,
+                created_at=_now(),
+                **fields
+            ))
+            db.commit()
+        except Exception:
+            shutil.rmtree(upload_dir, ignore_errors=True)
+            raise
+        finally:
+            db.close()
+        return job_id
+
+    def _update(self, job_id: str, **fields) -> bool:
+        """Update a job this process owns; False if its lease was lost."""
+        db = SessionLocal()
+        try:
+            updated = (
+                db.query(models.GenerationJob)
+                .filter(models.GenerationJob.id == job_id, models.GenerationJob.owner == self.owner)
+                .update(fields, synchronize_session=False)
+            )
+            db.commit()
+            return bool(updated)
+        finally:
+            db.close()
+
+    def _claim(self, job_id: str) -> Optional[models.GenerationJob]:
+        """queued -> running under our lease, atomically; None if someone else has it."""
+        db = SessionLocal()
+        try:
+            now = _now()
+            claimed = (
+                db.query(models.GenerationJob)
+                .filter(models.GenerationJob.id == job_id, models.GenerationJob.status == "queued")
+                .update({
+                    "status": "running",
+                    "owner": self.owner,
+                    "heartbeat_at": now,
+                    "started_at": now,
+                    "attempts": models.GenerationJob.attempts + 1,
+                }, synchronize_session=False)
+            )
+            db.commit()
+            if not claimed:
+                return None
+            job = db.get(models.GenerationJob, job_id)
+            db.expunge(job)
+            return job
+        finally:
+            db.close()
+
+    @staticmethod
+    def get(job_id: str) -> Optional[models.GenerationJob]:
+        db = SessionLocal()
+        try:
+            job = db.get(models.GenerationJob, job_id)
+            if job is not None:
+                db.expunge(job)
+            return job
+        finally:
+            db.close()
+
+    def _requeue_expired(self) -> int:
+        """running -> queued for jobs whose owner stopped renewing its lease."""
+        expired = _now() - timedelta(seconds=self.lease_seconds)
+        db = SessionLocal()
+        try:
+            requeued = (
+                db.query(models.GenerationJob)
+                .filter(
+                    models.GenerationJob.status == "running",
+                    or_(models.GenerationJob.heartbeat_at.is_(None), models.GenerationJob.heartbeat_at < expired),
+                )
+                .update({
+                    "status": "queued", "stage": "queued", "progress": 0,
+                    "owner": None, "heartbeat_at": None,
+                }, synchronize_session=False)
+            )
+            db.commit()
+            return requeued
+        finally:
+            db.close()
+
+    def _recover(self) -> Tuple[int, List[Tuple[str, Optional[float]]]]:
+        """Requeue jobs with an expired lease; return (count, queued jobs oldest first)."""
+        requeued = self._requeue_expired()
+        db = SessionLocal()
+        try:
+            jobs = (
+                db.query(models.GenerationJob.id, models.GenerationJob.created_at)
+                .filter(models.GenerationJob.status == "queued")
+                .order_by(models.GenerationJob.created_at)
+                .all()
+            )
+            return requeued, [(job_id, _timestamp(created)) for job_id, created in jobs]
+        finally:
+            db.close()
+
+    def _release(self) -> int:
+        """Hand this process's running jobs back to the queue (clean shutdown)."""
+        db = SessionLocal()
+        try:
+            released = (
+                db.query(models.GenerationJob)
+                .filter(models.GenerationJob.status == "running", models.GenerationJob.owner == self.owner)
+                .update({
+                    "status": "queued", "stage": "queued", "progress": 0,
+                    "owner": None, "heartbeat_at": None,
+                }, synchronize_session=False)
+            )
+            db.commit()
+            return released
+        finally:
+            db.close()
+
+    # ------------------ LIFECYCLE ------------------
+    async def start(self):
+        self._queue = asyncio.Queue()
+        await self._recover_and_enqueue()
+        self._tasks = [asyncio.create_task(self._worker()) for _ in range(self.workers)]
+        self._tasks.append(asyncio.create_task(self._sweep()))
+
+    async def stop(self):
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+        released = await run_in_threadpool(self._release)
+        if released:
+            logger.info("Job queue: released %d running job(s) for the next start", released)
+
+    async def _recover_and_enqueue(self):
+        requeued, pending = await run_in_threadpool(self._recover)
+        for job_id, created in pending:
+            self._enqueue(job_id, created)
+        self.recovered += requeued
+        if requeued:
+            logger.info("Job queue: requeued %d job(s) with an expired lease", requeued)
+
+    async def _sweep(self):
+        """Pick up jobs whose owner died while this process keeps running."""
+        while True:
+            await asyncio.sleep(self.lease_seconds)
+            try:
+                await self._recover_and_enqueue()
+            except Exception as e:
+                logger.warning("Job queue: lease sweep failed: %s", e)
+
+    async def _heartbeat(self, job_id: str):
+        while True:
+            await asyncio.sleep(self.lease_seconds / 3)
+            try:
+                if not await run_in_threadpool(self._update, job_id, heartbeat_at=_now()):
+                    logger.warning("Job %s: lease lost to another process", job_id)
+                    return
+            except Exception as e:
+                logger.warning("Job %s: heartbeat failed: %s", job_id, e)
+
+    def _enqueue(self, job_id: str, enqueued_at: Optional[float] = None):
+        if job_id in self._enqueued_at:
+            return                          # already waiting here
+        self._enqueued_at[job_id] = enqueued_at or time.time()
+        self._queue.put_nowait(job_id)
+
+    async def submit(self, teacher_id: int, uploads: List[Upload], **fields) -> str:
+        job_id = await run_in_threadpool(self._create, teacher_id, uploads, **fields)
+        self.submitted += 1
+        self._enqueue(job_id)
+        return job_id
+
+    # ------------------ WORKERS ------------------
+    async def _worker(self):
+        while True:
+            job_id = await self._queue.get()
+            enqueued_at = self._enqueued_at.pop(job_id, None)
+            try:
+                await self._run(job_id, enqueued_at)
+            except Exception as e:
+                logger.exception("Job %s crashed the worker loop: %s", job_id, e)
+            finally:
+                self._queue.task_done()
+
+    async def _run(self, job_id: str, enqueued_at: Optional[float] = None):
+        job = await run_in_threadpool(self._claim, job_id)
+        if job is None:
+            return
+        if enqueued_at is not None:
+            self._waits.append(max(0.0, time.time() - enqueued_at))
+
+        async def report_stage(stage: str):
+            await run_in_threadpool(
+                self._update, job_id, stage=stage, progress=JOB_STAGES.get(stage, 0)
+            )
+
+        self._running += 1
+        heartbeat = asyncio.create_task(self._heartbeat(job_id))
+        try:
+            if job.attempts > self.max_attempts:
+                raise RuntimeError(f"Gave up after {self.max_attempts} attempts")
+            uploads = await run_in_threadpool(self._read_uploads, job.upload_dir)
+            exam_id = await self.runner(job, uploads, report_stage)
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            detail = getattr(e, "detail", None) or str(e)
+            finished = await run_in_threadpool(
+                self._update, job_id,
+                status="failed", error=str(detail), finished_at=_now()
+            )
+            if finished:
+                self.failed += 1
+        else:
+            finished = await run_in_threadpool(
+                self._update, job_id,
+                status="succeeded", stage="done", progress=100,
+                exam_id=exam_id, finished_at=_now()
+            )
+            if finished:
+                self.succeeded += 1
+        finally:
+            heartbeat.cancel()
+            self._running -= 1
+
+        if not finished:
+            # the lease expired and the job was requeued; whoever runs it next
+            # still needs the uploads
+            logger.warning("Job %s: lease lost before the job finished; status not recorded", job_id)
+            return
+        shutil.rmtree(job.upload_dir, ignore_errors=True)
+
+    # ------------------ METRICS ------------------
+    def queue_position(self, job_id: str) -> Optional[int]:
+        """1-based position among jobs waiting in this process, None if not waiting."""
+        for pos, queued_id in enumerate(self._enqueued_at, start=1):
+            if queued_id == job_id:
+                return pos
+        return None
+
+    def stats(self) -> dict:
+        now = time.time()
+        waits = sorted(self._waits)
+        return {
+            "workers": self.workers,
+            "queue_depth": len(self._enqueued_at),
+            "running": self._running,
+            "oldest_wait_seconds": (
+                round(now - min(self._enqueued_at.values()), 2) if self._enqueued_at else 0.0
+            ),
+            "avg_wait_seconds": round(sum(waits) / len(waits), 3) if waits else None,
+            "p95_wait_seconds": round(waits[int(0.95 * (len(waits) - 1))], 3) if waits else None,
+            "submitted": self.submitted,
+            "succeeded": self.succeeded,
+            "failed": self.failed,
+            "recovered": self.recovered,
+        }
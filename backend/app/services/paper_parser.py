@@ -1,9 +1,10 @@
 import re
 import io
 from typing import List, Dict, Any
-import pdfplumber
 from fastapi import UploadFile
 
+from app.services.extraction_engine import extraction_engine
+
 # Conditional import for docx
 try:
     from docx import Document
@@ -14,15 +15,11 @@ except ImportError:
 
 
 async def extract_text_from_pdf(upload: UploadFile) -> str:
-    """Extract text from PDF file"""
+    """Extract text from PDF file (pages are split across the extraction pool)"""
     pdf_bytes = await upload.read()
-    
-    with pdfplumber.open(io.BytesIO(pdf_bytes)) as pdf:
-        text = ""
-        for page in pdf.pages:
-            page_text = page.extract_text() or ""
-            text += page_text + "\n"
-    return text
+
+    pages = await extraction_engine.aextract_pdf_pages(pdf_bytes, pdf_reader="pdfplumber")
+    return "".join(page_text + "\n" for page_text in pages)
 
 
 async def extract_text_from_docx(upload: UploadFile) -> str:
@@ -1,18 +1,12 @@
-from docx import Document
 from io import BytesIO
 from reportlab.lib.pagesizes import A4
 from reportlab.pdfgen import canvas
 
+from app.services.exam_docx import render_exam_docx
 
-def export_docx(text: str) -> BytesIO:
-    doc = Document()
-    for line in text.split("\n"):
-        doc.add_paragraph(line)
 
-    buffer = BytesIO()
-    doc.save(buffer)
-    buffer.seek(0)
-    return buffer
+def export_docx(text: str) -> BytesIO:
+    return BytesIO(render_exam_docx(text))
 
 
 def export_pdf(text: str) -> BytesIO:
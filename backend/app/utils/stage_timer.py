@@ -0,0 +1,59 @@
+import threading
+import time
+from collections import defaultdict, deque
+from contextlib import contextmanager
+
+
+class StageTimer:
+    """
+    Wall-clock durations of named pipeline stages (extraction, retrieval, llm, ...).
+    Keeps the last `window` samples per stage for percentiles plus lifetime counts.
+
+        with stage_timer.time("extraction"):
+            texts = await extract_texts(uploads)
+    """
+
+    def __init__(self, window: int = 2000):
+        self._lock = threading.Lock()
+        self._samples = defaultdict(lambda: deque(maxlen=window))
+        self._counts = defaultdict(int)
+        self._errors = defaultdict(int)
+        self._totals = defaultdict(float)
+
+    def record(self, stage: str, seconds: float, ok: bool = True):
+        with self._lock:
+            self._samples[stage].append(seconds)
+            self._counts[stage] += 1
+            self._totals[stage] += seconds
+            if not ok:
+                self._errors[stage] += 1
+
+    @contextmanager
+    def time(self, stage: str):
+        started = time.perf_counter()
+        ok = False
+        try:
+            yield
+            ok = True
+        finally:
+            self.record(stage, time.perf_counter() - started, ok)
+
+    def stats(self) -> dict:
+        out = {}
+        with self._lock:
+            for stage, samples in self._samples.items():
+                ordered = sorted(samples)
+
+                def pct(p: float) -> float:
+                    return round(ordered[int(p * (len(ordered) - 1))], 4)
+
+                out[stage] = {
+                    "count": self._counts[stage],
+                    "errors": self._errors[stage],
+                    "total_seconds": round(self._totals[stage], 3),
+                    "mean_seconds": round(sum(ordered) / len(ordered), 4),
+                    "p50_seconds": pct(0.50),
+                    "p95_seconds": pct(0.95),
+                    "p99_seconds": pct(0.99),
+                }
+        return out
@@ -0,0 +1,49 @@
+import zipfile
+
+
+class _Sink:
+    """Write-only file object that hands out what was written since the last drain()."""
+
+    def __init__(self):
+        self._parts = []
+
+    def write(self, data: bytes) -> int:
+        self._parts.append(bytes(data))
+        return len(data)
+
+    def flush(self):
+        pass
+
+    def drain(self) -> bytes:
+        data = b"".join(self._parts)
+        self._parts.clear()
+        return data
+
+
+class ZipStream:
+    """
+    ZIP archive written incrementally, for streaming responses.
+
+    zipfile falls back to data descriptors when the target cannot seek, so
+    every entry can be sent as soon as it is added and only one file is held
+    in memory at a time.
+
+        archive = ZipStream()
+        for name, data in files:
+            yield archive.add(name, data)
+        yield archive.close()
+    """
+
+    def __init__(self, compression: int = zipfile.ZIP_STORED):
+        self._sink = _Sink()
+        self._zip = zipfile.ZipFile(self._sink, "w", compression=compression)
+        self.entries = 0
+
+    def add(self, name: str, data: bytes) -> bytes:
+        self._zip.writestr(name, data)
+        self.entries += 1
+        return self._sink.drain()
+
+    def close(self) -> bytes:
+        self._zip.close()
+        return self._sink.drain()
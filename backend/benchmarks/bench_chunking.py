@@ -0,0 +1,137 @@
+"""
+Chunking benchmark: old fixed-size character slicer vs app.core.chunker.
+
+    cd backend
+    python -m benchmarks.bench_chunking                  # synthetic lecture text
+    python -m benchmarks.bench_chunking lecture1.pdf ... # real uploads
+    python -m benchmarks.bench_chunking --no-embed       # skip embedding timing
+
+Reports chunk count, average size, how many chunks start/end mid-word, and
+the time to embed all chunks with the EMBEDDING_BACKEND the app uses
+(without the persistent embedding cache). If the backend cannot be loaded
+(missing package, no network for the model download) the embedding time is
+reported as n/a.
+"""
+import argparse
+import random
+import time
+
+from app.core.chunker import iter_chunks, CHUNK_MAX_TOKENS, CHUNK_OVERLAP_TOKENS
+from app.core.tokenizer import count_tokens, tokenizer_name
+
+
+def legacy_chunk_text(text: str, size=800, overlap=100):
+    """The chunk_text() previously used by /api/generate-exam."""
+    chunks, start = [], 0
+    while start < len(text):
+        chunks.append(text[start:start + size])
+        start += size - overlap
+    return chunks
+
+
+def synthetic_lecture(pages: int = 80, seed: int = 7) -> list:
+    rnd = random.Random(seed)
+    words = (
+        "data model training feature gradient network layer loss function "
+        "sample estimate variance bias regression classifier cluster vector "
+        "matrix process system design requirement test deploy schedule risk"
+    ).split()
+    out = []
+    for p in range(pages):
+        paras = [f"Lecture slide {p + 1}"]
+        for _ in range(rnd.randint(2, 5)):
+            sentences = []
+            for _ in range(rnd.randint(2, 6)):
+                n = rnd.randint(6, 24)
+                s = " ".join(rnd.choice(words) for _ in range(n))
+                sentences.append(s.capitalize() + ".")
+            paras.append(" ".join(sentences))
+        out.append("\n\n".join(paras))
+    return out
+
+
+def load_pages(paths: list) -> list:
+    """PDFs page by page, PPTX slide by slide, other files as one piece (same extractors as the app)."""
+    import asyncio
+    from app.services.extraction_engine import extraction_engine
+
+    files = []
+    for path in paths:
+        with open(path, "rb") as f:
+            files.append((path, f.read()))
+    try:
+        extracted = asyncio.run(extraction_engine.aextract_many(files))
+    finally:
+        extraction_engine.shutdown()
+    return [page for pages in extracted for page in pages]
+
+
+def broken_edges(chunks: list) -> int:
+    """Chunks that start or end in the middle of a word."""
+    broken = 0
+    for c in chunks:
+        if c and c[0].isalnum() and c[0].islower():
+            broken += 1
+        if c and c[-1].isalnum() and not c.rstrip().endswith((".", "!", "?")):
+            broken += 1
+    return broken
+
+
+def load_embedder():
+    """(embedder, None), or (None, reason) when the backend cannot be used here."""
+    from app.core.embeddings import create_embedder
+    try:
+        embedder = create_embedder(cache=False)
+        embedder.embed(["warm up"])
+    except Exception as e:
+        return None, f"{type(e).__name__}: {e}"
+    return embedder, None
+
+
+def time_embedding(embedder, chunks: list) -> float:
+    t0 = time.perf_counter()
+    embedder.embed(chunks)
+    return time.perf_counter() - t0
+
+
+def report(name: str, chunks: list, seconds: float, embedder=None, embed_error: str = None):
+    tokens = [count_tokens(c) for c in chunks]
+    line = (
+        f"{name:<10} chunks={len(chunks):>5}  avg_tokens={sum(tokens) / max(1, len(tokens)):>6.1f}  "
+        f"max_tokens={max(tokens, default=0):>4}  broken_edges={broken_edges(chunks):>5}  "
+        f"chunk_time={seconds * 1000:>7.1f}ms"
+    )
+    if embedder is not None:
+        line += f"  embed_time={time_embedding(embedder, chunks):.2f}s ({embedder.name})"
+    elif embed_error:
+        line += f"  embed_time=n/a ({embed_error[:80]})"
+    print(line)
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("files", nargs="*", help="PDF/PPTX/DOCX/TXT files (default: synthetic text)")
+    parser.add_argument("--pages", type=int, default=80)
+    parser.add_argument("--no-embed", action="store_true")
+    args = parser.parse_args()
+
+    pages = load_pages(args.files) if args.files else synthetic_lecture(args.pages)
+    text = "\n".join(pages)
+    print(f"input: {len(pages)} pages, {len(text)} chars, tokenizer={tokenizer_name()}, "
+          f"budget={CHUNK_MAX_TOKENS} overlap={CHUNK_OVERLAP_TOKENS}")
+
+    t0 = time.perf_counter()
+    old = legacy_chunk_text(text)
+    t_old = time.perf_counter() - t0
+
+    t0 = time.perf_counter()
+    new = list(iter_chunks(pages))
+    t_new = time.perf_counter() - t0
+
+    embedder, embed_error = load_embedder() if not args.no_embed else (None, None)
+    report("legacy", old, t_old, embedder, embed_error)
+    report("sentence", new, t_new, embedder, embed_error)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,72 @@
+"""
+DOCX export benchmark: python-docx object model vs app.services.exam_docx.
+
+    cd backend
+    python -m benchmarks.bench_docx_export                    # 1, 10 and 100 page exams
+    python -m benchmarks.bench_docx_export --pages 5 50 --repeat 20
+
+For each synthetic exam size (same exams as bench_pdf_export) reports the
+mean time per document for the previous export (Document() + one
+add_paragraph() per line + save) and for the fast path (pre-compressed base
+package + body XML built in one pass), plus file size. The fast path's
+one-off base package load is reported separately. Every fast document is
+re-opened with python-docx to check that each paragraph's text matches the
+input line.
+"""
+import argparse
+import time
+from io import BytesIO
+
+from docx import Document
+
+from app.services.exam_docx import load_base_package, render_exam_docx
+from benchmarks.bench_pdf_export import synthetic_exam
+
+
+def legacy_render_docx(content: str) -> bytes:
+    """The generate_docx() + save previously used by /api/download."""
+    doc = Document()
+    for line in content.splitlines():
+        doc.add_paragraph("" if line.strip() == "" else line)
+    buf = BytesIO()
+    doc.save(buf)
+    return buf.getvalue()
+
+
+def mean_seconds(render, content: str, repeat: int) -> tuple:
+    data = render(content)           # warm-up
+    started = time.perf_counter()
+    for _ in range(repeat):
+        render(content)
+    return (time.perf_counter() - started) / repeat, data
+
+
+def same_text(data: bytes, content: str) -> bool:
+    paragraphs = [p.text for p in Document(BytesIO(data)).paragraphs]
+    expected = ["" if not line.strip() else line for line in content.splitlines()]
+    return paragraphs == expected
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--pages", type=int, nargs="+", default=[1, 10, 100])
+    parser.add_argument("--repeat", type=int, default=10, help="renders per measurement")
+    args = parser.parse_args()
+
+    started = time.perf_counter()
+    load_base_package()
+    print(f"base package load: {(time.perf_counter() - started) * 1000:.1f} ms (once per process)\n")
+
+    print(f"{'exam':>8}{'lines':>7}{'python-docx ms':>16}{'fast ms':>10}{'speedup':>9}"
+          f"{'old KB':>8}{'fast KB':>9}{'text ok':>9}")
+    for pages in args.pages:
+        content = synthetic_exam(pages)
+        legacy, legacy_data = mean_seconds(legacy_render_docx, content, args.repeat)
+        fast, fast_data = mean_seconds(render_exam_docx, content, args.repeat)
+        print(f"{pages:>6}pp{len(content.splitlines()):>7}{legacy * 1000:>16.1f}{fast * 1000:>10.1f}"
+              f"{legacy / fast:>8.1f}x{len(legacy_data) / 1024:>8.1f}{len(fast_data) / 1024:>9.1f}"
+              f"{str(same_text(fast_data, content)):>9}", flush=True)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,141 @@
+"""
+PDF export benchmark: old single-Paragraph export vs app.services.exam_pdf.
+
+    cd backend
+    python -m benchmarks.bench_pdf_export                    # 1, 10 and 100 page exams
+    python -m benchmarks.bench_pdf_export --pages 1 10 300
+    python -m benchmarks.bench_pdf_export --no-legacy        # current renderer only
+    python -m benchmarks.bench_pdf_export --memory           # also peak memory (slower)
+
+For each synthetic exam size, the benchmark reports these per renderer:
+- the render time;
+- the page count and file size;
+- with --memory, peak Python memory (tracemalloc).
+
+The old export's layout cost grows much faster than linearly, so by default
+it only runs up to --legacy-max-pages.
+
+Before timing, it checks that text outside Helvetica's character set
+(SYMBOL_SAMPLE) comes back unchanged from the PDF, and exits non-zero if not.
+"""
+import argparse
+import random
+import sys
+import time
+import tracemalloc
+import unicodedata
+from io import BytesIO
+
+from reportlab.lib.pagesizes import A4
+
+from app.services.exam_pdf import LEADING, MARGIN, render_exam_pdf
+
+LINES_PER_PAGE = int((A4[1] - 2 * MARGIN) // LEADING)      # synthetic exam sizing only
+
+SYMBOL_SAMPLE = "1) Show that ∑ α π ≤ Ω for every x ≥ 0."
+
+
+def legacy_generate_pdf(content: str) -> BytesIO:
+    """The generate_pdf() previously used by /api/download (one Paragraph, <br/> per line)."""
+    from reportlab.lib.styles import ParagraphStyle, getSampleStyleSheet
+    from reportlab.platypus import Paragraph, SimpleDocTemplate
+
+    buffer = BytesIO()
+    doc = SimpleDocTemplate(buffer, pagesize=A4, leftMargin=36, rightMargin=36, topMargin=36, bottomMargin=36)
+    body_style = ParagraphStyle(
+        "Body", parent=getSampleStyleSheet()["Normal"],
+        fontName="Helvetica", fontSize=10, leading=13, wordWrap="LTR",
+    )
+    safe_text = content.replace("&", "&amp;").replace("<", "&lt;").replace(">", "&gt;")
+    safe_text = safe_text.replace("\r\n", "\n").replace("\r", "\n").replace("\n", "<br/>")
+    doc.build([Paragraph(safe_text, body_style)])
+    buffer.seek(0)
+    return buffer
+
+
+def synthetic_exam(pages: int, seed: int = 7) -> str:
+    """Quiz-style exam (MCQs, long questions, answer key) of roughly `pages` pages."""
+    rnd = random.Random(seed)
+    words = (
+        "process thread memory cache scheduler kernel deadlock page table interrupt "
+        "file system latency throughput queue lock semaphore buffer protocol packet"
+    ).split()
+
+    def sentence(n):
+        return " ".join(rnd.choice(words) for _ in range(n)).capitalize() + "."
+
+    lines, answers, number = ["TOTAL MARKS: 100", "", "Multiple Choice Questions:"], [], 0
+    target = pages * LINES_PER_PAGE * 0.6          # wrapping and the answer key add the rest
+    while len(lines) < target:
+        number += 1
+        if number % 4:
+            lines += [f"{number}) {sentence(rnd.randint(8, 30))}"]
+            lines += [f"   {label}) {sentence(rnd.randint(3, 12))}" for label in "ABCD"]
+            answers.append(f"{number}) {rnd.choice('ABCD')}")
+        else:
+            lines += [f"{number}) Scenario: {sentence(rnd.randint(40, 90))}", f"   Task: {sentence(12)}"]
+            answers.append(f"{number}) {sentence(rnd.randint(20, 40))}")
+        lines.append("")
+    return "\n".join(lines + ["=== ANSWER KEY ===", ""] + answers)
+
+
+def measure(render, memory: bool = False) -> dict:
+    if memory:
+        tracemalloc.start()
+    started = time.perf_counter()
+    data = render()
+    total = time.perf_counter() - started
+    peak = None
+    if memory:
+        peak = tracemalloc.get_traced_memory()[1] / 2 ** 20
+        tracemalloc.stop()
+    return {"data": data, "total": total, "peak_mb": peak, "size_kb": len(data) / 1024}
+
+
+def page_count(data: bytes) -> str:
+    try:
+        from pypdf import PdfReader
+    except ImportError:
+        return "?"
+    return str(len(PdfReader(BytesIO(data)).pages))
+
+
+def check_symbols() -> bool:
+    """SYMBOL_SAMPLE survives render_exam_pdf() -> text extraction (None: pypdf missing)."""
+    try:
+        from pypdf import PdfReader
+    except ImportError:
+        return None
+    text = PdfReader(BytesIO(render_exam_pdf(SYMBOL_SAMPLE))).pages[0].extract_text()
+    # Symbol's Omega glyph extracts as U+2126 OHM SIGN, canonically equal to U+03A9
+    return SYMBOL_SAMPLE in unicodedata.normalize("NFC", text)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--pages", type=int, nargs="+", default=[1, 10, 100])
+    parser.add_argument("--no-legacy", dest="legacy", action="store_false", help="skip the old renderer")
+    parser.add_argument("--legacy-max-pages", type=int, default=10, help="largest exam given to the old renderer")
+    parser.add_argument("--memory", action="store_true", help="trace peak memory (slows both renderers)")
+    args = parser.parse_args()
+
+    symbols = check_symbols()
+    print(f"symbol round-trip ({SYMBOL_SAMPLE!r}): {'skipped, pypdf missing' if symbols is None else symbols}\n")
+    if symbols is False:
+        sys.exit(1)
+
+    print(f"{'exam':>8} {'renderer':<10}{'pages':>7}{'total s':>10}{'peak MB':>9}{'size KB':>9}")
+    for pages in args.pages:
+        content = synthetic_exam(pages)
+        renderers = [("flowables", lambda: render_exam_pdf(content))]
+        if args.legacy and pages <= args.legacy_max_pages:
+            renderers.append(("legacy", lambda: legacy_generate_pdf(content).getvalue()))
+        for name, render in renderers:
+            result = measure(render, args.memory)
+            peak = f"{result['peak_mb']:.1f}" if result["peak_mb"] is not None else "-"
+            print(f"{pages:>6}pp {name:<10}{page_count(result['data']):>7}{result['total']:>10.3f}"
+                  f"{peak:>9}{result['size_kb']:>9.1f}", flush=True)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,97 @@
+"""
+Retrieval benchmark: NumPy in-process index vs an ephemeral Chroma collection.
+
+    cd backend
+    python -m benchmarks.bench_vector_index
+    python -m benchmarks.bench_vector_index --sizes 10 100 1000 5000 --queries 200
+
+Uses random unit vectors (384-d, like MiniLM) spread over 5 documents and
+times: bulk insert, and filtered top-k queries ({"source": {"$in": [...]}})
+of the kind RAGEngine.search_many issues. Embedding time is excluded.
+"""
+import argparse
+import time
+import uuid
+
+import numpy as np
+
+from app.core.vector_index import NumpyVectorIndex
+
+
+def make_data(n: int, dim: int, docs: int, seed: int = 0):
+    rng = np.random.default_rng(seed)
+    vectors = rng.standard_normal((n, dim)).astype(np.float32)
+    vectors /= np.linalg.norm(vectors, axis=1, keepdims=True)
+    ids = [f"c{i}" for i in range(n)]
+    documents = [f"chunk {i}" for i in range(n)]
+    metadatas = [{"source": f"doc{i % docs}", "namespace": "bench"} for i in range(n)]
+    queries = rng.standard_normal((64, dim)).astype(np.float32)
+    return ids, vectors.tolist(), documents, metadatas, queries.tolist()
+
+
+def bench(index, data, n_queries: int, top_k: int, docs: int):
+    ids, vectors, documents, metadatas, queries = data
+    t0 = time.perf_counter()
+    for i in range(0, len(ids), 1000):
+        index.add(
+            ids=ids[i:i + 1000],
+            embeddings=vectors[i:i + 1000],
+            documents=documents[i:i + 1000],
+            metadatas=metadatas[i:i + 1000],
+        )
+    t_add = time.perf_counter() - t0
+
+    where = {"$and": [
+        {"namespace": "bench"},
+        {"source": {"$in": [f"doc{d}" for d in range(docs)]}},
+    ]}
+    n_results = min(len(ids), top_k * docs)
+    t0 = time.perf_counter()
+    for q in range(n_queries):
+        index.query(
+            query_embeddings=[queries[q % len(queries)]],
+            n_results=n_results,
+            where=where,
+            include=["documents", "metadatas"],
+        )
+    t_query = (time.perf_counter() - t0) / n_queries
+    return t_add, t_query
+
+
+def chroma_collection():
+    try:
+        import chromadb
+        from chromadb.config import Settings
+    except ImportError:
+        return None
+    client = chromadb.EphemeralClient(settings=Settings(anonymized_telemetry=False))
+    return client.create_collection(name=f"bench_{uuid.uuid4().hex[:8]}")
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--sizes", type=int, nargs="+", default=[10, 100, 1000, 5000])
+    parser.add_argument("--dim", type=int, default=384)
+    parser.add_argument("--docs", type=int, default=5)
+    parser.add_argument("--top-k", type=int, default=3)
+    parser.add_argument("--queries", type=int, default=100)
+    args = parser.parse_args()
+
+    print(f"{'chunks':>7} | {'numpy add':>10} {'numpy query':>12} | {'chroma add':>10} {'chroma query':>13} | speedup")
+    for n in args.sizes:
+        data = make_data(n, args.dim, args.docs)
+        np_add, np_q = bench(NumpyVectorIndex(), data, args.queries, args.top_k, args.docs)
+
+        collection = chroma_collection()
+        if collection is None:
+            print(f"{n:>7} | {np_add * 1000:>8.1f}ms {np_q * 1000:>10.3f}ms | chromadb not installed")
+            continue
+        ch_add, ch_q = bench(collection, data, args.queries, args.top_k, args.docs)
+        print(
+            f"{n:>7} | {np_add * 1000:>8.1f}ms {np_q * 1000:>10.3f}ms | "
+            f"{ch_add * 1000:>8.1f}ms {ch_q * 1000:>11.3f}ms | {ch_q / np_q:>6.1f}x"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,240 @@
+"""
+Offline stand-in for the Groq chat-completions API.
+
+    cd backend
+    python -m benchmarks.llm_stub --port 8001 --latency 0.4 --tokens-per-second 250
+
+then run the backend against it:
+
+    GROQ_BASE_URL=http://127.0.0.1:8001 GROQ_API_KEY=stub uvicorn app.main:app
+
+Answers POST /openai/v1/chat/completions (the path the Groq SDK uses) and
+/v1/chat/completions, streaming or not. The reply is a canned exam that
+matches the prompt: quiz, assignment (Task 1..N) or mid/final (one block per
+SECTION, including the per-section prompts of parallel generation), always
+followed by "=== ANSWER KEY ===". Regeneration prompts get just the one
+task, question or section they ask for. Timing = latency (time to first token) +
+output tokens / tokens-per-second, with optional jitter.
+"""
+import argparse
+import asyncio
+import json
+import os
+import random
+import re
+import time
+import uuid
+
+from fastapi import FastAPI, Request
+from fastapi.responses import JSONResponse, StreamingResponse
+
+
+STUB_LATENCY_SECONDS = float(os.getenv("STUB_LATENCY_SECONDS", "0.3"))
+STUB_TOKENS_PER_SECOND = float(os.getenv("STUB_TOKENS_PER_SECOND", "300"))
+STUB_JITTER = float(os.getenv("STUB_JITTER", "0.1"))          # +/- fraction of each delay
+STUB_ERROR_RATE = float(os.getenv("STUB_ERROR_RATE", "0"))     # share of calls answered with 429
+
+_WORD_RE = re.compile(r"\S+\s*")
+
+
+# =========================================================
+# CANNED OUTPUTS
+# =========================================================
+def _count(pattern: str, text: str, default: int) -> int:
+    m = re.search(pattern, text, re.IGNORECASE)
+    return int(m.group(1)) if m else default
+
+
+def _mcqs(n: int, start: str = "") -> list:
+    lines = []
+    for i in range(1, n + 1):
+        lines += [
+            f"{i}) Which statement about {start}concept {i} is correct?",
+            "   A) The first option",
+            "   B) The second option",
+            "   C) The third option",
+            "   D) The fourth option",
+        ]
+    return lines
+
+
+def quiz_output(prompt: str) -> str:
+    mcqs = _count(r"MCQs:\s*EXACTLY\s*(\d+)", prompt, 5)
+    shorts = _count(r"Short Questions:\s*EXACTLY\s*(\d+)", prompt, 2)
+    lines = ["TOTAL MARKS: 10", "", "Multiple Choice Questions:"] + _mcqs(mcqs)
+    lines += ["", "Short Answer Questions:"]
+    lines += [f"{i}) Explain the role of topic {i} in the lecture." for i in range(1, shorts + 1)]
+    lines += ["", "=== ANSWER KEY ===", "", "Multiple Choice Questions:"]
+    lines += [f"{i}) B" for i in range(1, mcqs + 1)]
+    lines += ["", "Short Answer Questions:"]
+    lines += [f"{i}) Topic {i} links the main ideas of the lecture." for i in range(1, shorts + 1)]
+    return "\n".join(lines)
+
+
+def assignment_output(prompt: str) -> str:
+    tasks = _count(r"TOTAL_TASKS:\s*(\d+)", prompt, 4)
+    lines = []
+    for i in range(1, tasks + 1):
+        lines += [f"Task {i}: Analyse how concept {i} from the lecture applies to a small case study.", ""]
+    lines += ["=== ANSWER KEY ===", ""]
+    lines += [f"Task {i}: A good answer identifies concept {i} and applies it step by step." for i in range(1, tasks + 1)]
+    return "\n".join(lines)
+
+
+def midfinal_output(prompt: str) -> str:
+    only = re.search(r"Generate ONLY SECTION\s+(\w+)", prompt)
+    names = [only.group(1)] if only else (
+        re.findall(r"^SECTION\s+(\w+)\s*:\s*TOTAL MARKS\s*=", prompt, re.MULTILINE) or ["A", "B"]
+    )
+    questions, answers = [], []
+    for name in names:
+        questions += [f"SECTION {name}: TOTAL MARKS: 15", "", "Multiple Choice Questions:"]
+        questions += _mcqs(5, f"section {name} ")
+        questions += ["", "Short Answer Questions:"]
+        questions += [f"{i}) Describe idea {i} of section {name}." for i in range(1, 3)]
+        questions.append("")
+        answers += [f"SECTION {name}", "", "Multiple Choice Questions:"]
+        answers += [f"{i}) C" for i in range(1, 6)]
+        answers += ["", "Short Answer Questions:"]
+        answers += [f"{i}) Idea {i} is defined in the lecture notes." for i in range(1, 3)]
+        answers.append("")
+    return "\n".join(questions + ["=== ANSWER KEY ===", ""] + answers).strip()
+
+
+def regenerate_output(target: str) -> str:
+    task = re.match(r"Task (\d+)", target)
+    if task:
+        n = task.group(1)
+        return (f"Task {n}: Revise concept {n} and apply it to a new case study.\n\n"
+                f"=== ANSWER KEY ===\nTask {n}: A good answer applies concept {n} to the new case.")
+    question = re.search(r"question (\d+)", target)
+    if question:
+        n = int(question.group(1))
+        return "\n".join(_mcqs(1, "revised ")).replace("1)", f"{n})", 1) + f"\n\n=== ANSWER KEY ===\n{n}) D"
+    section = re.search(r"SECTION (\w+)", target)
+    return midfinal_output(f"Generate ONLY SECTION {section.group(1) if section else 'A'}")
+
+
+def canned_output(prompt: str) -> str:
+    target = re.search(r"CURRENT PART \((.*)\)", prompt)
+    if target:
+        return regenerate_output(target.group(1))
+    if "MID/FINAL" in prompt or "Generate ONLY SECTION" in prompt:
+        return midfinal_output(prompt)
+    if re.search(r"\bASSIGNMENT\b|TOTAL_TASKS", prompt):
+        return assignment_output(prompt)
+    return quiz_output(prompt)
+
+
+# =========================================================
+# SERVER
+# =========================================================
+app = FastAPI(title="LLM stub")
+stats = {"requests": 0, "streamed": 0, "rate_limited": 0}
+
+
+def _jittered(seconds: float) -> float:
+    return max(0.0, seconds * (1 + random.uniform(-STUB_JITTER, STUB_JITTER)))
+
+
+def _usage(prompt: str, pieces: list) -> dict:
+    prompt_tokens = len(_WORD_RE.findall(prompt))
+    return {
+        "prompt_tokens": prompt_tokens,
+        "completion_tokens": len(pieces),
+        "total_tokens": prompt_tokens + len(pieces),
+    }
+
+
+async def chat_completions(request: Request):
+    body = await request.json()
+    stats["requests"] += 1
+    if STUB_ERROR_RATE and random.random() < STUB_ERROR_RATE:
+        stats["rate_limited"] += 1
+        return JSONResponse(
+            {"error": {"message": "stub rate limit", "type": "rate_limit_exceeded"}},
+            status_code=429,
+            headers={"retry-after": "1"},
+        )
+
+    messages = body.get("messages", [])
+    prompt = "\n".join(m.get("content") or "" for m in messages)
+    text = canned_output(messages[-1].get("content", "") if messages else "")
+    pieces = _WORD_RE.findall(text)       # ~one "token" per word
+    model = body.get("model", "stub")
+    completion_id = f"chatcmpl-{uuid.uuid4().hex[:12]}"
+    created = int(time.time())
+
+    if not body.get("stream"):
+        await asyncio.sleep(_jittered(STUB_LATENCY_SECONDS + len(pieces) / STUB_TOKENS_PER_SECOND))
+        return {
+            "id": completion_id,
+            "object": "chat.completion",
+            "created": created,
+            "model": model,
+            "choices": [{
+                "index": 0,
+                "message": {"role": "assistant", "content": text},
+                "finish_reason": "stop",
+            }],
+            "usage": _usage(prompt, pieces),
+        }
+
+    stats["streamed"] += 1
+
+    def frame(delta: dict, finish=None) -> str:
+        chunk = {
+            "id": completion_id,
+            "object": "chat.completion.chunk",
+            "created": created,
+            "model": model,
+            "choices": [{"index": 0, "delta": delta, "finish_reason": finish}],
+        }
+        return f"data: {json.dumps(chunk)}\n\n"
+
+    async def events():
+        await asyncio.sleep(_jittered(STUB_LATENCY_SECONDS))
+        yield frame({"role": "assistant", "content": ""})
+        # send a few words per frame so high token rates don't turn into
+        # thousands of tiny sleeps
+        step = max(1, int(STUB_TOKENS_PER_SECOND // 50))
+        for i in range(0, len(pieces), step):
+            await asyncio.sleep(_jittered(step / STUB_TOKENS_PER_SECOND))
+            yield frame({"content": "".join(pieces[i:i + step])})
+        yield frame({}, finish="stop")
+        yield "data: [DONE]\n\n"
+
+    return StreamingResponse(events(), media_type="text/event-stream")
+
+
+app.add_api_route("/openai/v1/chat/completions", chat_completions, methods=["POST"])
+app.add_api_route("/v1/chat/completions", chat_completions, methods=["POST"])
+
+
+@app.get("/stats")
+def get_stats():
+    return stats
+
+
+def main():
+    global STUB_LATENCY_SECONDS, STUB_TOKENS_PER_SECOND, STUB_JITTER, STUB_ERROR_RATE
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8001)
+    parser.add_argument("--latency", type=float, default=STUB_LATENCY_SECONDS, help="seconds before the first token")
+    parser.add_argument("--tokens-per-second", type=float, default=STUB_TOKENS_PER_SECOND)
+    parser.add_argument("--jitter", type=float, default=STUB_JITTER)
+    parser.add_argument("--error-rate", type=float, default=STUB_ERROR_RATE, help="share of calls answered with 429")
+    args = parser.parse_args()
+
+    STUB_LATENCY_SECONDS = args.latency
+    STUB_TOKENS_PER_SECOND = args.tokens_per_second
+    STUB_JITTER = args.jitter
+    STUB_ERROR_RATE = args.error_rate
+
+    import uvicorn
+    uvicorn.run(app, host=args.host, port=args.port, log_level="warning")
+
+
+if __name__ == "__main__":
+    main()
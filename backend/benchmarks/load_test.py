@@ -0,0 +1,278 @@
+"""
+End-to-end load test for POST /api/generate-exam, no Groq key needed.
+
+    cd backend
+    python -m benchmarks.load_test --users 8 --requests 40
+    python -m benchmarks.load_test --users 16 --exam-types quiz midterm --pages 30 --unique-docs
+    python -m benchmarks.load_test --url http://127.0.0.1:8000 --users 8   # a running server
+
+By default the real FastAPI app is driven in-process (httpx ASGI transport,
+with the app's startup / shutdown handlers run around the test) and the LLM is the local stub (benchmarks.llm_stub), started on a free port
+in a background thread. Every request uploads synthetic lecture files
+(PDF + PPTX). Reports client-side latency p50/p95/p99 and throughput, plus
+per-stage timings (extraction, indexing, retrieval, llm, ...) taken from
+/api/metrics before and after the run. The first --show-errors failed
+requests are printed with their status and response body (or exception).
+
+In-process runs default to an in-memory vector store and a SQLite database
+in a temp directory; set RAG_STORE_MODE / DATABASE_URL to override.
+--unique-docs gives every request different lecture text, so extraction and
+embedding caches don't hide the cost of those stages.
+"""
+import argparse
+import asyncio
+import os
+import random
+import socket
+import tempfile
+import threading
+import time
+from contextlib import asynccontextmanager
+from io import BytesIO
+from typing import AsyncIterator, List, Tuple
+
+import httpx
+
+
+TOPICS = [
+    "photosynthesis", "cell division", "operating systems", "sorting algorithms",
+    "supply and demand", "thermodynamics", "relational databases", "neural networks",
+]
+
+
+# =========================================================
+# SYNTHETIC INPUTS
+# =========================================================
+def lecture_paragraphs(seed: int, count: int) -> List[str]:
+    rng = random.Random(seed)
+    out = []
+    for i in range(count):
+        topic = rng.choice(TOPICS)
+        out.append(
+            f"Lecture point {i + 1} ({seed}): {topic.capitalize()} is introduced with a worked example. "
+            f"The key idea of {topic} is explained step by step, followed by common mistakes. "
+            f"Students should be able to define {topic}, compare it with related ideas and apply it "
+            f"to a short case. Variant {rng.randint(0, 10 ** 6)}."
+        )
+    return out
+
+
+def make_pdf(seed: int, pages: int) -> bytes:
+    from reportlab.lib.pagesizes import A4
+    from reportlab.pdfgen import canvas
+
+    buf = BytesIO()
+    pdf = canvas.Canvas(buf, pagesize=A4)
+    for page, paragraph in enumerate(lecture_paragraphs(seed, pages)):
+        text = pdf.beginText(50, 780)
+        text.textLine(f"Page {page + 1}")
+        words, line = paragraph.split(), ""
+        for word in words:
+            if len(line) + len(word) > 90:
+                text.textLine(line)
+                line = ""
+            line += word + " "
+        text.textLine(line)
+        pdf.drawText(text)
+        pdf.showPage()
+    pdf.save()
+    return buf.getvalue()
+
+
+def make_pptx(seed: int, slides: int) -> bytes:
+    from pptx import Presentation
+
+    prs = Presentation()
+    for i, paragraph in enumerate(lecture_paragraphs(seed + 7919, slides)):
+        slide = prs.slides.add_slide(prs.slide_layouts[1])
+        slide.shapes.title.text = f"Slide {i + 1}"
+        slide.placeholders[1].text = paragraph
+    buf = BytesIO()
+    prs.save(buf)
+    return buf.getvalue()
+
+
+def ui_prompt(exam_type: str) -> str:
+    """Small versions of the prompts the Angular frontend sends."""
+    if exam_type == "assignment":
+        return (
+            "EXAM TYPE: ASSIGNMENT\nTOTAL_TASKS: 4\nSCENARIO_TASKS: 1\nREGULAR_TASKS: 3\n"
+            "TOTAL_MARKS: 20\nSCENARIO_MARKS_PER_TASK: 5\n"
+        )
+    if exam_type in ("midterm", "final"):
+        sections = ""
+        for name in ("A", "B", "C"):
+            sections += (
+                f"\nSECTION {name}: TOTAL MARKS = 15\n"
+                "  MCQs: EXACTLY 5 questions (Count: 5)\n    - Marks: 1 each\n"
+                "  Short Questions: EXACTLY 2 questions (Count: 2)\n    - Marks: 5 each\n"
+            )
+        return f"EXAM TYPE: MID/FINAL (SECTIONED)\n\nNUMBER_OF_SECTIONS: 3\n{sections}"
+    return (
+        "EXAM TYPE: QUIZ\nEXPECTED_TOTAL_MARKS: 15\n"
+        "MCQs: EXACTLY 5 questions (Count: 5)\n  - Marks: 1 each\n"
+        "Short Questions: EXACTLY 2 questions (Count: 2)\n  - Marks: 5 each\n"
+    )
+
+
+# =========================================================
+# LLM STUB / APP SETUP
+# =========================================================
+def free_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def start_stub(latency: float, tokens_per_second: float) -> str:
+    import uvicorn
+    from benchmarks import llm_stub
+
+    llm_stub.STUB_LATENCY_SECONDS = latency
+    llm_stub.STUB_TOKENS_PER_SECOND = tokens_per_second
+    port = free_port()
+    server = uvicorn.Server(uvicorn.Config(llm_stub.app, host="127.0.0.1", port=port, log_level="warning"))
+    threading.Thread(target=server.run, daemon=True).start()
+    deadline = time.time() + 10
+    while not server.started and time.time() < deadline:
+        time.sleep(0.05)
+    return f"http://127.0.0.1:{port}"
+
+
+@asynccontextmanager
+async def in_process_client(llm_url: str) -> AsyncIterator[httpx.AsyncClient]:
+    # must be set before app.main is imported
+    os.environ["GROQ_BASE_URL"] = llm_url
+    os.environ.setdefault("GROQ_API_KEY", "stub")
+    os.environ.setdefault("LLM_REQUESTS_PER_MINUTE", "0")
+    os.environ.setdefault("RAG_STORE_MODE", "ephemeral")
+    os.environ.setdefault("DATABASE_URL", f"sqlite:///{tempfile.mkdtemp()}/loadtest.db")
+
+    from app.main import app
+    # ASGITransport sends no lifespan events, so run startup / shutdown
+    # (job queue, prompt registry, worker pools) the way uvicorn would
+    async with app.router.lifespan_context(app):
+        async with httpx.AsyncClient(
+            transport=httpx.ASGITransport(app=app), base_url="http://app", timeout=None
+        ) as client:
+            yield client
+
+
+# =========================================================
+# LOAD
+# =========================================================
+def percentile(values: List[float], p: float) -> float:
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(round(p * (len(ordered) - 1))))] if ordered else 0.0
+
+
+async def run_load(client: httpx.AsyncClient, args) -> Tuple[List[Tuple[str, float, int, str]], float]:
+    shared_files = None
+    if not args.unique_docs:
+        shared_files = (make_pdf(0, args.pages), make_pptx(0, max(1, args.pages // 2)))
+
+    counter = iter(range(args.requests))
+    results = []
+
+    async def user():
+        for i in counter:
+            exam_type = args.exam_types[i % len(args.exam_types)]
+            pdf, pptx = shared_files or (
+                make_pdf(i + 1, args.pages), make_pptx(i + 1, max(1, args.pages // 2))
+            )
+            files = [("files", ("lecture.pdf", pdf, "application/pdf"))]
+            if args.pptx:
+                files.append(("files", ("slides.pptx", pptx, "application/vnd.openxmlformats-officedocument.presentationml.presentation")))
+
+            started = time.perf_counter()
+            try:
+                response = await client.post("/api/generate-exam", data={
+                    "exam_type": exam_type,
+                    "prompt": ui_prompt(exam_type),
+                    "session_id": f"load-{i}" if args.unique_docs else "load",
+                    "bypass_cache": "true",
+                }, files=files)
+                status, detail = response.status_code, response.text
+            except Exception as e:
+                # in-process, an unhandled server error surfaces here as the exception itself
+                status, detail = 0, f"{type(e).__name__}: {e}"
+            results.append((exam_type, time.perf_counter() - started, status, detail))
+
+    started = time.perf_counter()
+    await asyncio.gather(*(user() for _ in range(args.users)))
+    return results, time.perf_counter() - started
+
+
+def stage_delta(before: dict, after: dict) -> dict:
+    """Per-stage numbers for this run (counts/totals are differences)."""
+    out = {}
+    for stage, now in after.items():
+        prev = before.get(stage, {"count": 0, "total_seconds": 0.0})
+        count = now["count"] - prev["count"]
+        if count > 0:
+            out[stage] = {**now, "count": count, "total_seconds": now["total_seconds"] - prev["total_seconds"]}
+    return out
+
+
+async def main_async(args):
+    if args.url:
+        client = httpx.AsyncClient(base_url=args.url, timeout=None)
+    else:
+        llm_url = args.llm_url or start_stub(args.latency, args.tokens_per_second)
+        print(f"LLM stub: {llm_url}")
+        client = in_process_client(llm_url)
+
+    async with client as client:
+        before = (await client.get("/api/metrics")).json().get("stages", {})
+        results, wall = await run_load(client, args)
+        after = (await client.get("/api/metrics")).json().get("stages", {})
+
+    ok = [r for r in results if r[2] == 200]
+    latencies = [r[1] for r in ok]
+    print(f"\n{len(results)} requests, {args.users} concurrent users, {wall:.2f}s wall")
+    print(f"ok: {len(ok)}  failed: {len(results) - len(ok)}  "
+          f"throughput: {len(ok) / wall:.2f} exams/s")
+    failed = [r for r in results if r[2] != 200]
+    for exam_type, _, status, detail in failed[:args.show_errors]:
+        print(f"  failed {exam_type:<10} status {status}: {detail[:300]}")
+    if len(failed) > args.show_errors:
+        print(f"  ... {len(failed) - args.show_errors} more failures")
+    if latencies:
+        print(f"latency  p50 {percentile(latencies, .5):.3f}s  p95 {percentile(latencies, .95):.3f}s  "
+              f"p99 {percentile(latencies, .99):.3f}s")
+    for exam_type in args.exam_types:
+        subset = [r[1] for r in ok if r[0] == exam_type]
+        if subset:
+            print(f"  {exam_type:<10} n={len(subset):<4} p50 {percentile(subset, .5):.3f}s  "
+                  f"p95 {percentile(subset, .95):.3f}s")
+
+    stages = stage_delta(before, after)
+    if stages:
+        print(f"\n{'stage':<16}{'count':>7}{'p50 s':>9}{'p95 s':>9}{'p99 s':>9}{'total s':>10}")
+        for stage, s in stages.items():
+            print(f"{stage:<16}{s['count']:>7}{s['p50_seconds']:>9.3f}{s['p95_seconds']:>9.3f}"
+                  f"{s['p99_seconds']:>9.3f}{s['total_seconds']:>10.2f}")
+        print("(stage percentiles cover the server's recent window; 'total s' = time spent in the stage during this run)")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--users", type=int, default=4, help="concurrent clients")
+    parser.add_argument("--requests", type=int, default=None, help="total requests (default users x 5)")
+    parser.add_argument("--exam-types", nargs="+", default=["quiz", "assignment", "midterm"])
+    parser.add_argument("--pages", type=int, default=10, help="PDF pages per upload (PPTX gets half as many slides)")
+    parser.add_argument("--no-pptx", dest="pptx", action="store_false", help="upload only the PDF")
+    parser.add_argument("--unique-docs", action="store_true", help="different lecture text per request")
+    parser.add_argument("--url", help="load a running backend instead of the in-process app")
+    parser.add_argument("--llm-url", help="use an already running LLM stub (in-process mode)")
+    parser.add_argument("--latency", type=float, default=0.3, help="stub time to first token")
+    parser.add_argument("--tokens-per-second", type=float, default=300, help="stub output rate")
+    parser.add_argument("--show-errors", type=int, default=5, help="failed requests to print in detail")
+    args = parser.parse_args()
+    args.requests = args.requests or args.users * 5
+
+    asyncio.run(main_async(args))
+
+
+if __name__ == "__main__":
+    main()